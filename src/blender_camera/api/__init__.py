@@ -2,12 +2,19 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from blender_camera.api.routes.metrics import MetricsRouter
 from blender_camera.api.routes.scenes import ScenesRouter
 from blender_camera.utils import get_log_level
 
 
 class Api:
-    def __init__(self, version: str, base_path: str, scenes: ScenesRouter):
+    def __init__(
+        self,
+        version: str,
+        base_path: str,
+        scenes: ScenesRouter,
+        metrics: MetricsRouter,
+    ):
         self._version = version
         self._base_path = base_path
 
@@ -28,6 +35,7 @@ class Api:
             allow_headers=["*"],
         )
         self._api.include_router(scenes.router)
+        self._api.include_router(metrics.router)
         self._api.add_api_route(
             "/",
             self._root,
@@ -0,0 +1,109 @@
+from collections.abc import AsyncIterator
+
+from fastapi import Request
+from python_multipart import MultipartParser
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import parse_options_header
+
+
+class MultipartUploadError(Exception):
+    pass
+
+
+class MultipartUpload:
+    """
+    One file field of a multipart/form-data request, read as the request body
+    arrives. Unlike UploadFile, the file is never spooled, so it can be written
+    straight to where it is kept. Other fields are skipped.
+    """
+
+    def __init__(self, request: Request, field_name: str):
+        _, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if boundary is None:
+            raise MultipartUploadError("Request is not multipart/form-data")
+
+        self._field_name = field_name
+        self._body = request.stream()
+        self._parser = MultipartParser(
+            boundary,
+            {
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_file = False
+        self._filename: str | None = None
+        self._received: list[bytes] = []
+        self._complete = False
+
+    async def get_filename(self) -> str:
+        """Read the body up to the file's headers and return its file name."""
+        while self._filename is None:
+            if not await self._receive():
+                raise MultipartUploadError(f"Request has no {self._field_name} file")
+        return self._filename
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        """The file's bytes in the chunks they arrive in."""
+        await self.get_filename()
+        while True:
+            received, self._received = self._received, []
+            for chunk in received:
+                yield chunk
+            if self._complete:
+                return
+            if not await self._receive():
+                raise MultipartUploadError(f"Request ended inside {self._field_name}")
+
+    async def _receive(self) -> bool:
+        """Feed the next piece of the body to the parser, False at its end."""
+        data = await anext(self._body, b"")
+        if not data:
+            return False
+        try:
+            self._parser.write(data)
+        except MultipartParseError as e:
+            raise MultipartUploadError(f"Invalid multipart body: {e}")
+        return True
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        self._disposition = b""
+        # Only the first file of the field is read
+        self._in_file = (
+            self._filename is None
+            and options.get(b"name") == self._field_name.encode()
+            and b"filename" in options
+        )
+        if self._in_file:
+            self._filename = options[b"filename"].decode("utf-8", errors="replace")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._received.append(data[start:end])
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self._complete = True
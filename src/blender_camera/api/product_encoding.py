@@ -0,0 +1,23 @@
+import asyncio
+from pathlib import PurePath
+
+from blender_camera.models.frame import Frame
+from blender_camera.models.frame_product import FrameProduct
+from blender_camera.stage_executor import StageExecutor
+
+
+async def encode_products(
+    executor: StageExecutor, frame: Frame, products: list[FrameProduct]
+) -> dict[str, bytes]:
+    """
+    Encode the products of a frame in parallel, each in a stage named after its
+    format so the metrics show the time and size of every codec.
+    """
+    encoders = frame.get_product_encoders(products)
+    contents = await asyncio.gather(
+        *(
+            executor.run(f"encode_{PurePath(name).suffix[1:]}", encode)
+            for name, encode in encoders.items()
+        )
+    )
+    return dict(zip(encoders, contents))
@@ -0,0 +1,84 @@
+import asyncio
+import math
+from collections.abc import Awaitable
+
+from fastapi import HTTPException, Request
+from loguru import logger
+
+from blender_camera.render_scheduler import RenderQueueFullError
+
+RENDER_TIMEOUT_HEADER = "X-Render-Timeout"
+
+
+async def _wait_for_disconnect(request: Request):
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+class RenderGuard:
+    """
+    Runs renders on behalf of a request, bounded by a deadline and abandoned as
+    soon as the client disconnects, and maps render errors to HTTP errors.
+    """
+
+    def __init__(self, timeout: float):
+        # A timeout of zero means renders are only bounded by the request header
+        self._timeout = timeout if timeout > 0 else None
+
+    def get_deadline(self, request: Request) -> float | None:
+        """Loop time at which renders for this request are given up on."""
+        timeout = self._timeout
+
+        header = request.headers.get(RENDER_TIMEOUT_HEADER)
+        if header is not None:
+            try:
+                requested = float(header)
+            except ValueError:
+                requested = math.nan
+            if not requested > 0:
+                raise HTTPException(
+                    status_code=400, detail=f"Invalid {RENDER_TIMEOUT_HEADER} header"
+                )
+            # Clients can shorten the server timeout but not extend it
+            timeout = requested if timeout is None else min(timeout, requested)
+
+        if timeout is None:
+            return None
+        return asyncio.get_running_loop().time() + timeout
+
+    async def run[T](
+        self, request: Request, render: Awaitable[T], deadline: float | None
+    ) -> T:
+        render_task = asyncio.ensure_future(render)
+        disconnect_task = asyncio.ensure_future(_wait_for_disconnect(request))
+
+        try:
+            async with asyncio.timeout_at(deadline):
+                await asyncio.wait(
+                    {render_task, disconnect_task},
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+        except TimeoutError:
+            logger.warning(f"[render] deadline expired for {request.url.path}")
+            raise HTTPException(status_code=504, detail="Render timed out")
+        finally:
+            disconnect_task.cancel()
+            # Cancelling the render kills its Blender process and removes its
+            # temporary files once no other request is waiting for it. The last
+            # request to give up waits for that before moving on.
+            render_task.cancel()
+            await asyncio.gather(render_task, return_exceptions=True)
+
+        if not render_task.cancelled():
+            try:
+                return render_task.result()
+            except RenderQueueFullError as e:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Render queue is full",
+                    headers={"Retry-After": str(e.retry_after)},
+                )
+
+        logger.info(f"[render] client disconnected from {request.url.path}")
+        # Nginx's "client closed request", the client will never see it
+        raise HTTPException(status_code=499, detail="Client disconnected")
@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+
+from blender_camera.renderer import Renderer
+from blender_camera.stage_executor import StageExecutor
+
+
+class MetricsRouter:
+    def __init__(self, renderer: Renderer, executor: StageExecutor):
+        self._renderer = renderer
+        self._executor = executor
+
+        self.router = APIRouter(prefix="/metrics")
+        self.router.add_api_route(
+            "",
+            self._get_metrics,
+            methods=["GET"],
+            response_model=dict,
+            responses={
+                200: {
+                    "description": "Render queue, cache and stage time and size metrics"
+                }
+            },
+        )
+
+    async def _get_metrics(self) -> dict:
+        return {**self._renderer.get_metrics(), "stages": self._executor.get_metrics()}
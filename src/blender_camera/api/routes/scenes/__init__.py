@@ -1,15 +1,21 @@
-from typing import Annotated
-
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, HTTPException, Request
 
+from blender_camera.api.multipart_upload import MultipartUpload, MultipartUploadError
 from blender_camera.api.routes.scenes.scene_id import SceneIdRouter
 from blender_camera.models.id import Id
-from blender_camera.models.scene_model import SceneModel
+from blender_camera.models.scene_model import BlendFileTooLargeError, SceneModel
+
+# Room for the boundary and part headers around the file in a multipart body
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
 
 
 class ScenesRouter:
-    def __init__(self, sceneId: SceneIdRouter, scene_model: SceneModel):
+    def __init__(
+        self, sceneId: SceneIdRouter, scene_model: SceneModel, max_blend_bytes: int
+    ):
         self._scene_model = scene_model
+        # Zero means uploads of any size are accepted
+        self._max_blend_bytes = max_blend_bytes
 
         self.router = APIRouter(prefix="/scenes")
         self.router.include_router(sceneId.router)
@@ -28,20 +34,65 @@ class ScenesRouter:
             responses={
                 201: {"description": "Scene created"},
                 400: {"description": "Invalid file format"},
+                413: {"description": "File is too large"},
+            },
+            # The body is read by the route as it arrives, so describe it here
+            openapi_extra={
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "multipart/form-data": {
+                            "schema": {
+                                "type": "object",
+                                "required": ["blend_file"],
+                                "properties": {
+                                    "blend_file": {
+                                        "type": "string",
+                                        "format": "binary",
+                                        "description": "Blender file (.blend)",
+                                    }
+                                },
+                            }
+                        }
+                    },
+                }
             },
         )
 
     async def get_scenes(self) -> list[Id]:
         return [scene.id for scene in self._scene_model.get_scenes()]
 
-    async def create_scene(
-        self,
-        blend_file: Annotated[UploadFile, File(description="Blender file (.blend)")],
-    ) -> Id:
-        if not blend_file.filename or not blend_file.filename.endswith(".blend"):
-            raise HTTPException(status_code=400, detail="File must be a .blend file")
+    async def create_scene(self, request: Request) -> Id:
+        # A body this far over the limit cannot hold a file within it, so
+        # reject it before reading any of it
+        max_bytes = self._max_blend_bytes
+        content_length = request.headers.get("content-length", "")
+        if (
+            max_bytes
+            and content_length.isdigit()
+            and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES
+        ):
+            raise HTTPException(
+                status_code=413, detail=f"File is larger than {max_bytes} bytes"
+            )
+
+        try:
+            blend_file = MultipartUpload(request, "blend_file")
+            filename = await blend_file.get_filename()
+            if not filename.endswith(".blend"):
+                raise HTTPException(
+                    status_code=400, detail="File must be a .blend file"
+                )
 
-        blend_bytes = await blend_file.read()
-        scene = self._scene_model.create_scene(blend_bytes=blend_bytes)
+            # Write the file into the scene store as it is received
+            scene = await self._scene_model.create_scene_from_chunks(
+                blend_file.iter_chunks(), max_bytes
+            )
+        except MultipartUploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except BlendFileTooLargeError as e:
+            raise HTTPException(
+                status_code=413, detail=f"File is larger than {e.max_bytes} bytes"
+            )
 
         return scene.id
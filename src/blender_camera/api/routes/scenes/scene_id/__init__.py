@@ -2,20 +2,29 @@ from fastapi import APIRouter, HTTPException
 
 from blender_camera.api.routes.scenes.scene_id.cameras import CamerasRouter
 from blender_camera.api.routes.scenes.scene_id.entities import EntitiesRouter
+from blender_camera.api.routes.scenes.scene_id.frames import FramesRouter
 from blender_camera.models import scene
 from blender_camera.models.scene import Scene
 from blender_camera.models.scene_model import SceneModel
+from blender_camera.renderer import Renderer
 
 
 class SceneIdRouter:
     def __init__(
-        self, entities: EntitiesRouter, cameras: CamerasRouter, scene_model: SceneModel
+        self,
+        entities: EntitiesRouter,
+        cameras: CamerasRouter,
+        frames: FramesRouter,
+        scene_model: SceneModel,
+        renderer: Renderer,
     ):
         self._scene_model = scene_model
+        self._renderer = renderer
 
         self.router = APIRouter(prefix="/{scene_id}")
         self.router.include_router(entities.router)
         self.router.include_router(cameras.router)
+        self.router.include_router(frames.router)
         self.router.add_api_route(
             "",
             self._delete_scene,
@@ -26,5 +35,6 @@ class SceneIdRouter:
             },
         )
 
-    def _delete_scene(self, scene_id: str) -> None:
+    async def _delete_scene(self, scene_id: str) -> None:
+        await self._renderer.close_scene(scene_id)
         self._scene_model.delete_scene(scene_id)
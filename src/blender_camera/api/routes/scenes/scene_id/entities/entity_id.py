@@ -1,22 +1,70 @@
-from fastapi import APIRouter, HTTPException, Response
+import mimetypes
+from collections.abc import AsyncIterator
+from typing import Annotated
+from uuid import uuid4
 
-from blender_camera.blender import Blender
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from blender_camera.api.product_encoding import encode_products
+from blender_camera.api.render_guard import RenderGuard
 from blender_camera.models.camera_intrinsics import CameraIntrinsics
 from blender_camera.models.components.has_camera_intrinsics import HasCameraIntrinsics
 from blender_camera.models.components.has_id import HasId
+from blender_camera.models.components.has_image_size import HasImageSize
 from blender_camera.models.components.has_pose import HasPose
+from blender_camera.models.entities.camera import Camera, CameraLike
 from blender_camera.models.entities.entity import Entity
 from blender_camera.models.entity_model import EntityModel
-from blender_camera.models.frame import Frame
+from blender_camera.models.frame import DEPTH_PNG16_SCALE, Frame, archive_files
+from blender_camera.models.frame_product import FrameProduct
 from blender_camera.models.id import Id
+from blender_camera.models.image_encoding import (
+    DEFAULT_COMPRESS_LEVEL,
+    DEFAULT_QUALITY,
+    ImageEncoding,
+)
+from blender_camera.models.image_format import ImageFormat
+from blender_camera.models.image_size import ImageSize
+from blender_camera.models.point_cloud_filter import PointCloudFilter
 from blender_camera.models.pose import Pose, validate_pose
+from blender_camera.models.region_of_interest import RegionOfInterest
+from blender_camera.models.render_pass import RenderPass
+from blender_camera.models.render_preset import RenderPreset
+from blender_camera.models.scene import Scene
 from blender_camera.models.scene_model import SceneModel
-from blender_camera.scripts.render_frame_script import RenderFrameScript
+from blender_camera.renderer import Renderer
+from blender_camera.stage_executor import StageExecutor
+
+
+def _multipart_part(boundary: str, filename: str, content: bytes) -> bytes:
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    headers = (
+        f"--{boundary}\r\n"
+        f"Content-Type: {media_type}\r\n"
+        f'Content-Disposition: attachment; filename="{filename}"\r\n'
+        "\r\n"
+    )
+    return headers.encode() + content + b"\r\n"
+
+
+# Media types of the image endpoints, chosen with `format` or the Accept header
+_IMAGE_CONTENT: dict = {image_format.media_type: {} for image_format in ImageFormat}
 
 
 class EntityIdRouter:
-    def __init__(self, scene_model: SceneModel):
+    def __init__(
+        self,
+        scene_model: SceneModel,
+        renderer: Renderer,
+        executor: StageExecutor,
+        render_guard: RenderGuard,
+    ):
         self._scene_model = scene_model
+        self._renderer = renderer
+        self._executor = executor
+        self._render_guard = render_guard
 
         self.router = APIRouter(prefix="/{entity_id}")
         self.router.add_api_route(
@@ -81,17 +129,73 @@ class EntityIdRouter:
                 400: {"description": "Entity has no camera intrinsics"},
             },
         )
+        self.router.add_api_route(
+            "/image-size",
+            self._get_image_size,
+            methods=["GET"],
+            response_model=None,
+            responses={
+                200: {"description": "Image size in pixels"},
+                404: {"description": "Entity not found"},
+                400: {"description": "Entity has no image size"},
+            },
+        )
+        self.router.add_api_route(
+            "/image-size",
+            self._set_image_size,
+            methods=["PUT"],
+            response_model=None,
+            responses={
+                204: {"description": "Image size updated"},
+                404: {"description": "Entity not found"},
+                400: {"description": "Entity has no image size"},
+            },
+        )
+        self.router.add_api_route(
+            "/frame",
+            self._get_frame,
+            methods=["GET"],
+            response_class=Response,
+            responses={
+                200: {
+                    "description": "ZIP archive with the requested products",
+                    "content": {"application/zip": {}},
+                },
+                404: {"description": "Camera not found"},
+                503: {"description": "Render queue is full"},
+                504: {"description": "Render timed out"},
+            },
+        )
+        self.router.add_api_route(
+            "/trajectory",
+            self._render_trajectory,
+            methods=["POST"],
+            response_class=StreamingResponse,
+            responses={
+                200: {
+                    "description": "Multipart stream with the products of each pose",
+                    "content": {"multipart/mixed": {}},
+                },
+                400: {"description": "Invalid pose format"},
+                404: {"description": "Camera not found"},
+                503: {"description": "Render queue is full"},
+                504: {"description": "Render timed out"},
+            },
+        )
         self.router.add_api_route(
             "/pointcloud",
             self._get_pointcloud,
             methods=["GET"],
-            response_class=Response,
+            response_class=StreamingResponse,
             responses={
                 200: {
-                    "description": "Pointcloud data",
+                    "description": "Binary PLY pointcloud, streamed in chunks",
                     "content": {"application/octet-stream": {}},
                 },
+                400: {"description": "Invalid depth range"},
                 404: {"description": "Camera not found"},
+                503: {"description": "Render queue is full"},
+                504: {"description": "Render timed out"},
             },
         )
         self.router.add_api_route(
@@ -100,8 +204,11 @@ class EntityIdRouter:
             methods=["GET"],
             response_class=Response,
             responses={
-                200: {"description": "Rendered image", "content": {"image/png": {}}},
+                200: {"description": "Rendered image", "content": _IMAGE_CONTENT},
+                400: {"description": "Format is only available for depth"},
                 404: {"description": "Camera not found"},
+                503: {"description": "Render queue is full"},
+                504: {"description": "Render timed out"},
             },
         )
         self.router.add_api_route(
@@ -110,8 +217,10 @@ class EntityIdRouter:
             methods=["GET"],
             response_class=Response,
             responses={
-                200: {"description": "Rendered image", "content": {"image/png": {}}},
+                200: {"description": "Rendered image", "content": _IMAGE_CONTENT},
                 404: {"description": "Camera not found"},
+                503: {"description": "Render queue is full"},
+                504: {"description": "Render timed out"},
             },
         )
         self.router.add_api_route(
@@ -120,8 +229,11 @@ class EntityIdRouter:
             methods=["GET"],
             response_class=Response,
             responses={
-                200: {"description": "Rendered image", "content": {"image/png": {}}},
+                200: {"description": "Rendered image", "content": _IMAGE_CONTENT},
+                400: {"description": "Format is only available for depth"},
                 404: {"description": "Camera not found"},
+                503: {"description": "Render queue is full"},
+                504: {"description": "Render timed out"},
             },
         )
 
@@ -138,7 +250,9 @@ class EntityIdRouter:
             raise HTTPException(status_code=404, detail="Entity not found")
         return entity
 
-    async def _render_frame_for_camera(self, scene_id: Id, entity_id: Id) -> Frame:
+    def _get_render_target_with_http_exception(
+        self, scene_id: Id, entity_id: Id
+    ) -> tuple[Scene, CameraLike]:
         entity = self._get_entity_with_http_exception(scene_id, entity_id)
         if not isinstance(entity, HasId):
             raise HTTPException(status_code=400, detail="Entity has no ID")
@@ -149,9 +263,56 @@ class EntityIdRouter:
         if scene is None:
             raise HTTPException(status_code=404, detail="Scene not found")
 
-        blender = Blender(scene.blend_path)
-        render_frame_script = RenderFrameScript(blender)
-        return await render_frame_script.execute(entity)
+        return scene, entity
+
+    def _crop_camera_with_http_exception(
+        self, camera: CameraLike, roi: str | None
+    ) -> CameraLike:
+        if roi is None:
+            return camera
+
+        try:
+            region = RegionOfInterest.parse(roi)
+        except ValueError:
+            raise HTTPException(
+                status_code=400, detail="ROI must be x,y,width,height in pixels"
+            )
+        if (
+            not isinstance(camera, Camera)
+            or camera.camera_intrinsics is None
+            or camera.image_size is None
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail="Camera needs intrinsics and an image size to render an ROI",
+            )
+        if not region.fits(camera.image_size):
+            raise HTTPException(status_code=400, detail="ROI is outside the image")
+
+        # Rendering the region is rendering a smaller camera with a shifted center
+        return region.crop(camera)
+
+    async def _render_frame_for_camera(
+        self,
+        request: Request,
+        scene_id: Id,
+        entity_id: Id,
+        products: list[FrameProduct],
+        preset: RenderPreset | None,
+        roi: str | None,
+    ) -> Frame:
+        scene, camera = self._get_render_target_with_http_exception(scene_id, entity_id)
+        camera = self._crop_camera_with_http_exception(camera, roi)
+        if preset is None:
+            preset = RenderPreset.default_for(products)
+
+        # Only render and decode the passes the products are made from
+        passes = RenderPass.required_by(products)
+
+        deadline = self._render_guard.get_deadline(request)
+        return await self._render_guard.run(
+            request, self._renderer.render(scene, camera, preset, passes), deadline
+        )
 
     async def _get(self, scene_id: Id, entity_id: Id):
         entity = self._get_entity_with_http_exception(scene_id, entity_id)
@@ -160,6 +321,7 @@ class EntityIdRouter:
     async def _delete(self, scene_id: Id, entity_id: Id) -> None:
         entity_model = self._get_entity_model_with_http_exception(scene_id)
         entity_model.delete_entity(entity_id)
+        self._renderer.invalidate_entity(scene_id, entity_id)
 
     async def _get_pose(self, scene_id: Id, entity_id: Id) -> Pose:
         entity = self._get_entity_with_http_exception(scene_id, entity_id)
@@ -176,6 +338,7 @@ class EntityIdRouter:
             raise HTTPException(status_code=400, detail="Invalid pose format")
 
         entity.pose = pose
+        self._renderer.invalidate_entity(scene_id, entity_id)
 
     async def _get_camera_intrinsics(self, scene_id: Id, entity_id: Id):
         entity = self._get_entity_with_http_exception(scene_id, entity_id)
@@ -194,21 +357,248 @@ class EntityIdRouter:
                 status_code=400, detail="Entity has no camera intrinsics"
             )
         entity.camera_intrinsics = camera_intrinsics
+        self._renderer.invalidate_entity(scene_id, entity_id)
+
+    async def _get_image_size(self, scene_id: Id, entity_id: Id):
+        entity = self._get_entity_with_http_exception(scene_id, entity_id)
+        if not isinstance(entity, HasImageSize):
+            raise HTTPException(status_code=400, detail="Entity has no image size")
+        return entity.image_size
+
+    async def _set_image_size(self, scene_id: Id, entity_id: Id, image_size: ImageSize):
+        entity = self._get_entity_with_http_exception(scene_id, entity_id)
+        if not isinstance(entity, HasImageSize):
+            raise HTTPException(status_code=400, detail="Entity has no image size")
+        entity.image_size = image_size
+        self._renderer.invalidate_entity(scene_id, entity_id)
+
+    async def _get_pointcloud(
+        self,
+        request: Request,
+        scene_id: Id,
+        entity_id: Id,
+        preset: RenderPreset | None = None,
+        roi: str | None = None,
+        drop_background: bool = False,
+        min_depth: Annotated[float | None, Query(ge=0)] = None,
+        max_depth: Annotated[float | None, Query(gt=0)] = None,
+        stride: Annotated[int, Query(ge=1)] = 1,
+        voxel_size: Annotated[float | None, Query(gt=0)] = None,
+    ) -> StreamingResponse:
+        try:
+            point_filter = PointCloudFilter(
+                drop_background=drop_background,
+                min_depth=min_depth,
+                max_depth=max_depth,
+                stride=stride,
+                voxel_size=voxel_size,
+            )
+        except ValueError:
+            raise HTTPException(
+                status_code=400, detail="min_depth is greater than max_depth"
+            )
+
+        frame = await self._render_frame_for_camera(
+            request, scene_id, entity_id, [FrameProduct.POINTCLOUD], preset, roi
+        )
+        # Starlette pulls the chunks in its thread pool, so only one chunk of the
+        # PLY is in memory at a time and the first bytes go out right away
+        return StreamingResponse(
+            frame.iter_ply(point_filter=point_filter),
+            media_type="application/octet-stream",
+        )
+
+    def _get_image_format_with_http_exception(
+        self,
+        request: Request,
+        image_format: ImageFormat | None,
+        render_pass: RenderPass,
+    ) -> ImageFormat:
+        image_format = image_format or ImageFormat.from_accept(
+            request.headers.get("accept")
+        )
+        if image_format is ImageFormat.PNG16 and render_pass is not RenderPass.DEPTH:
+            raise HTTPException(
+                status_code=400, detail="png16 is only available for depth"
+            )
+        return image_format
+
+    async def _encode_image(
+        self,
+        frame: Frame,
+        render_pass: RenderPass,
+        image_format: ImageFormat,
+        compress_level: int,
+        quality: int,
+    ) -> Response:
+        if not image_format.is_array:
+            encoding = ImageEncoding(
+                image_format=image_format,
+                compress_level=compress_level,
+                quality=quality,
+            )
+            image_bytes = await self._executor.run(
+                f"encode_{image_format}", frame.to_image_bytes, render_pass, encoding
+            )
+            return Response(content=image_bytes, media_type=image_format.media_type)
+
+        # Arrays are streamed from the frame buffer as they are, a few rows at a time
+        if image_format is ImageFormat.NPY:
+            return StreamingResponse(
+                frame.iter_npy(render_pass), media_type=image_format.media_type
+            )
+
+        array = frame.get_pass(render_pass)
+        assert array is not None
+        return StreamingResponse(
+            frame.iter_raw(render_pass),
+            media_type=image_format.media_type,
+            headers={
+                "X-Array-Shape": ",".join(str(size) for size in array.shape),
+                "X-Array-Dtype": array.dtype.str,
+            },
+        )
 
-    async def _get_pointcloud(self, scene_id: Id, entity_id: Id) -> Response:
-        frame = await self._render_frame_for_camera(scene_id, entity_id)
-        return Response(
-            content=frame.to_ply_bytes(), media_type="application/octet-stream"
+    async def _get_depth(
+        self,
+        request: Request,
+        scene_id: Id,
+        entity_id: Id,
+        preset: RenderPreset | None = None,
+        roi: str | None = None,
+        image_format: Annotated[ImageFormat | None, Query(alias="format")] = None,
+        compress_level: Annotated[int, Query(ge=0, le=9)] = DEFAULT_COMPRESS_LEVEL,
+        quality: Annotated[int, Query(ge=1, le=100)] = DEFAULT_QUALITY,
+        depth_scale: Annotated[float, Query(gt=0)] = DEPTH_PNG16_SCALE,
+    ) -> Response:
+        image_format = self._get_image_format_with_http_exception(
+            request, image_format, RenderPass.DEPTH
+        )
+        frame = await self._render_frame_for_camera(
+            request, scene_id, entity_id, [FrameProduct.DEPTH], preset, roi
+        )
+        if image_format is ImageFormat.PNG16:
+            png_bytes = await self._executor.run(
+                "encode_png16",
+                frame.to_depth_png16_bytes,
+                depth_scale,
+                ImageEncoding(compress_level=compress_level),
+            )
+            return Response(content=png_bytes, media_type=image_format.media_type)
+        return await self._encode_image(
+            frame, RenderPass.DEPTH, image_format, compress_level, quality
         )
 
-    async def _get_depth(self, scene_id: Id, entity_id: Id) -> Response:
-        frame = await self._render_frame_for_camera(scene_id, entity_id)
-        return Response(content=frame.to_depth_png_bytes(), media_type="image/png")
+    async def _get_normals(
+        self,
+        request: Request,
+        scene_id: Id,
+        entity_id: Id,
+        preset: RenderPreset | None = None,
+        roi: str | None = None,
+        image_format: Annotated[ImageFormat | None, Query(alias="format")] = None,
+        compress_level: Annotated[int, Query(ge=0, le=9)] = DEFAULT_COMPRESS_LEVEL,
+        quality: Annotated[int, Query(ge=1, le=100)] = DEFAULT_QUALITY,
+    ) -> Response:
+        image_format = self._get_image_format_with_http_exception(
+            request, image_format, RenderPass.NORMAL
+        )
+        frame = await self._render_frame_for_camera(
+            request, scene_id, entity_id, [FrameProduct.NORMALS], preset, roi
+        )
+        return await self._encode_image(
+            frame, RenderPass.NORMAL, image_format, compress_level, quality
+        )
 
-    async def _get_normals(self, scene_id: Id, entity_id: Id) -> Response:
-        frame = await self._render_frame_for_camera(scene_id, entity_id)
-        return Response(content=frame.to_normal_png_bytes(), media_type="image/png")
+    async def _get_colors(
+        self,
+        request: Request,
+        scene_id: Id,
+        entity_id: Id,
+        preset: RenderPreset | None = None,
+        roi: str | None = None,
+        image_format: Annotated[ImageFormat | None, Query(alias="format")] = None,
+        compress_level: Annotated[int, Query(ge=0, le=9)] = DEFAULT_COMPRESS_LEVEL,
+        quality: Annotated[int, Query(ge=1, le=100)] = DEFAULT_QUALITY,
+    ) -> Response:
+        image_format = self._get_image_format_with_http_exception(
+            request, image_format, RenderPass.COLOR
+        )
+        frame = await self._render_frame_for_camera(
+            request, scene_id, entity_id, [FrameProduct.COLORS], preset, roi
+        )
+        return await self._encode_image(
+            frame, RenderPass.COLOR, image_format, compress_level, quality
+        )
 
-    async def _get_colors(self, scene_id: Id, entity_id: Id) -> Response:
-        frame = await self._render_frame_for_camera(scene_id, entity_id)
-        return Response(content=frame.to_color_png_bytes(), media_type="image/png")
+    async def _get_frame(
+        self,
+        request: Request,
+        scene_id: Id,
+        entity_id: Id,
+        products: Annotated[list[FrameProduct], Query()] = list(FrameProduct),
+        preset: RenderPreset | None = None,
+        roi: str | None = None,
+    ) -> Response:
+        frame = await self._render_frame_for_camera(
+            request, scene_id, entity_id, products, preset, roi
+        )
+        files = await encode_products(self._executor, frame, products)
+        archive_bytes = await self._executor.run("encode_archive", archive_files, files)
+        return Response(content=archive_bytes, media_type="application/zip")
+
+    async def _render_trajectory(
+        self,
+        request: Request,
+        scene_id: Id,
+        entity_id: Id,
+        poses: Annotated[list[Pose], Body(min_length=1)],
+        products: Annotated[list[FrameProduct], Query()] = list(FrameProduct),
+        preset: RenderPreset | None = None,
+        roi: str | None = None,
+    ) -> StreamingResponse:
+        scene, camera = self._get_render_target_with_http_exception(scene_id, entity_id)
+        camera = self._crop_camera_with_http_exception(camera, roi)
+        if not all(validate_pose(pose) for pose in poses):
+            raise HTTPException(status_code=400, detail="Invalid pose format")
+
+        # The deadline covers the whole trajectory, not each frame
+        deadline = self._render_guard.get_deadline(request)
+        if preset is None:
+            preset = RenderPreset.default_for(products)
+        frames = self._renderer.render_trajectory(
+            scene, camera, poses, preset, RenderPass.required_by(products)
+        )
+
+        # Wait for the first frame before responding so a full queue is still a 503
+        first_frame = await self._render_guard.run(request, anext(frames), deadline)
+
+        boundary = uuid4().hex
+
+        async def stream() -> AsyncIterator[bytes]:
+            try:
+                index = 0
+                frame = first_frame
+                while True:
+                    files = await encode_products(self._executor, frame, products)
+                    for name, content in files.items():
+                        yield _multipart_part(boundary, f"{index}/{name}", content)
+
+                    index += 1
+                    try:
+                        frame = await self._render_guard.run(
+                            request, anext(frames), deadline
+                        )
+                    except StopAsyncIteration:
+                        break
+
+                yield f"--{boundary}--\r\n".encode()
+            except HTTPException as e:
+                # The response has started, so end it without the closing boundary
+                logger.warning(f"[render] trajectory aborted: {e.detail}")
+            finally:
+                await frames.aclose()
+
+        return StreamingResponse(
+            stream(), media_type=f"multipart/mixed; boundary={boundary}"
+        )
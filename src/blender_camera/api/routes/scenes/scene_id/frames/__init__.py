@@ -0,0 +1,108 @@
+import asyncio
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from blender_camera.api.product_encoding import encode_products
+from blender_camera.api.render_guard import RenderGuard
+from blender_camera.models.components.has_pose import HasPose
+from blender_camera.models.entities.camera import CameraLike
+from blender_camera.models.frame import archive_files
+from blender_camera.models.frame_product import FrameProduct
+from blender_camera.models.id import Id
+from blender_camera.models.render_pass import RenderPass
+from blender_camera.models.render_preset import RenderPreset
+from blender_camera.models.scene import Scene
+from blender_camera.models.scene_model import SceneModel
+from blender_camera.renderer import Renderer
+from blender_camera.stage_executor import StageExecutor
+
+
+class FramesRouter:
+    def __init__(
+        self,
+        scene_model: SceneModel,
+        renderer: Renderer,
+        executor: StageExecutor,
+        render_guard: RenderGuard,
+    ):
+        self._scene_model = scene_model
+        self._renderer = renderer
+        self._executor = executor
+        self._render_guard = render_guard
+
+        self.router = APIRouter(prefix="/frames")
+        self.router.add_api_route(
+            "",
+            self._get_frames,
+            methods=["GET"],
+            response_class=Response,
+            responses={
+                200: {
+                    "description": "ZIP archive with one folder per camera",
+                    "content": {"application/zip": {}},
+                },
+                400: {"description": "Entity has no pose"},
+                404: {"description": "Scene or entity not found"},
+                503: {"description": "Render queue is full"},
+                504: {"description": "Render timed out"},
+            },
+        )
+
+    def _get_scene_with_exception(self, scene_id: Id) -> Scene:
+        scene = self._scene_model.get_scene(scene_id)
+        if scene is None:
+            raise HTTPException(status_code=404, detail="Scene not found")
+        return scene
+
+    def _get_cameras_with_exception(
+        self, scene: Scene, entity_ids: list[Id]
+    ) -> list[CameraLike]:
+        cameras: list[CameraLike] = []
+        for entity_id in entity_ids:
+            entity = scene.entity_model.get_entity(entity_id)
+            if entity is None:
+                raise HTTPException(
+                    status_code=404, detail=f"Entity {entity_id} not found"
+                )
+            if not isinstance(entity, HasPose):
+                raise HTTPException(
+                    status_code=400, detail=f"Entity {entity_id} has no pose"
+                )
+            cameras.append(entity)
+        return cameras
+
+    async def _get_frames(
+        self,
+        request: Request,
+        scene_id: Id,
+        entity_ids: Annotated[list[Id], Query(min_length=1)],
+        products: Annotated[list[FrameProduct], Query()] = list(FrameProduct),
+        preset: RenderPreset | None = None,
+    ) -> Response:
+        scene = self._get_scene_with_exception(scene_id)
+        cameras = self._get_cameras_with_exception(scene, entity_ids)
+
+        if preset is None:
+            preset = RenderPreset.default_for(products)
+
+        deadline = self._render_guard.get_deadline(request)
+        frames = await self._render_guard.run(
+            request,
+            self._renderer.render_batch(
+                scene, cameras, preset, RenderPass.required_by(products)
+            ),
+            deadline,
+        )
+
+        # Every product of every camera is encoded at once
+        camera_files = await asyncio.gather(
+            *(encode_products(self._executor, frame, products) for frame in frames)
+        )
+        files = {
+            f"{entity_id}/{name}": content
+            for entity_id, frame_files in zip(entity_ids, camera_files)
+            for name, content in frame_files.items()
+        }
+        archive_bytes = await self._executor.run("encode_archive", archive_files, files)
+        return Response(content=archive_bytes, media_type="application/zip")
@@ -1,29 +1,85 @@
 from blender_camera.api import Api
+from blender_camera.api.render_guard import RenderGuard
+from blender_camera.api.routes.metrics import MetricsRouter
 from blender_camera.api.routes.scenes import ScenesRouter
 from blender_camera.api.routes.scenes.scene_id import SceneIdRouter
 from blender_camera.api.routes.scenes.scene_id.cameras import CamerasRouter
 from blender_camera.api.routes.scenes.scene_id.entities import EntitiesRouter
 from blender_camera.api.routes.scenes.scene_id.entities.entity_id import EntityIdRouter
+from blender_camera.api.routes.scenes.scene_id.frames import FramesRouter
+from blender_camera.disk_frame_cache import DiskFrameCache
+from blender_camera.frame_cache import FrameCache
 from blender_camera.models.scene_model import SceneModel
-from blender_camera.utils import get_base_path, get_version
+from blender_camera.render_scheduler import RenderScheduler
+from blender_camera.renderer import Renderer
+from blender_camera.scripts.render_frame_script import RenderTransport
+from blender_camera.stage_executor import StageExecutor
+from blender_camera.utils import (
+    get_base_path,
+    get_blender_idle_timeout,
+    get_blender_pool_size,
+    get_max_blend_bytes,
+    get_postprocess_workers,
+    get_render_cache_max_bytes,
+    get_render_disk_cache_dir,
+    get_render_disk_cache_max_bytes,
+    get_render_max_concurrent,
+    get_render_max_queued,
+    get_render_tile_pixels,
+    get_render_timeout,
+    get_render_transport,
+    get_version,
+)
 
 
 class App:
     def __init__(self):
         scene_model = SceneModel()
+        render_guard = RenderGuard(get_render_timeout())
+        self._executor = StageExecutor(get_postprocess_workers())
+
+        disk_cache = None
+        if get_render_disk_cache_dir():
+            disk_cache = DiskFrameCache(
+                get_render_disk_cache_dir(), get_render_disk_cache_max_bytes()
+            )
+        self._renderer = Renderer(
+            RenderScheduler(get_render_max_concurrent(), get_render_max_queued()),
+            FrameCache(get_render_cache_max_bytes()),
+            disk_cache,
+            self._executor,
+            get_blender_pool_size(),
+            get_blender_idle_timeout(),
+            get_render_tile_pixels(),
+            RenderTransport(get_render_transport()).check(get_render_max_concurrent()),
+        )
 
         scenes_router = ScenesRouter(
             SceneIdRouter(
-                EntitiesRouter(EntityIdRouter(scene_model), scene_model),
+                EntitiesRouter(
+                    EntityIdRouter(
+                        scene_model, self._renderer, self._executor, render_guard
+                    ),
+                    scene_model,
+                ),
                 CamerasRouter(scene_model),
+                FramesRouter(scene_model, self._renderer, self._executor, render_guard),
                 scene_model,
+                self._renderer,
             ),
             scene_model,
+            get_max_blend_bytes(),
+        )
+        self._api = Api(
+            get_version(),
+            get_base_path(),
+            scenes_router,
+            MetricsRouter(self._renderer, self._executor),
         )
-        self._api = Api(get_version(), get_base_path(), scenes_router)
 
     async def start(self, host: str, port: int):
         await self._api.start(host, port)
 
     async def stop(self):
-        pass
+        await self._renderer.close()
+        self._executor.shutdown()
@@ -1,7 +1,29 @@
 import asyncio
+import json
+import os
+import signal
+import time
+from collections.abc import Callable
 
 from loguru import logger
 
+RENDER_FRAME_SCRIPT = "src/scripts/render_frame.py"
+
+# Must match WORKER_REPLY_PREFIX in src/scripts/render_frame.py
+WORKER_REPLY_PREFIX = "@@blender-camera@@ "
+
+# Called with the index of each camera whose files have been written
+OnFrame = Callable[[int], None]
+
+
+def _kill_process_group(proc: asyncio.subprocess.Process):
+    # Blender runs in its own session, so this also reaches anything it spawned
+    if proc.returncode is None:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
 
 class Blender:
     def __init__(self, scene_path: str):
@@ -15,8 +37,16 @@ class Blender:
             *args,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
         )
-        stdout, stderr = await proc.communicate()
+        try:
+            stdout, stderr = await proc.communicate()
+        except asyncio.CancelledError:
+            # Nobody is waiting for this render anymore, stop it burning CPU
+            logger.info(f"[blender] killing abandoned render pid {proc.pid}")
+            _kill_process_group(proc)
+            await proc.wait()
+            raise
         logger.info(f"[blender] stdout: {stdout.decode()}")
 
         if proc.returncode != 0:
@@ -25,3 +55,231 @@ class Blender:
             raise RuntimeError(
                 f"Blender process failed with exit code {proc.returncode}"
             )
+
+    async def render_frame(
+        self, input_path: str, output_path: str, on_frame: OnFrame | None = None
+    ):
+        # A one-shot process only reports when it exits, so on_frame is not called
+        await self.run(
+            "--python",
+            RENDER_FRAME_SCRIPT,
+            "--",
+            "--input_path",
+            input_path,
+            "--output_path",
+            output_path,
+        )
+
+
+class BlenderWorker:
+    """A long-lived Blender process that keeps its scene loaded between renders."""
+
+    def __init__(self, scene_path: str):
+        self._scene_path = scene_path
+        self._proc: asyncio.subprocess.Process | None = None
+        self._replies: asyncio.Queue[dict | None] = asyncio.Queue()
+        self._readers: list[asyncio.Task] = []
+        self._killed = False
+        self.last_used = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        return (
+            not self._killed
+            and self._proc is not None
+            and self._proc.returncode is None
+        )
+
+    async def start(self):
+        self._proc = await asyncio.create_subprocess_exec(
+            "blender",
+            self._scene_path,
+            "--background",
+            "--python",
+            RENDER_FRAME_SCRIPT,
+            "--",
+            "--worker",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        self._readers = [
+            asyncio.create_task(self._read_stdout()),
+            asyncio.create_task(self._read_stderr()),
+        ]
+
+        try:
+            ready = await self._replies.get()
+        except BaseException:
+            # The pool only tracks started workers, so nothing else would ever
+            # stop this process if startup is abandoned
+            self.kill()
+            await self._proc.wait()
+            self._cancel_readers()
+            raise
+
+        if ready is None:
+            await self.stop()
+            raise RuntimeError("Blender worker exited during startup")
+        logger.info(f"[blender-worker] started pid {self._proc.pid}")
+
+    async def render_frame(
+        self, input_path: str, output_path: str, on_frame: OnFrame | None = None
+    ):
+        if not self.alive:
+            raise RuntimeError("Blender worker is not running")
+        assert self._proc is not None and self._proc.stdin is not None
+
+        job = {"input_path": input_path, "output_path": output_path}
+        try:
+            self._proc.stdin.write((json.dumps(job) + "\n").encode())
+            await self._proc.stdin.drain()
+
+            reply = await self._replies.get()
+            while reply is not None and "frame" in reply:
+                if on_frame is not None:
+                    on_frame(reply["frame"])
+                reply = await self._replies.get()
+        except asyncio.CancelledError:
+            # The job is still running and its replies would be read by the next
+            # job, so this worker cannot be reused. Wait for it to exit so it
+            # stops writing before the caller removes the output directory.
+            logger.info(
+                f"[blender-worker] killing abandoned render pid {self._proc.pid}"
+            )
+            self.kill()
+            await self._proc.wait()
+            raise
+        finally:
+            self.last_used = time.monotonic()
+
+        if reply is None:
+            raise RuntimeError(
+                f"Blender worker exited with exit code {self._proc.returncode}"
+            )
+        if not reply.get("ok"):
+            raise RuntimeError(f"Blender worker failed to render: {reply['error']}")
+
+    def kill(self):
+        self._killed = True
+        if self._proc is not None:
+            _kill_process_group(self._proc)
+
+    async def stop(self):
+        if self._proc is not None and self._proc.returncode is None:
+            assert self._proc.stdin is not None
+            self._proc.stdin.close()
+            try:
+                await asyncio.wait_for(self._proc.wait(), timeout=5.0)
+            except TimeoutError:
+                self.kill()
+                await self._proc.wait()
+
+        self._cancel_readers()
+
+    def _cancel_readers(self):
+        for reader in self._readers:
+            reader.cancel()
+        self._readers = []
+
+    async def _read_stdout(self):
+        assert self._proc is not None and self._proc.stdout is not None
+        async for raw_line in self._proc.stdout:
+            line = raw_line.decode(errors="replace").rstrip()
+            if line.startswith(WORKER_REPLY_PREFIX):
+                self._replies.put_nowait(json.loads(line[len(WORKER_REPLY_PREFIX) :]))
+            else:
+                logger.debug(f"[blender-worker] stdout: {line}")
+
+        # Wake up anyone still waiting for a reply from a process that is gone
+        await self._proc.wait()
+        self._replies.put_nowait(None)
+
+    async def _read_stderr(self):
+        assert self._proc is not None and self._proc.stderr is not None
+        async for raw_line in self._proc.stderr:
+            logger.debug(f"[blender-worker] stderr: {raw_line.decode().rstrip()}")
+
+
+class BlenderWorkerPool:
+    """Up to `size` warm Blender workers for one scene, stopped after `idle_timeout`."""
+
+    def __init__(self, scene_path: str, size: int, idle_timeout: float):
+        self._scene_path = scene_path
+        self._size = size
+        self._idle_timeout = idle_timeout
+        self._slots = asyncio.Semaphore(size)
+        self._active = 0
+        self._idle: list[BlenderWorker] = []
+        self._workers: set[BlenderWorker] = set()
+        self._reaper: asyncio.Task | None = None
+
+    @property
+    def free_workers(self) -> int:
+        """Renders that could start right now without waiting for a worker."""
+        return max(0, self._size - self._active)
+
+    async def render_frame(
+        self, input_path: str, output_path: str, on_frame: OnFrame | None = None
+    ):
+        self._active += 1
+        try:
+            async with self._slots:
+                worker = await self._acquire()
+                try:
+                    await worker.render_frame(input_path, output_path, on_frame)
+                finally:
+                    self._release(worker)
+        finally:
+            self._active -= 1
+
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+
+        workers = list(self._workers)
+        self._idle.clear()
+        self._workers.clear()
+        await asyncio.gather(*(worker.stop() for worker in workers))
+
+    async def _acquire(self) -> BlenderWorker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive:
+                return worker
+            self._workers.discard(worker)
+
+        worker = BlenderWorker(self._scene_path)
+        await worker.start()
+        self._workers.add(worker)
+
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap())
+        return worker
+
+    def _release(self, worker: BlenderWorker):
+        if worker.alive and worker in self._workers:
+            self._idle.append(worker)
+        else:
+            self._workers.discard(worker)
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(self._idle_timeout / 2)
+
+            # Take the expired workers out before awaiting anything, so _acquire
+            # can never hand out a worker that is being stopped
+            now = time.monotonic()
+            expired = [
+                worker
+                for worker in self._idle
+                if now - worker.last_used >= self._idle_timeout
+            ]
+            self._idle = [worker for worker in self._idle if worker not in expired]
+            self._workers.difference_update(expired)
+
+            if expired:
+                logger.info(f"[blender-worker] stopping {len(expired)} idle workers")
+                await asyncio.gather(*(worker.stop() for worker in expired))
@@ -0,0 +1,170 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from uuid import uuid4
+
+import numpy as np
+from loguru import logger
+
+from blender_camera.models.entities.camera import Camera
+from blender_camera.models.frame import Frame
+from blender_camera.models.render_pass import RenderPass
+
+_TMP_PREFIX = "tmp-"
+_CAMERA_FILE = "camera.json"
+_PASS_FILES = {
+    RenderPass.DEPTH: "depth.npy",
+    RenderPass.NORMAL: "normal.npy",
+    RenderPass.COLOR: "color.npy",
+}
+
+
+def _dir_size(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path))
+
+
+class DiskFrameCache:
+    """
+    LRU cache of rendered frames stored as .npy files and read back memory-mapped.
+
+    Keys are content addresses, so entries never go stale and the cache is reused
+    across restarts. Each entry is a directory that is written under a temporary
+    name and renamed into place, so a crash never leaves a partial entry behind.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def get(self, key: str, passes: Iterable[RenderPass] = ()) -> Frame | None:
+        """The stored frame of a render if it has at least the given passes."""
+        with self._lock:
+            if key not in self._entries or not self._has_passes(key, passes):
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._entries.move_to_end(key)
+
+        path = os.path.join(self._directory, key)
+        try:
+            # Record the access on disk so LRU order survives restarts
+            os.utime(path)
+            with open(os.path.join(path, _CAMERA_FILE)) as f:
+                camera = Camera.model_validate_json(f.read())
+            # Passes that were not rendered have no file
+            arrays = {
+                render_pass: np.load(os.path.join(path, name), mmap_mode="r")
+                for render_pass, name in _PASS_FILES.items()
+                if os.path.exists(os.path.join(path, name))
+            }
+        except (OSError, ValueError) as e:
+            logger.warning(f"[disk-cache] dropping unreadable entry {key}: {e}")
+            with self._lock:
+                self._remove(key)
+            return None
+
+        return Frame(
+            camera,
+            arrays.get(RenderPass.DEPTH),
+            arrays.get(RenderPass.NORMAL),
+            arrays.get(RenderPass.COLOR),
+        )
+
+    def put(self, key: str, frame: Frame):
+        path = os.path.join(self._directory, key)
+        tmp_path = os.path.join(self._directory, _TMP_PREFIX + uuid4().hex)
+
+        try:
+            os.makedirs(tmp_path)
+            with open(os.path.join(tmp_path, _CAMERA_FILE), "w") as f:
+                f.write(frame.camera.model_dump_json())
+            for render_pass, name in _PASS_FILES.items():
+                array = frame.get_pass(render_pass)
+                if array is None:
+                    continue
+                with open(os.path.join(tmp_path, name), "wb") as f:
+                    np.save(f, array)
+                    f.flush()
+                    os.fsync(f.fileno())
+            size = _dir_size(tmp_path)
+
+            with self._lock:
+                if size > self._max_bytes:
+                    return
+                # Keep the stored frame unless the new one adds a pass to it
+                if key in self._entries:
+                    if self._has_passes(key, frame.passes):
+                        return
+                    self._remove(key)
+                os.rename(tmp_path, path)
+                self._entries[key] = size
+                self._bytes += size
+                self._evict()
+        except OSError as e:
+            # The disk tier is best effort, a failed write only costs a re-render
+            logger.warning(f"[disk-cache] failed to store entry {key}: {e}")
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+    def _has_passes(self, key: str, passes: Iterable[RenderPass]) -> bool:
+        path = os.path.join(self._directory, key)
+        return all(
+            os.path.exists(os.path.join(path, _PASS_FILES[render_pass]))
+            for render_pass in passes
+        )
+
+    def _load_index(self):
+        entries: list[tuple[float, str, int]] = []
+        for entry in os.scandir(self._directory):
+            if not entry.is_dir():
+                continue
+            if entry.name.startswith(_TMP_PREFIX):
+                # Left over from a write that was interrupted
+                shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            entries.append((entry.stat().st_mtime, entry.name, _dir_size(entry.path)))
+
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._bytes += size
+        self._evict()
+
+        logger.info(
+            f"[disk-cache] loaded {len(self._entries)} entries "
+            f"({self._bytes} bytes) from {self._directory}"
+        )
+
+    def _evict(self):
+        while self._bytes > self._max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._evictions += 1
+
+    def _remove(self, key: str):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._bytes -= size
+        shutil.rmtree(os.path.join(self._directory, key), ignore_errors=True)
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from blender_camera.models.frame import Frame
+from blender_camera.models.id import Id
+from blender_camera.models.render_pass import RenderPass
+
+
+@dataclass
+class _Entry:
+    frame: Frame
+    scene_id: Id
+    entity_ids: set[Id] = field(default_factory=set)
+
+
+class FrameCache:
+    """LRU cache of rendered frames bounded by the total size of their arrays."""
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(
+        self, key: str, entity_id: Id, passes: Iterable[RenderPass] = ()
+    ) -> Frame | None:
+        """The cached frame of a render if it has at least the given passes."""
+        entry = self._entries.get(key)
+        if entry is None or not entry.frame.has_passes(passes):
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        self._entries.move_to_end(key)
+        entry.entity_ids.add(entity_id)
+        return entry.frame
+
+    def put(self, key: str, frame: Frame, scene_id: Id, entity_id: Id):
+        if frame.nbytes > self._max_bytes:
+            return
+
+        # Keep the cached frame unless the new one adds a pass to it
+        entry = self._entries.get(key)
+        if entry is not None and entry.frame.has_passes(frame.passes):
+            entry.entity_ids.add(entity_id)
+            return
+
+        self._remove(key)
+        self._entries[key] = _Entry(frame, scene_id, {entity_id})
+        self._bytes += frame.nbytes
+
+        while self._bytes > self._max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._evictions += 1
+
+    def invalidate_scene(self, scene_id: Id):
+        self._invalidate(
+            [key for key, entry in self._entries.items() if entry.scene_id == scene_id]
+        )
+
+    def invalidate_entity(self, scene_id: Id, entity_id: Id):
+        self._invalidate(
+            [
+                key
+                for key, entry in self._entries.items()
+                if entry.scene_id == scene_id and entity_id in entry.entity_ids
+            ]
+        )
+
+    def get_metrics(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+        }
+
+    def _invalidate(self, keys: list[str]):
+        for key in keys:
+            self._remove(key)
+        self._invalidations += len(keys)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.frame.nbytes
@@ -3,6 +3,7 @@ from uuid import uuid4
 from blender_camera.models.camera_intrinsics import CameraIntrinsics
 from blender_camera.models.entities.camera import Camera
 from blender_camera.models.entity_model import EntityModel
+from blender_camera.models.image_size import ImageSize
 from blender_camera.models.pose import Pose
 
 
@@ -14,11 +15,13 @@ class CameraModel:
         self,
         pose: Pose | None = None,
         camera_intrinsics: CameraIntrinsics | None = None,
+        image_size: ImageSize | None = None,
     ) -> Camera:
         return self.entity_model.add_entity(
             Camera(
                 id=str(uuid4()),
                 pose=pose or [0, 0, 0, 0, 0, 0],
                 camera_intrinsics=camera_intrinsics,
+                image_size=image_size,
             )
         )
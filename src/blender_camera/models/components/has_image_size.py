@@ -0,0 +1,8 @@
+from typing import Protocol, runtime_checkable
+
+from blender_camera.models.image_size import ImageSize
+
+
+@runtime_checkable
+class HasImageSize(Protocol):
+    image_size: ImageSize | None
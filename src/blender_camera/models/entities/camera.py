@@ -1,15 +1,32 @@
-from typing import Optional, Union
+from collections.abc import Mapping
+from typing import Any, Protocol, Self
 
 from blender_camera.models.camera_intrinsics import CameraIntrinsics
-from blender_camera.models.components.has_camera_intrinsics import HasCameraIntrinsics
 from blender_camera.models.components.has_id import HasId
 from blender_camera.models.components.has_pose import HasPose
 from blender_camera.models.entities.entity import Entity
+from blender_camera.models.image_size import ImageSize
 from blender_camera.models.pose import Pose
 
-CameraLike = Union[HasId, HasPose, Optional[HasCameraIntrinsics]]
+
+class CameraLike(HasId, HasPose, Protocol):
+    """
+    An entity that can be rendered: it has an id and a pose, and may have
+    intrinsics and an image size. Renders snapshot and key it by its fields.
+    """
+
+    def model_dump(
+        self, *, mode: str = ..., exclude: set[str] | None = ...
+    ) -> dict[str, Any]: ...
+
+    def model_dump_json(self) -> str: ...
+
+    def model_copy(
+        self, *, update: Mapping[str, Any] | None = ..., deep: bool = ...
+    ) -> Self: ...
 
 
 class Camera(Entity):
     pose: Pose
     camera_intrinsics: CameraIntrinsics | None
+    image_size: ImageSize | None = None
@@ -1,44 +1,316 @@
-import os
-import tempfile
+import itertools
+import threading
+import zipfile
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
 from io import BytesIO
+from typing import BinaryIO
 
 import numpy as np
-import open3d as o3d
 from numpy.typing import NDArray
-from PIL import Image
 
 from blender_camera.models.components.has_camera_intrinsics import HasCameraIntrinsics
 from blender_camera.models.entities.camera import CameraLike
+from blender_camera.models.frame_product import FrameProduct
+from blender_camera.models.image_encoding import ImageEncoding
+from blender_camera.models.point_cloud_filter import PointCloudFilter
+from blender_camera.models.render_pass import RenderPass
 
+# Channels of each pass in the interleaved frame buffer
+_PASS_CHANNELS = {RenderPass.COLOR: 3, RenderPass.NORMAL: 3, RenderPass.DEPTH: 1}
 
-def _to_8bit_png(image: NDArray[np.float32]) -> bytes:
-    """Convert a floating-point image to 8-bit PNG bytes."""
-    image = np.clip(image, 0.0, 1.0)
-    rgb_8bit = (image * 255).astype(np.uint8)
+# Values of each pass that map to the ends of an 8-bit image. Depth previews
+# span the first 50 scene units.
+_PASS_RANGES = {
+    RenderPass.COLOR: (0.0, 1.0),
+    RenderPass.NORMAL: (-1.0, 1.0),
+    RenderPass.DEPTH: (0.0, 50.0),
+}
 
-    # Convert to PIL Image and save to bytes
-    pil_image = Image.fromarray(rgb_8bit)
-    img_bytes = BytesIO()
-    pil_image.save(img_bytes, format="PNG")
+# Steps per scene unit of 16-bit depth PNGs, millimeters for scenes in meters
+DEPTH_PNG16_SCALE = 1000.0
 
-    return img_bytes.getvalue()
+# Pixels encoded per chunk of a streamed PLY, about 1.7MB of float vertices
+PLY_CHUNK_PIXELS = 1 << 16
+
+# Pixels copied per chunk of a streamed array, at most 3MB of float32 channels
+ARRAY_CHUNK_PIXELS = 1 << 18
+
+# Cycles gives pixels whose ray hits nothing a depth of 1e10
+BACKGROUND_DEPTH = 1e8
+
+# PLY names of the float types points can be written with
+_PLY_FLOAT_TYPES = {np.dtype(np.float32): "float", np.dtype(np.float64): "double"}
+
+
+def _ply_vertex_dtype(precision: type[np.floating]) -> np.dtype:
+    """Packed little-endian layout of one vertex: x y z nx ny nz red green blue."""
+    float_type = np.dtype(precision).newbyteorder("<")
+    return np.dtype(
+        [("position", float_type, 3), ("normal", float_type, 3), ("color", "u1", 3)]
+    )
+
+
+def _valid_depth(depth: NDArray[np.float32]) -> NDArray[np.bool_]:
+    return np.isfinite(depth) & (depth > 0)
+
+
+def _iter_array_bytes(array: NDArray, chunk_pixels: int) -> Iterator[bytes]:
+    """
+    The C-order bytes of an array, a few rows at a time, so views into the
+    interleaved frame buffer are never copied whole.
+    """
+    rows_per_chunk = max(1, chunk_pixels // array.shape[1])
+    for start in range(0, len(array), rows_per_chunk):
+        yield array[start : start + rows_per_chunk].tobytes()
+
+
+def _voxel_downsample(
+    vertices: NDArray[np.void], voxel_size: float
+) -> NDArray[np.void]:
+    """Merge the vertices in each voxel into one with their mean position, normal and color."""
+    voxels = np.floor(vertices["position"] / voxel_size).astype(np.int64)
+    voxels -= voxels.min(axis=0, initial=0)
+    extent = voxels.max(axis=0, initial=0) + 1
+
+    # Sorting one packed key per voxel is much faster than sorting coordinate rows
+    if np.prod(extent.astype(np.float64)) < 2**62:
+        keys = (voxels[:, 0] * extent[1] + voxels[:, 1]) * extent[2] + voxels[:, 2]
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    else:
+        _, inverse, counts = np.unique(
+            voxels, axis=0, return_inverse=True, return_counts=True
+        )
+    inverse = inverse.reshape(-1)
+
+    def mean(field: str) -> NDArray[np.float64]:
+        values = vertices[field]
+        sums = [
+            np.bincount(inverse, weights=values[:, axis], minlength=len(counts))
+            for axis in range(3)
+        ]
+        return np.stack(sums, axis=-1) / counts[:, np.newaxis]
+
+    merged = np.empty(len(counts), dtype=vertices.dtype)
+    merged["position"] = mean("position")
+    normals = mean("normal")
+    lengths = np.linalg.norm(normals, axis=-1, keepdims=True)
+    merged["normal"] = np.divide(normals, lengths, out=normals, where=lengths > 0)
+    merged["color"] = np.rint(mean("color"))
+    return merged
+
+
+def _ply_header(count: int, precision: type[np.floating]) -> bytes:
+    float_name = _PLY_FLOAT_TYPES[np.dtype(precision)]
+    properties = [f"{float_name} {name}" for name in ("x", "y", "z", "nx", "ny", "nz")]
+    properties += [f"uchar {name}" for name in ("red", "green", "blue")]
+    lines = [
+        "ply",
+        "format binary_little_endian 1.0",
+        f"element vertex {count}",
+        *(f"property {p}" for p in properties),
+        "end_header",
+    ]
+    return ("\n".join(lines) + "\n").encode("ascii")
+
+
+def _to_8bit(
+    image: NDArray[np.float32], low: float = 0.0, high: float = 1.0
+) -> NDArray[np.uint8]:
+    """Quantize a floating-point image with values in [low, high] to 8 bits."""
+    # Clip into one float32 temporary and scale that in place
+    scaled = np.clip(image, low, high)
+    scaled -= low
+    scaled *= 255 / (high - low)
+    return scaled.astype(np.uint8)
+
+
+def _to_16bit_depth(depth: NDArray[np.float32], scale: float) -> NDArray[np.uint16]:
+    """Depth in steps of 1/scale units, 0 where it is unknown or out of range."""
+    # Scale and round in one float32 temporary
+    scaled = np.multiply(depth, np.float32(scale), dtype=np.float32)
+    np.rint(scaled, out=scaled)
+    # Comparisons with NaN are false, so NaN depths are zeroed as well
+    scaled[~((scaled > 0) & (scaled <= np.iinfo(np.uint16).max))] = 0
+    return scaled.astype(np.uint16)
+
+
+def _to_8bit_png(
+    image: NDArray[np.float32], low: float = 0.0, high: float = 1.0
+) -> bytes:
+    """Convert a floating-point image with values in [low, high] to 8-bit PNG bytes."""
+    return ImageEncoding().encode(_to_8bit(image, low, high))
+
+
+def archive_files(files: dict[str, bytes]) -> bytes:
+    """Bundle encoded files into one uncompressed ZIP archive."""
+    # PNG is already compressed, so storing avoids compressing twice
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return archive.getvalue()
+
+
+# Bytes of ray grids kept for reuse, enough for the grid of one 4K camera
+RAY_GRID_CACHE_BYTES = 128 * 2**20
+
+
+class _RayGridCache:
+    """
+    x and y of the ray through every pixel at unit depth, as (height, width, 2)
+    grids. Cameras rarely change between renders, so grids are kept in an LRU
+    bounded by their total size and shared by all frames of the same size and
+    intrinsics. Frames are converted on several threads at once.
+    """
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._grids: OrderedDict[tuple, NDArray[np.float32]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, width: int, height: int, fx: float, fy: float, cx: float, cy: float
+    ) -> NDArray[np.float32]:
+        key = (width, height, fx, fy, cx, cy)
+        with self._lock:
+            grid = self._grids.get(key)
+            if grid is not None:
+                self.hits += 1
+                self._grids.move_to_end(key)
+                return grid
+            self.misses += 1
+
+        grid = np.empty((height, width, 2), dtype=np.float32)
+        grid[..., 0] = (np.arange(width, dtype=np.float32) - cx) / fx
+        grid[..., 1] = ((np.arange(height, dtype=np.float32) - cy) / fy)[:, np.newaxis]
+
+        # Shared between frames, so make sure nobody writes to it
+        grid.flags.writeable = False
+        if grid.nbytes > self._max_bytes:
+            return grid
+
+        with self._lock:
+            if key not in self._grids:
+                self._grids[key] = grid
+                self._bytes += grid.nbytes
+            while self._bytes > self._max_bytes:
+                _, oldest = self._grids.popitem(last=False)
+                self._bytes -= oldest.nbytes
+        return grid
+
+    def clear(self):
+        with self._lock:
+            self._grids.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+_ray_grids = _RayGridCache(RAY_GRID_CACHE_BYTES)
+
+
+def _require[T](array: T | None, name: str) -> T:
+    if array is None:
+        raise ValueError(f"Frame was rendered without the {name} pass")
+    return array
 
 
 class Frame:
+    """
+    The passes of one render. Passes that were not rendered are None, and
+    encoding a product that needs them raises a ValueError.
+    """
+
     def __init__(
         self,
         camera: CameraLike,
-        depth: NDArray[np.float32],  # 2D array of floats (height, width)
-        normal: NDArray[np.float32],  # 2D array of (x,y,z) vectors (height, width, 3)
-        color: NDArray[np.float32],  # 2D array of (r,g,b) values (height, width, 3)
+        depth: NDArray[np.float32] | None,  # 2D array of floats (height, width)
+        normal: NDArray[np.float32] | None,  # 2D array of (x,y,z) vectors (h, w, 3)
+        color: NDArray[np.float32] | None,  # 2D array of (r,g,b) values (h, w, 3)
     ):
         self._camera = camera
         self._depth = depth
         self._normal = normal
         self._color = color
 
-    def _depth_to_positions(self) -> NDArray[np.float32]:
-        height, width = self._depth.shape
+    @classmethod
+    def allocate(
+        cls, camera: CameraLike, height: int, width: int, passes: list[RenderPass]
+    ) -> "Frame":
+        """
+        Create a frame whose passes are views into one interleaved float32 buffer
+        of shape (height, width, channels), to be filled in place.
+        """
+        layout = [render_pass for render_pass in RenderPass if render_pass in passes]
+        channels = sum(_PASS_CHANNELS[render_pass] for render_pass in layout)
+        buffer = np.empty((height, width, channels), dtype=np.float32)
+
+        views = {}
+        offset = 0
+        for render_pass in layout:
+            count = _PASS_CHANNELS[render_pass]
+            view = buffer[..., offset : offset + count]
+            views[render_pass] = view[..., 0] if count == 1 else view
+            offset += count
+
+        return cls(
+            camera,
+            views.get(RenderPass.DEPTH),
+            views.get(RenderPass.NORMAL),
+            views.get(RenderPass.COLOR),
+        )
+
+    @property
+    def camera(self) -> CameraLike:
+        return self._camera
+
+    @property
+    def depth(self) -> NDArray[np.float32] | None:
+        return self._depth
+
+    @property
+    def normal(self) -> NDArray[np.float32] | None:
+        return self._normal
+
+    @property
+    def color(self) -> NDArray[np.float32] | None:
+        return self._color
+
+    def get_pass(self, render_pass: RenderPass) -> NDArray[np.float32] | None:
+        arrays = {
+            RenderPass.DEPTH: self._depth,
+            RenderPass.NORMAL: self._normal,
+            RenderPass.COLOR: self._color,
+        }
+        return arrays[render_pass]
+
+    @property
+    def passes(self) -> list[RenderPass]:
+        """The passes this frame was rendered with."""
+        return [
+            render_pass
+            for render_pass in RenderPass
+            if self.get_pass(render_pass) is not None
+        ]
+
+    def has_passes(self, passes: Iterable[RenderPass]) -> bool:
+        return set(passes) <= set(self.passes)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            array.nbytes
+            for array in (self._depth, self._normal, self._color)
+            if array is not None
+        )
+
+    def _get_rays(self) -> NDArray[np.float32]:
+        """x and y of every pixel's ray at unit depth, from the camera intrinsics."""
+        height, width = _require(self._depth, "depth").shape
 
         # Get camera intrinsics if available
         fx = fy = cx = cy = None
@@ -55,59 +327,192 @@ class Frame:
         except (AttributeError, TypeError, ValueError):
             pass
 
-        # Use default intrinsics if not available or invalid
+        # Use default intrinsics if not available or invalid. The render script
+        # sets up cameras without intrinsics the same way.
         if fx is None or fy is None or cx is None or cy is None:
-            fx = fy = max(width, height)  # Reasonable default focal length
-            cx = width / 2.0
-            cy = height / 2.0
+            fx = fy = max(width, height)
+            cx = (width - 1) / 2.0
+            cy = (height - 1) / 2.0
+
+        return _ray_grids.get(width, height, fx, fy, cx, cy)
 
-        # Create coordinate grids
-        y_coords, x_coords = np.mgrid[0:height, 0:width]
+    def iter_npy(
+        self, render_pass: RenderPass, chunk_pixels: int = ARRAY_CHUNK_PIXELS
+    ) -> Iterator[bytes]:
+        """Encode a pass as a .npy file piece by piece: the header, then its rows."""
+        array = _require(self.get_pass(render_pass), render_pass)
+        header = BytesIO()
+        np.lib.format.write_array_header_1_0(
+            header, np.lib.format.header_data_from_array_1_0(array)
+        )
+        return itertools.chain(
+            [header.getvalue()], _iter_array_bytes(array, chunk_pixels)
+        )
 
-        # Convert pixel coordinates to 3D world coordinates
-        z = self._depth
-        x = (x_coords - cx) * z / fx
-        y = (y_coords - cy) * z / fy
+    def iter_raw(
+        self, render_pass: RenderPass, chunk_pixels: int = ARRAY_CHUNK_PIXELS
+    ) -> Iterator[bytes]:
+        """The bytes of a pass in C order, piece by piece."""
+        array = _require(self.get_pass(render_pass), render_pass)
+        return _iter_array_bytes(array, chunk_pixels)
 
-        # Stack into (height, width, 3) array of (x,y,z) positions
-        positions = np.stack([x, y, z], axis=-1).astype(np.float32)
-        return positions
+    def to_image_bytes(
+        self, render_pass: RenderPass, encoding: ImageEncoding | None = None
+    ) -> bytes:
+        """A pass quantized to 8 bits and encoded as an image, a PNG by default."""
+        image = _require(self.get_pass(render_pass), render_pass)
+        low, high = _PASS_RANGES[render_pass]
+        return (encoding or ImageEncoding()).encode(_to_8bit(image, low, high))
+
+    def to_depth_png16_bytes(
+        self, scale: float = DEPTH_PNG16_SCALE, encoding: ImageEncoding | None = None
+    ) -> bytes:
+        """
+        Depth as a 16-bit grayscale PNG of round(depth * scale). Pixels without a
+        depth, such as the background, or too far to fit are 0.
+        """
+        depth = _require(self._depth, "depth")
+        return (encoding or ImageEncoding()).encode(_to_16bit_depth(depth, scale))
 
     def to_depth_png_bytes(self) -> bytes:
-        return _to_8bit_png(self._depth)
+        return self.to_image_bytes(RenderPass.DEPTH)
 
     def to_normal_png_bytes(self) -> bytes:
-        normal = (self._normal + 1) / 2
-        return _to_8bit_png(normal)
+        return self.to_image_bytes(RenderPass.NORMAL)
 
     def to_color_png_bytes(self) -> bytes:
-        return _to_8bit_png(self._color)
+        return self.to_image_bytes(RenderPass.COLOR)
 
-    def to_pointcloud(self) -> o3d.geometry.PointCloud:
-        """Create and return an Open3D pointcloud initialized with points, normals, and colors."""
-        pointcloud = o3d.geometry.PointCloud()
+    def get_point_mask(
+        self, point_filter: PointCloudFilter | None = None
+    ) -> NDArray[np.bool_]:
+        """Pixels that become points: those with a valid depth that pass the filter."""
+        depth = _require(self._depth, "depth")
 
-        positions = self._depth_to_positions().reshape(-1, 3)
-        normals = self._normal.reshape(-1, 3)
-        colors = self._color.reshape(-1, 3)
+        # Pixels without a surface have no usable depth
+        mask = _valid_depth(depth)
+        if point_filter is None:
+            return mask
 
-        # Initialize the Open3D pointcloud with points, normals, and colors
-        pointcloud.points = o3d.utility.Vector3dVector(positions)
-        pointcloud.normals = o3d.utility.Vector3dVector(normals)
-        pointcloud.colors = o3d.utility.Vector3dVector(colors)
+        if point_filter.drop_background:
+            mask &= depth < BACKGROUND_DEPTH
+        if point_filter.min_depth is not None:
+            mask &= depth >= point_filter.min_depth
+        if point_filter.max_depth is not None:
+            mask &= depth <= point_filter.max_depth
+        if point_filter.stride > 1:
+            kept = mask[:: point_filter.stride, :: point_filter.stride].copy()
+            mask[:] = False
+            mask[:: point_filter.stride, :: point_filter.stride] = kept
+        return mask
 
-        return pointcloud
+    def to_ply_vertices(
+        self,
+        precision: type[np.floating] = np.float32,
+        rows: slice = slice(None),
+        mask: NDArray[np.bool_] | None = None,
+        rays: NDArray[np.float32] | None = None,
+    ) -> NDArray[np.void]:
+        """
+        Build the binary PLY vertex buffer for the given image rows, one record
+        per pixel in the rows' mask, with colors quantized to 8 bits. Without a
+        mask every pixel with a valid depth is a point. The rows' rays are looked
+        up when not given.
+        """
+        depth = _require(self._depth, "depth")[rows]
+        normals = _require(self._normal, "normal")[rows]
+        colors = _require(self._color, "color")[rows]
 
-    def to_ply_bytes(self) -> bytes:
-        """Export the pointcloud as PLY format bytes."""
-        pointcloud = self.to_pointcloud()
+        valid = _valid_depth(depth) if mask is None else mask
 
-        try:
-            temp_file = tempfile.NamedTemporaryFile(suffix=".ply", delete=False)
-            o3d.io.write_point_cloud(temp_file.name, pointcloud)
-            temp_file.seek(0)
-            ply_bytes = temp_file.read()
-            return ply_bytes
-        finally:
-            temp_file.close()
-            os.unlink(temp_file.name)
+        vertices = np.empty(np.count_nonzero(valid), dtype=_ply_vertex_dtype(precision))
+        if rays is None:
+            rays = self._get_rays()[rows]
+        valid_depth = depth[valid]
+        vertices["position"][:, :2] = rays[valid] * valid_depth[:, np.newaxis]
+        vertices["position"][:, 2] = valid_depth
+        vertices["normal"] = normals[valid]
+        color = np.clip(colors[valid], 0.0, 1.0)
+        color *= 255
+        vertices["color"] = color
+        return vertices
+
+    def iter_ply(
+        self,
+        precision: type[np.floating] = np.float32,
+        chunk_pixels: int = PLY_CHUNK_PIXELS,
+        point_filter: PointCloudFilter | None = None,
+    ) -> Iterator[bytes]:
+        """
+        Encode the pointcloud as a binary little-endian PLY piece by piece: the
+        header, then the vertices of about chunk_pixels pixels at a time, so
+        memory use does not grow with the resolution. Points are only computed
+        as the stream is read, so a streaming response does it off the event
+        loop.
+        """
+        # Check for missing passes now, before anything has been sent
+        depth = _require(self._depth, "depth")
+        _require(self._normal, "normal")
+        _require(self._color, "color")
+
+        def chunks() -> Iterator[bytes]:
+            mask = self.get_point_mask(point_filter)
+
+            if point_filter is not None and point_filter.voxel_size is not None:
+                # Voxels span chunks, so all points are merged at once
+                vertices = _voxel_downsample(
+                    self.to_ply_vertices(precision, mask=mask), point_filter.voxel_size
+                )
+                yield _ply_header(len(vertices), precision)
+                yield vertices.tobytes()
+                return
+
+            height, width = depth.shape
+            rows_per_chunk = max(1, chunk_pixels // width)
+            # Grids too large for the cache would otherwise be rebuilt per chunk
+            rays = self._get_rays()
+
+            yield _ply_header(int(np.count_nonzero(mask)), precision)
+            for start in range(0, height, rows_per_chunk):
+                rows = slice(start, start + rows_per_chunk)
+                vertices = self.to_ply_vertices(precision, rows, mask[rows], rays[rows])
+                yield vertices.tobytes()
+
+        return chunks()
+
+    def write_ply(
+        self,
+        stream: BinaryIO,
+        precision: type[np.floating] = np.float32,
+        point_filter: PointCloudFilter | None = None,
+    ):
+        """Write the pointcloud to a stream as a binary little-endian PLY."""
+        for chunk in self.iter_ply(precision, point_filter=point_filter):
+            stream.write(chunk)
+
+    def to_ply_bytes(
+        self,
+        precision: type[np.floating] = np.float32,
+        point_filter: PointCloudFilter | None = None,
+    ) -> bytes:
+        """Export the pointcloud as binary PLY bytes."""
+        return b"".join(self.iter_ply(precision, point_filter=point_filter))
+
+    def get_product_encoders(
+        self, products: list[FrameProduct]
+    ) -> dict[str, Callable[[], bytes]]:
+        """The encoder of each requested product, keyed by its file name."""
+        encoders = {
+            FrameProduct.COLORS: ("colors.png", self.to_color_png_bytes),
+            FrameProduct.DEPTH: ("depth.png", self.to_depth_png_bytes),
+            FrameProduct.NORMALS: ("normals.png", self.to_normal_png_bytes),
+            FrameProduct.POINTCLOUD: ("pointcloud.ply", self.to_ply_bytes),
+        }
+        return dict(encoders[product] for product in dict.fromkeys(products))
+
+    def to_product_files(self, products: list[FrameProduct]) -> dict[str, bytes]:
+        """Encode each requested product once, keyed by its file name."""
+        return {
+            name: encode()
+            for name, encode in self.get_product_encoders(products).items()
+        }
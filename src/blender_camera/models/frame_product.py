@@ -0,0 +1,8 @@
+from enum import StrEnum
+
+
+class FrameProduct(StrEnum):
+    COLORS = "colors"
+    DEPTH = "depth"
+    NORMALS = "normals"
+    POINTCLOUD = "pointcloud"
@@ -0,0 +1,58 @@
+from collections.abc import Callable
+from io import BytesIO
+from typing import Annotated, BinaryIO
+
+import numpy as np
+from numpy.typing import NDArray
+from PIL import Image
+from pydantic import BaseModel, Field, field_validator
+
+from blender_camera.models.image_format import ImageFormat
+
+# zlib level of PNGs: 0 stores the pixels as they are, 1 is the fastest
+# compression and 9 the smallest. Pillow's default.
+DEFAULT_COMPRESS_LEVEL = 6
+
+# Quality of JPEG and WebP previews, from 1 to 100
+DEFAULT_QUALITY = 90
+
+
+class ImageEncoding(BaseModel):
+    """Which format an 8-bit image is encoded to, and how."""
+
+    image_format: ImageFormat = ImageFormat.PNG
+    compress_level: Annotated[int, Field(ge=0, le=9)] = DEFAULT_COMPRESS_LEVEL
+    quality: Annotated[int, Field(ge=1, le=100)] = DEFAULT_QUALITY
+
+    @field_validator("image_format")
+    @classmethod
+    def _check_encoder(cls, image_format: ImageFormat) -> ImageFormat:
+        if image_format not in ENCODERS:
+            raise ValueError(f"{image_format} is not an 8-bit image format")
+        return image_format
+
+    def encode(self, image: NDArray[np.uint8] | NDArray[np.uint16]) -> bytes:
+        stream = BytesIO()
+        ENCODERS[self.image_format](Image.fromarray(image), stream, self)
+        return stream.getvalue()
+
+
+def _save_png(image: Image.Image, stream: BinaryIO, encoding: ImageEncoding):
+    image.save(stream, format="PNG", compress_level=encoding.compress_level)
+
+
+def _save_jpeg(image: Image.Image, stream: BinaryIO, encoding: ImageEncoding):
+    image.save(stream, format="JPEG", quality=encoding.quality)
+
+
+def _save_webp(image: Image.Image, stream: BinaryIO, encoding: ImageEncoding):
+    image.save(stream, format="WEBP", quality=encoding.quality)
+
+
+# Encoder of each 8-bit image format. Pillow releases the GIL while it
+# compresses, so encoders run in parallel on the stage executor's threads.
+ENCODERS: dict[ImageFormat, Callable[[Image.Image, BinaryIO, ImageEncoding], None]] = {
+    ImageFormat.PNG: _save_png,
+    ImageFormat.JPEG: _save_jpeg,
+    ImageFormat.WEBP: _save_webp,
+}
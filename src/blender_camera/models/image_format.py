@@ -0,0 +1,71 @@
+from enum import StrEnum
+
+
+class ImageFormat(StrEnum):
+    PNG = "png"  # 8-bit image, quantized and clipped
+    PNG16 = "png16"  # 16-bit depth PNG in steps of 1/depth_scale scene units
+    JPEG = "jpeg"  # 8-bit lossy image, for previews
+    WEBP = "webp"  # 8-bit lossy image, for previews
+    NPY = "npy"  # The float32 array as a NumPy .npy file
+    RAW = "raw"  # The float32 array's bytes, with its shape and dtype in headers
+
+    @property
+    def media_type(self) -> str:
+        return _MEDIA_TYPES[self]
+
+    @property
+    def is_array(self) -> bool:
+        """Whether the format holds the float32 array rather than an 8-bit image."""
+        return self in (ImageFormat.NPY, ImageFormat.RAW)
+
+    @property
+    def is_lossy(self) -> bool:
+        """Whether the format only approximates the 8-bit image."""
+        return self in (ImageFormat.JPEG, ImageFormat.WEBP)
+
+    @classmethod
+    def from_accept(cls, accept: str | None) -> "ImageFormat":
+        """
+        The format of the known media type with the highest q-value in an Accept
+        header, PNG if it names none. Ties go to the media type listed first,
+        and media types with q=0 are never picked. Lossy formats are never
+        negotiated: browsers list image/webp in the Accept header of every
+        image they load, so previews are only served when asked for by format.
+        """
+        # Several formats share a media type, the first one listed is picked
+        media_types: dict[str, ImageFormat] = {}
+        for image_format, media_type in _MEDIA_TYPES.items():
+            if not image_format.is_lossy:
+                media_types.setdefault(media_type, image_format)
+
+        best: ImageFormat | None = None
+        best_quality = 0.0
+        for value in (accept or "").split(","):
+            media_type, quality = _parse_accept_value(value)
+            if media_type in media_types and quality > best_quality:
+                best, best_quality = media_types[media_type], quality
+        return best or cls.PNG
+
+
+def _parse_accept_value(value: str) -> tuple[str, float]:
+    """The media type of one Accept header value and its q-value."""
+    media_type, *params = value.split(";")
+    quality = 1.0
+    for param in params:
+        name, _, q = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(q)
+            except ValueError:
+                quality = 0.0
+    return media_type.strip().lower(), quality
+
+
+_MEDIA_TYPES = {
+    ImageFormat.PNG: "image/png",
+    ImageFormat.PNG16: "image/png",
+    ImageFormat.JPEG: "image/jpeg",
+    ImageFormat.WEBP: "image/webp",
+    ImageFormat.NPY: "application/x-npy",
+    ImageFormat.RAW: "application/octet-stream",
+}
@@ -0,0 +1,6 @@
+from pydantic import BaseModel, PositiveInt
+
+
+class ImageSize(BaseModel):
+    width: PositiveInt
+    height: PositiveInt
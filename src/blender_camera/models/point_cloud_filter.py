@@ -0,0 +1,29 @@
+from typing import Self
+
+from pydantic import (
+    BaseModel,
+    NonNegativeFloat,
+    PositiveFloat,
+    PositiveInt,
+    model_validator,
+)
+
+
+class PointCloudFilter(BaseModel):
+    """Which pixels of a frame become points, and how finely points are kept."""
+
+    drop_background: bool = False  # Drop pixels whose ray hit nothing
+    min_depth: NonNegativeFloat | None = None
+    max_depth: PositiveFloat | None = None
+    stride: PositiveInt = 1  # Keep every stride-th pixel of every stride-th row
+    voxel_size: PositiveFloat | None = None  # Merge the points within each voxel
+
+    @model_validator(mode="after")
+    def _check_depth_range(self) -> Self:
+        if (
+            self.min_depth is not None
+            and self.max_depth is not None
+            and self.min_depth > self.max_depth
+        ):
+            raise ValueError("min_depth must not be greater than max_depth")
+        return self
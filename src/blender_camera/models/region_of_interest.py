@@ -0,0 +1,55 @@
+from pydantic import BaseModel, NonNegativeInt, PositiveInt
+
+from blender_camera.models.entities.camera import Camera
+from blender_camera.models.image_size import ImageSize
+
+
+class RegionOfInterest(BaseModel):
+    """A rectangle of pixels, with x and y the column and row of its top left."""
+
+    x: NonNegativeInt
+    y: NonNegativeInt
+    width: PositiveInt
+    height: PositiveInt
+
+    @classmethod
+    def parse(cls, value: str) -> "RegionOfInterest":
+        """Parse "x,y,width,height", raising ValueError if it is malformed."""
+        x, y, width, height = (int(part) for part in value.split(","))
+        return cls(x=x, y=y, width=width, height=height)
+
+    @classmethod
+    def split_rows(cls, image_size: ImageSize, count: int) -> list["RegionOfInterest"]:
+        """Split the image into `count` full-width bands of near equal height."""
+        bounds = [image_size.height * i // count for i in range(count + 1)]
+        return [
+            cls(x=0, y=top, width=image_size.width, height=bottom - top)
+            for top, bottom in zip(bounds, bounds[1:])
+        ]
+
+    def fits(self, image_size: ImageSize) -> bool:
+        return (
+            self.x + self.width <= image_size.width
+            and self.y + self.height <= image_size.height
+        )
+
+    def crop(self, camera: Camera) -> Camera:
+        """
+        A copy of the camera that only sees this region: the same focal length
+        with the principal point moved by the region's origin. The camera needs
+        intrinsics.
+        """
+        assert camera.camera_intrinsics is not None
+        intrinsics = camera.camera_intrinsics.model_copy(
+            update={
+                "cx": camera.camera_intrinsics.cx - self.x,
+                "cy": camera.camera_intrinsics.cy - self.y,
+            }
+        )
+        return camera.model_copy(
+            update={
+                "camera_intrinsics": intrinsics,
+                "image_size": ImageSize(width=self.width, height=self.height),
+            },
+            deep=True,
+        )
@@ -0,0 +1,26 @@
+from enum import StrEnum
+
+from blender_camera.models.frame_product import FrameProduct
+
+
+class RenderPass(StrEnum):
+    COLOR = "color"
+    NORMAL = "normal"
+    DEPTH = "depth"
+
+    @classmethod
+    def required_by(cls, products: list[FrameProduct]) -> list["RenderPass"]:
+        """Passes Blender has to write to encode all products, in a stable order."""
+        required = set()
+        for product in products:
+            required |= _PRODUCT_PASSES[product]
+        return [render_pass for render_pass in cls if render_pass in required]
+
+
+_PRODUCT_PASSES = {
+    FrameProduct.COLORS: {RenderPass.COLOR},
+    FrameProduct.DEPTH: {RenderPass.DEPTH},
+    FrameProduct.NORMALS: {RenderPass.NORMAL},
+    # Points carry their normal and color as well as their position
+    FrameProduct.POINTCLOUD: {RenderPass.DEPTH, RenderPass.NORMAL, RenderPass.COLOR},
+}
@@ -0,0 +1,55 @@
+from enum import StrEnum
+
+from pydantic import BaseModel
+
+from blender_camera.models.frame_product import FrameProduct
+
+
+class RenderSettings(BaseModel):
+    samples: int
+    max_bounces: int
+    adaptive_sampling: bool
+    adaptive_threshold: float
+    time_limit: float  # seconds per frame, 0 for no limit
+
+
+class RenderPreset(StrEnum):
+    PREVIEW = "preview"
+    GEOMETRY = "geometry"
+    FINAL = "final"
+
+    @property
+    def settings(self) -> RenderSettings:
+        return _PRESET_SETTINGS[self]
+
+    @classmethod
+    def default_for(cls, products: list[FrameProduct]) -> "RenderPreset":
+        # Depth and normals are exact after one sample, only colors need to converge
+        if FrameProduct.COLORS in products:
+            return cls.FINAL
+        return cls.GEOMETRY
+
+
+_PRESET_SETTINGS = {
+    RenderPreset.PREVIEW: RenderSettings(
+        samples=16,
+        max_bounces=4,
+        adaptive_sampling=True,
+        adaptive_threshold=0.1,
+        time_limit=2.0,
+    ),
+    RenderPreset.GEOMETRY: RenderSettings(
+        samples=1,
+        max_bounces=0,
+        adaptive_sampling=False,
+        adaptive_threshold=0.0,
+        time_limit=0.0,
+    ),
+    RenderPreset.FINAL: RenderSettings(
+        samples=128,
+        max_bounces=12,
+        adaptive_sampling=True,
+        adaptive_threshold=0.01,
+        time_limit=0.0,
+    ),
+}
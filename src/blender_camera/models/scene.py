@@ -3,8 +3,9 @@ from blender_camera.models.entity_model import EntityModel
 
 
 class Scene:
-    def __init__(self, id: str, blend_path: str):
+    def __init__(self, id: str, blend_path: str, blend_hash: str):
         self.id = id
         self.blend_path = blend_path
+        self.blend_hash = blend_hash
         self.entity_model = EntityModel()
         self.camera_model = CameraModel(self.entity_model)
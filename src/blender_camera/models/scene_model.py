@@ -1,10 +1,64 @@
+import asyncio
+import functools
+import hashlib
 import os
 import tempfile
+from collections.abc import AsyncIterable
+from io import BytesIO
+from typing import BinaryIO
 from uuid import uuid4
 
 from blender_camera.models.id import Id
 from blender_camera.models.scene import Scene
 
+# Bytes read and written at a time when a .blend file is copied into the store
+BLEND_CHUNK_BYTES = 1 << 20
+
+
+class BlendFileTooLargeError(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Blend file is larger than {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class _BlendWriter:
+    """
+    Writes a .blend file into the store as it arrives, hashing it on the way and
+    rejecting it as soon as it grows past max_bytes. Zero accepts any size.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.path = tempfile.NamedTemporaryFile(delete=False, suffix=".blend").name
+        self._file = open(self.path, "wb")
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._size = 0
+        self._max_bytes = max_bytes
+
+    def add(self, chunk: bytes) -> bool:
+        """Take a chunk, True once a whole chunk is buffered and should be written."""
+        self._size += len(chunk)
+        if self._max_bytes and self._size > self._max_bytes:
+            raise BlendFileTooLargeError(self._max_bytes)
+        self._hash.update(chunk)
+        self._buffer += chunk
+        return len(self._buffer) >= BLEND_CHUNK_BYTES
+
+    def flush(self):
+        """Write the buffered bytes. Blocks."""
+        self._file.write(self._buffer)
+        self._buffer.clear()
+
+    def close(self) -> str:
+        """Write what is left and close the file, returning its hash. Blocks."""
+        self.flush()
+        self._file.close()
+        return self._hash.hexdigest()
+
+    def discard(self):
+        self._file.close()
+        os.remove(self.path)
+
 
 class SceneModel:
     def __init__(self):
@@ -14,13 +68,49 @@ class SceneModel:
         return list(self._scenes.values())
 
     def create_scene(self, blend_bytes: bytes) -> Scene:
-        id = str(uuid4())
+        return self.create_scene_from_stream(BytesIO(blend_bytes))
+
+    def create_scene_from_stream(self, stream: BinaryIO, max_bytes: int = 0) -> Scene:
+        """
+        Copy a .blend file into the store chunk by chunk, hashing it on the way,
+        so only one chunk is in memory at a time. Blocks, so call it off the event
+        loop. A max_bytes of zero means files of any size are accepted.
+        """
+        writer = _BlendWriter(max_bytes)
+        try:
+            for chunk in iter(functools.partial(stream.read, BLEND_CHUNK_BYTES), b""):
+                if writer.add(chunk):
+                    writer.flush()
+            blend_hash = writer.close()
+        except BaseException:
+            writer.discard()
+            raise
 
-        blend_path = tempfile.NamedTemporaryFile(delete=False, suffix=".blend").name
-        with open(blend_path, "wb") as f:
-            f.write(blend_bytes)
+        return self._add_scene(writer.path, blend_hash)
 
-        self._scenes[id] = Scene(id, blend_path)
+    async def create_scene_from_chunks(
+        self, chunks: AsyncIterable[bytes], max_bytes: int = 0
+    ) -> Scene:
+        """
+        Write a .blend file into the store while it is received, such as an
+        upload, so it is rejected as soon as it grows past max_bytes and never
+        copied. Chunks are written off the event loop a whole chunk at a time.
+        """
+        writer = _BlendWriter(max_bytes)
+        try:
+            async for chunk in chunks:
+                if writer.add(chunk):
+                    await asyncio.to_thread(writer.flush)
+            blend_hash = await asyncio.to_thread(writer.close)
+        except BaseException:
+            writer.discard()
+            raise
+
+        return self._add_scene(writer.path, blend_hash)
+
+    def _add_scene(self, blend_path: str, blend_hash: str) -> Scene:
+        id = str(uuid4())
+        self._scenes[id] = Scene(id, blend_path, blend_hash)
         return self._scenes[id]
 
     def get_scene(self, scene_id: Id) -> Scene | None:
@@ -0,0 +1,104 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+
+class RenderQueueFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Render queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RenderScheduler:
+    """Limits concurrent renders and rejects new ones once the wait queue is full."""
+
+    def __init__(self, max_concurrent: int, max_queued: int):
+        self._max_concurrent = max_concurrent
+        self._max_queued = max_queued
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+        self._running = 0
+        self._queued = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+        self._render_seconds_avg = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self._queued >= self._max_queued:
+            self._rejected += 1
+            raise RenderQueueFullError(self._retry_after())
+
+        queued_at = time.monotonic()
+        self._queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+
+        started_at = time.monotonic()
+        wait_seconds = started_at - queued_at
+        self._admitted += 1
+        self._wait_seconds_total += wait_seconds
+        self._wait_seconds_max = max(self._wait_seconds_max, wait_seconds)
+
+        self._running += 1
+        try:
+            yield
+        finally:
+            self._running -= 1
+            self._semaphore.release()
+            self._record_render_seconds(time.monotonic() - started_at)
+
+    @asynccontextmanager
+    async def extra_slots(self, wanted: int):
+        """
+        Take up to `wanted` more slots for a render that holds one already,
+        without waiting. Slots that queued renders wait for are left to them.
+        Yields how many slots were taken.
+        """
+        taken = 0
+        while taken < wanted and not self._semaphore.locked() and not self._queued:
+            # Returns at once, the semaphore is not locked
+            await self._semaphore.acquire()
+            taken += 1
+
+        self._running += taken
+        try:
+            yield taken
+        finally:
+            self._running -= taken
+            for _ in range(taken):
+                self._semaphore.release()
+
+    def get_metrics(self) -> dict:
+        return {
+            "max_concurrent": self._max_concurrent,
+            "max_queued": self._max_queued,
+            "running": self._running,
+            "queued": self._queued,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "wait_seconds_avg": (
+                self._wait_seconds_total / self._admitted if self._admitted else 0.0
+            ),
+            "wait_seconds_max": self._wait_seconds_max,
+            "render_seconds_avg": self._render_seconds_avg,
+        }
+
+    def _record_render_seconds(self, seconds: float):
+        # Exponential moving average so the estimate follows the current workload
+        if self._render_seconds_avg == 0.0:
+            self._render_seconds_avg = seconds
+        else:
+            self._render_seconds_avg = 0.8 * self._render_seconds_avg + 0.2 * seconds
+
+    def _retry_after(self) -> int:
+        """Estimate how long until the current queue has drained."""
+        pending = self._running + self._queued
+        return max(
+            1, math.ceil(self._render_seconds_avg * pending / self._max_concurrent)
+        )
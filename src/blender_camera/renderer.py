@@ -0,0 +1,273 @@
+import asyncio
+import hashlib
+import json
+import math
+from collections.abc import AsyncGenerator
+
+from blender_camera.blender import Blender, BlenderWorkerPool
+from blender_camera.disk_frame_cache import DiskFrameCache
+from blender_camera.frame_cache import FrameCache
+from blender_camera.models.entities.camera import Camera, CameraLike
+from blender_camera.models.frame import Frame
+from blender_camera.models.id import Id
+from blender_camera.models.pose import Pose
+from blender_camera.models.render_pass import RenderPass
+from blender_camera.models.render_preset import RenderPreset
+from blender_camera.models.scene import Scene
+from blender_camera.render_scheduler import RenderScheduler
+from blender_camera.scripts.render_frame_script import (
+    RenderFrameScript,
+    RenderTransport,
+)
+from blender_camera.single_flight import SingleFlight
+from blender_camera.stage_executor import StageExecutor
+
+# Bumped when rendered passes change meaning, so frames in a persistent disk
+# cache from an older version are not served. 2: depth is raw Z in scene units.
+_RENDER_FORMAT_VERSION = 2
+
+
+def _render_key(scene: Scene, camera: CameraLike, preset: RenderPreset) -> str:
+    """
+    Identify a render by the content of everything that affects its output.
+    Passes are left out, so a frame with more passes can serve a request for
+    fewer of them.
+    """
+    camera_state = camera.model_dump(exclude={"id"})
+    key = json.dumps(
+        {
+            "version": _RENDER_FORMAT_VERSION,
+            "blend": scene.blend_hash,
+            "camera": camera_state,
+            "settings": preset.settings.model_dump(),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class Renderer:
+    def __init__(
+        self,
+        scheduler: RenderScheduler,
+        cache: FrameCache,
+        disk_cache: DiskFrameCache | None,
+        executor: StageExecutor,
+        pool_size: int,
+        idle_timeout: float,
+        tile_pixels: int,
+        transport: RenderTransport,
+    ):
+        self._scheduler = scheduler
+        self._cache = cache
+        self._disk_cache = disk_cache
+        self._executor = executor
+        self._pool_size = pool_size
+        self._idle_timeout = idle_timeout
+        self._tile_pixels = tile_pixels
+        self._transport = transport
+        self._pools: dict[Id, BlenderWorkerPool] = {}
+        self._single_flight = SingleFlight[Frame]()
+
+    async def render(
+        self,
+        scene: Scene,
+        camera: CameraLike,
+        preset: RenderPreset,
+        passes: list[RenderPass],
+    ) -> Frame:
+        key = _render_key(scene, camera, preset)
+        frame = self._cache.get(key, camera.id, passes)
+        if frame is not None:
+            return frame
+
+        async def load_or_render() -> Frame:
+            frames = await self._load_or_render(scene, {key: camera}, preset, passes)
+            return frames[key]
+
+        # Concurrent requests for the same view share one render instead of
+        # queueing several, as long as it renders every pass they need
+        flight_key = self._find_flight(key, passes) or (key, tuple(passes))
+        return await self._single_flight.do(flight_key, load_or_render)
+
+    async def render_batch(
+        self,
+        scene: Scene,
+        cameras: list[CameraLike],
+        preset: RenderPreset,
+        passes: list[RenderPass],
+    ) -> list[Frame]:
+        """Render several cameras, rendering all cache misses in one Blender run."""
+        keys = [_render_key(scene, camera, preset) for camera in cameras]
+
+        frames: dict[str, Frame] = {}
+        missing: dict[str, CameraLike] = {}
+        for key, camera in zip(keys, cameras):
+            if key in frames or key in missing:
+                continue
+            frame = self._cache.get(key, camera.id, passes)
+            if frame is not None:
+                frames[key] = frame
+            else:
+                missing[key] = camera
+
+        if missing:
+            frames.update(await self._load_or_render(scene, missing, preset, passes))
+        return [frames[key] for key in keys]
+
+    async def render_trajectory(
+        self,
+        scene: Scene,
+        camera: CameraLike,
+        poses: list[Pose],
+        preset: RenderPreset,
+        passes: list[RenderPass],
+    ) -> AsyncGenerator[Frame, None]:
+        """
+        Render the camera at each pose as consecutive frames of one Blender run,
+        yielding every frame as soon as it is written. Trajectories are generated
+        once as datasets, so they bypass the frame caches.
+        """
+        cameras = [
+            camera.model_copy(update={"pose": pose}, deep=True) for pose in poses
+        ]
+
+        async with self._scheduler.slot():
+            render_frame_script = RenderFrameScript(
+                self._get_blender(scene), self._executor, self._transport
+            )
+            frames = render_frame_script.execute_stream(
+                cameras, preset.settings, passes
+            )
+            async for frame in frames:
+                yield frame
+
+    def invalidate_entity(self, scene_id: Id, entity_id: Id):
+        self._cache.invalidate_entity(scene_id, entity_id)
+
+    def get_metrics(self) -> dict:
+        return {
+            "scheduler": self._scheduler.get_metrics(),
+            "single_flight": self._single_flight.get_metrics(),
+            "cache": self._cache.get_metrics(),
+            "disk_cache": (
+                self._disk_cache.get_metrics() if self._disk_cache else None
+            ),
+        }
+
+    async def close_scene(self, scene_id: Id):
+        self._cache.invalidate_scene(scene_id)
+        pool = self._pools.pop(scene_id, None)
+        if pool is not None:
+            await pool.close()
+
+    async def close(self):
+        for scene_id in list(self._pools):
+            await self.close_scene(scene_id)
+
+    async def _load_or_render(
+        self,
+        scene: Scene,
+        cameras: dict[str, CameraLike],
+        preset: RenderPreset,
+        passes: list[RenderPass],
+    ) -> dict[str, Frame]:
+        frames: dict[str, Frame] = {}
+        if self._disk_cache is not None:
+            for key in cameras:
+                frame = await asyncio.to_thread(self._disk_cache.get, key, passes)
+                if frame is not None:
+                    frames[key] = frame
+
+        missing = [key for key in cameras if key not in frames]
+        if missing:
+            rendered = await self._render(
+                scene, [cameras[key] for key in missing], preset, passes
+            )
+            for key, frame in zip(missing, rendered):
+                frames[key] = frame
+                if self._disk_cache is not None:
+                    await asyncio.to_thread(self._disk_cache.put, key, frame)
+
+        for key, frame in frames.items():
+            self._cache.put(key, frame, scene.id, cameras[key].id)
+        return frames
+
+    def _find_flight(
+        self, key: str, passes: list[RenderPass]
+    ) -> tuple[str, tuple[RenderPass, ...]] | None:
+        """An in-flight render of the same view with at least the given passes."""
+        for flight_key in self._single_flight.keys():
+            # Renders are the only calls in flight, keyed by _render_key and passes
+            assert isinstance(flight_key, tuple)
+            flight_render_key, flight_passes = flight_key
+            if flight_render_key == key and set(passes) <= set(flight_passes):
+                return flight_render_key, flight_passes
+        return None
+
+    async def _render(
+        self,
+        scene: Scene,
+        cameras: list[CameraLike],
+        preset: RenderPreset,
+        passes: list[RenderPass],
+    ) -> list[Frame]:
+        # Render snapshots so later pose or intrinsics changes cannot leak into
+        # the frames while they are rendering or sitting in the cache
+        cameras = [camera.model_copy(deep=True) for camera in cameras]
+
+        async with self._scheduler.slot():
+            render_frame_script = RenderFrameScript(
+                self._get_blender(scene), self._executor, self._transport
+            )
+
+            # Every tile after the first needs a scheduler slot of its own
+            tiles = self._get_tile_count(scene, cameras)
+            async with self._scheduler.extra_slots(tiles - 1) as extra_slots:
+                if extra_slots > 0:
+                    assert isinstance(cameras[0], Camera)
+                    frame = await render_frame_script.execute_tiled(
+                        cameras[0], 1 + extra_slots, preset.settings, passes
+                    )
+                    return [frame]
+
+                return await render_frame_script.execute_batch(
+                    cameras, preset.settings, passes
+                )
+
+    def _get_tile_count(self, scene: Scene, cameras: list[CameraLike]) -> int:
+        """
+        Split a single large frame into bands of about `tile_pixels` pixels,
+        but only across Blender workers that are free right now. Tiles only
+        render in parallel as far as the scheduler has slots free for them.
+        """
+        if self._tile_pixels <= 0 or len(cameras) != 1:
+            return 1
+        camera = cameras[0]
+        if (
+            not isinstance(camera, Camera)
+            or camera.camera_intrinsics is None
+            or camera.image_size is None
+        ):
+            return 1
+
+        width, height = camera.image_size.width, camera.image_size.height
+        wanted = math.ceil(width * height / self._tile_pixels)
+
+        tiles = min(wanted, height)
+        pool = self._pools.get(scene.id)
+        if pool is not None:
+            tiles = min(tiles, pool.free_workers)
+
+        return max(1, tiles)
+
+    def _get_blender(self, scene: Scene) -> Blender | BlenderWorkerPool:
+        # A pool size of zero disables warm workers and starts Blender per render
+        if self._pool_size <= 0:
+            return Blender(scene.blend_path)
+
+        if scene.id not in self._pools:
+            self._pools[scene.id] = BlenderWorkerPool(
+                scene.blend_path, self._pool_size, self._idle_timeout
+            )
+        return self._pools[scene.id]
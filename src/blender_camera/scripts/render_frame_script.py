@@ -1,118 +1,165 @@
+import asyncio
+import json
 import os
 import shutil
 import tempfile
+from collections.abc import AsyncIterator
+from enum import StrEnum
 
 import Imath
 import numpy as np
 import OpenEXR
+from loguru import logger
+from numpy.typing import NDArray
 
-from blender_camera.blender import Blender
-from blender_camera.models.entities.camera import CameraLike
+from blender_camera.blender import Blender, BlenderWorkerPool
+from blender_camera.models.entities.camera import Camera, CameraLike
 from blender_camera.models.frame import Frame
+from blender_camera.models.region_of_interest import RegionOfInterest
+from blender_camera.models.render_pass import RenderPass
+from blender_camera.models.render_preset import RenderSettings
+from blender_camera.stage_executor import StageExecutor
 
 FLOAT = Imath.PixelType(Imath.PixelType.FLOAT)
 
 
-def _write_tmp_state(camera: CameraLike) -> str:
-    """Saves camera data to a temporary JSON file and returns the file path."""
-    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".json")
-    with open(tmp_file.name, "w") as f:
-        f.write(camera.model_dump_json())
-    return tmp_file.name
-
-
-def _convert_depth_exr_to_np(path: str) -> np.ndarray:  # Read depth EXR
-    depth_file = OpenEXR.InputFile(path)
-    depth_header = depth_file.header()
+# Shared memory keeps the EXRs in RAM, they are never flushed to disk
+SHM_DIRECTORY = "/dev/shm"
 
-    # Get the data window (the actual image bounds)
-    dw = depth_header["dataWindow"]
-    width = dw.max.x - dw.min.x + 1
-    height = dw.max.y - dw.min.y + 1
+# Image size assumed for cameras without one, which render at the resolution
+# of their .blend
+_DEFAULT_FRAME_PIXELS = 1920 * 1080
 
-    # Get available channels in depth file
-    available_channels = depth_header["channels"].keys()
 
-    # Try common depth channel names
-    depth_channel = None
-    for channel_name in ["Z", "Depth", "R", "G", "B", "A"]:
-        if channel_name in available_channels:
-            depth_channel = channel_name
-            break
+class RenderTransport(StrEnum):
+    """Where render jobs and frames are exchanged with Blender."""
 
-    if depth_channel is None:
-        # If no depth channel found, use the first available channel
-        depth_channel = list(available_channels)[0] if available_channels else "R"
+    FILE = "file"
+    SHM = "shm"
 
-    depth_data = depth_file.channel(depth_channel, FLOAT)
-    return np.frombuffer(depth_data, dtype=np.float32).reshape((height, width))
+    @property
+    def directory(self) -> str | None:
+        return SHM_DIRECTORY if self is RenderTransport.SHM else None
 
+    def check(self, max_concurrent: int) -> "RenderTransport":
+        """
+        The transport to render with. Shared memory needs room for a full HD
+        frame with every pass per concurrent render, Docker only gives
+        containers 64 MB of it unless they run with --shm-size. Falls back to
+        files when it is missing or too small.
+        """
+        directory = self.directory
+        if directory is None:
+            return self
+        if not os.path.isdir(directory) or not os.access(directory, os.W_OK):
+            logger.warning(
+                f"[render] {directory} is not a writable directory, "
+                "exchanging frames through files"
+            )
+            return RenderTransport.FILE
+
+        required = max_concurrent * _exr_bytes(_DEFAULT_FRAME_PIXELS, None)
+        free = shutil.disk_usage(directory).free
+        if free < required:
+            logger.warning(
+                f"[render] {directory} has {free // 2**20} MB free but "
+                f"{max_concurrent} concurrent renders need {required // 2**20} MB, "
+                "exchanging frames through files. Raise the size of the shared "
+                "memory, e.g. with docker run --shm-size."
+            )
+            return RenderTransport.FILE
+        return self
 
-def _convert_normal_exr_to_np(path: str) -> np.ndarray:
-    normal_file = OpenEXR.InputFile(path)
-    normal_header = normal_file.header()
 
-    # Get the data window (the actual image bounds)
-    dw = normal_header["dataWindow"]
-    width = dw.max.x - dw.min.x + 1
-    height = dw.max.y - dw.min.y + 1
+def _exr_bytes(pixels: int, passes: list[RenderPass] | None) -> int:
+    """Size of an uncompressed float32 EXR with the passes, all if None."""
+    channels = sum(
+        len(_EXR_CHANNELS[render_pass]) for render_pass in passes or RenderPass
+    )
+    return pixels * channels * 4
+
+
+def _job_exr_bytes(cameras: list[CameraLike], passes: list[RenderPass] | None) -> int:
+    """Size of the EXRs Blender writes for a render job."""
+    pixels = 0
+    for camera in cameras:
+        image_size = camera.image_size if isinstance(camera, Camera) else None
+        if image_size is None:
+            pixels += _DEFAULT_FRAME_PIXELS
+        else:
+            pixels += image_size.width * image_size.height
+    return _exr_bytes(pixels, passes)
+
+
+def _write_tmp_state(
+    cameras: list[CameraLike],
+    settings: RenderSettings | None = None,
+    passes: list[RenderPass] | None = None,
+    tmp_dir: str | None = None,
+) -> str:
+    """Saves the render job to a temporary JSON file and returns the file path."""
+    job: dict = {"cameras": [camera.model_dump(mode="json") for camera in cameras]}
+    if settings is not None:
+        job["settings"] = settings.model_dump()
+    if passes is not None:
+        job["passes"] = passes
+    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".json", dir=tmp_dir)
+    with open(tmp_file.name, "w") as f:
+        json.dump(job, f)
+    return tmp_file.name
 
-    NX = normal_file.channel("X", FLOAT)
-    NY = normal_file.channel("Y", FLOAT)
-    NZ = normal_file.channel("Z", FLOAT)
-    nx = np.frombuffer(NX, dtype=np.float32).reshape((height, width))
-    ny = np.frombuffer(NY, dtype=np.float32).reshape((height, width))
-    nz = np.frombuffer(NZ, dtype=np.float32).reshape((height, width))
-    normals = np.stack([nx, ny, nz], axis=-1)
 
-    return -normals
+# Channels of each pass in the multilayer EXR written by render_frame.py
+_EXR_CHANNELS = {
+    RenderPass.DEPTH: ("depth.V",),
+    RenderPass.NORMAL: ("normal.X", "normal.Y", "normal.Z"),
+    RenderPass.COLOR: ("color.R", "color.G", "color.B"),
+}
 
 
-def _convert_color_exr_to_np(path: str) -> np.ndarray:
-    """Convert EXR file to PNG format and return as bytes."""
-    # Open the EXR file
+def _read_exr_frame(path: str, camera: CameraLike, passes: list[RenderPass]) -> Frame:
+    """Read the channels of the given passes from a multilayer EXR in one call."""
     exr_file = OpenEXR.InputFile(path)
-    header = exr_file.header()
-
-    # Get the data window (the actual image bounds)
-    dw = header["dataWindow"]
-    width = dw.max.x - dw.min.x + 1
-    height = dw.max.y - dw.min.y + 1
-
-    # Read the RGB channels
-    FLOAT = Imath.PixelType(Imath.PixelType.FLOAT)
-    (R, G, B) = exr_file.channels("RGB", FLOAT)
-
-    # Convert to numpy arrays
-    r = np.frombuffer(R, dtype=np.float32).reshape((height, width))
-    g = np.frombuffer(G, dtype=np.float32).reshape((height, width))
-    b = np.frombuffer(B, dtype=np.float32).reshape((height, width))
-
-    # Stack the channels and convert to 8-bit
-    return np.stack([r, g, b], axis=-1)
-
-
-def _convert_world_to_camera_normals(
-    normals: np.ndarray, camera: CameraLike
-) -> np.ndarray:
-    """Convert world-space normals to camera-space normals.
+    try:
+        # Get the data window (the actual image bounds)
+        dw = exr_file.header()["dataWindow"]
+        width = dw.max.x - dw.min.x + 1
+        height = dw.max.y - dw.min.y + 1
+
+        names = [name for render_pass in passes for name in _EXR_CHANNELS[render_pass]]
+        channels = exr_file.channels(names, FLOAT)
+    finally:
+        exr_file.close()
+
+    # Copy every channel straight into its slot of the frame buffer
+    frame = Frame.allocate(camera, height, width, passes)
+    for render_pass in passes:
+        array = frame.get_pass(render_pass)
+        assert array is not None
+        if array.ndim == 2:
+            array = array[..., np.newaxis]
+        for index in range(len(_EXR_CHANNELS[render_pass])):
+            plane = np.frombuffer(channels.pop(0), dtype=np.float32)
+            array[..., index] = plane.reshape((height, width))
+    return frame
+
+
+def _convert_world_to_camera_normals(normals: np.ndarray, camera: CameraLike):
+    """Rotate world-space normals into camera space, in place.
 
     Args:
         normals: World-space normal vectors as (height, width, 3) array
         camera: Camera with pose containing [x, y, z, rx, ry, rz] where
                 rx, ry, rz are angle-axis rotation components
-
-    Returns:
-        Camera-space normal vectors as (height, width, 3) array
     """
     rx, ry, rz = camera.pose[3], camera.pose[4], camera.pose[5]
 
     # Calculate rotation angle from angle-axis representation
     angle = np.sqrt(rx * rx + ry * ry + rz * rz)
 
-    # If no rotation, return normals unchanged
+    # If no rotation, leave normals unchanged
     if angle < 1e-8:
-        return normals
+        return
 
     # Normalize axis
     axis = np.array([rx, ry, rz]) / angle
@@ -127,53 +174,185 @@ def _convert_world_to_camera_normals(
     identity = np.eye(3)
     R = identity + np.sin(angle) * K + (1 - np.cos(angle)) * np.dot(K, K)
 
-    # For transforming normals from world to camera space, we need the inverse rotation
-    # Since rotation matrices are orthogonal, R^-1 = R^T
-    R_inv = R.T
+    # normals_camera = R^T @ normals_world, i.e. normals_world @ R for row vectors.
+    # Keep the matrix float32 so the product is not promoted to float64.
+    R = R.astype(np.float32)
 
-    # Reshape normals to (N, 3) for matrix multiplication
-    original_shape = normals.shape
-    normals_flat = normals.reshape(-1, 3)
+    # Rotate a row at a time, so the temporary products stay small
+    for row in normals:
+        row[...] = row @ R
 
-    # Apply rotation to each normal vector
-    # normals_camera = R_inv @ normals_world
-    normals_transformed = np.dot(normals_flat, R_inv.T)
 
-    # Reshape back to original shape
-    return normals_transformed.reshape(original_shape)
+def _stitch_rows(camera: CameraLike, tiles: list[Frame]) -> Frame:
+    """Join frames of full-width bands, top to bottom, into one frame."""
+    passes = tiles[0].passes
+    bands: dict[RenderPass, list[NDArray[np.float32]]] = {
+        render_pass: [] for render_pass in passes
+    }
+    for tile in tiles:
+        for render_pass in passes:
+            band = tile.get_pass(render_pass)
+            assert band is not None, "tiles are rendered with the same passes"
+            bands[render_pass].append(band)
+
+    # Tiles span the full width, so only their heights differ
+    first = bands[passes[0]]
+    height = sum(band.shape[0] for band in first)
+
+    frame = Frame.allocate(camera, height, first[0].shape[1], passes)
+    for render_pass in passes:
+        out = frame.get_pass(render_pass)
+        assert out is not None, "allocated with every pass above"
+        np.concatenate(bands[render_pass], axis=0, out=out)
+    return frame
+
+
+def _read_frame(
+    camera: CameraLike, path: str, passes: list[RenderPass] | None = None
+) -> Frame:
+    """Decode the given passes of the frame, all of them if passes is None."""
+    if passes is None:
+        passes = list(RenderPass)
+
+    frame = _read_exr_frame(os.path.join(path, "frame_0001.exr"), camera, passes)
+
+    if frame.normal is not None:
+        # Blender's normals point into the surface
+        np.negative(frame.normal, out=frame.normal)
+        _convert_world_to_camera_normals(frame.normal, camera)
+
+    return frame
 
 
 class RenderFrameScript:
-    def __init__(self, blender: Blender):
+    def __init__(
+        self,
+        blender: Blender | BlenderWorkerPool,
+        executor: StageExecutor | None = None,
+        transport: RenderTransport = RenderTransport.FILE,
+    ):
         self._blender = blender
-
-    async def execute(self, camera: CameraLike) -> Frame:
-        input_path = _write_tmp_state(camera)
-        output_path = tempfile.TemporaryDirectory(delete=False).name
+        self._executor = executor
+        self._transport = transport
+
+    async def execute(
+        self,
+        camera: CameraLike,
+        settings: RenderSettings | None = None,
+        passes: list[RenderPass] | None = None,
+    ) -> Frame:
+        frames = await self.execute_batch([camera], settings, passes)
+        return frames[0]
+
+    async def execute_batch(
+        self,
+        cameras: list[CameraLike],
+        settings: RenderSettings | None = None,
+        passes: list[RenderPass] | None = None,
+    ) -> list[Frame]:
+        """Render all cameras in one Blender run, returning frames in input order."""
+        tmp_dir = self._get_tmp_dir(cameras, passes)
+        input_path = _write_tmp_state(cameras, settings, passes, tmp_dir)
+        output_path = tempfile.TemporaryDirectory(delete=False, dir=tmp_dir).name
 
         try:
-            await self._blender.run(
-                "--python",
-                "src/scripts/render_frame.py",
-                "--",
-                "--input_path",
-                input_path,
-                "--output_path",
-                output_path,
+            await self._blender.render_frame(input_path, output_path)
+
+            return await asyncio.gather(
+                *(
+                    self._read_frame(
+                        camera, os.path.join(output_path, str(index)), passes
+                    )
+                    for index, camera in enumerate(cameras)
+                )
             )
+        finally:
+            os.remove(input_path)
+            shutil.rmtree(output_path)
 
-            color_path = os.path.join(output_path, "frame_color_0001.exr")
-            depth_path = os.path.join(output_path, "frame_depth_0001.exr")
-            normal_path = os.path.join(output_path, "frame_normal_0001.exr")
-
-            return Frame(
-                camera,
-                _convert_depth_exr_to_np(depth_path),
-                _convert_world_to_camera_normals(
-                    _convert_normal_exr_to_np(normal_path), camera
-                ),
-                _convert_color_exr_to_np(color_path),
-            )
+    async def execute_tiled(
+        self,
+        camera: Camera,
+        tiles: int,
+        settings: RenderSettings | None = None,
+        passes: list[RenderPass] | None = None,
+    ) -> Frame:
+        """
+        Render the camera as `tiles` horizontal bands in parallel Blender runs
+        and stitch them into one frame. The camera needs intrinsics and an
+        image size.
+        """
+        assert camera.image_size is not None
+        bands = RegionOfInterest.split_rows(camera.image_size, tiles)
+        frames = await asyncio.gather(
+            *(self.execute(band.crop(camera), settings, passes) for band in bands)
+        )
+        return _stitch_rows(camera, frames)
+
+    async def execute_stream(
+        self,
+        cameras: list[CameraLike],
+        settings: RenderSettings | None = None,
+        passes: list[RenderPass] | None = None,
+    ) -> AsyncIterator[Frame]:
+        """Render all cameras in one Blender run, yielding each frame once written."""
+        tmp_dir = self._get_tmp_dir(cameras, passes)
+        input_path = _write_tmp_state(cameras, settings, passes, tmp_dir)
+        output_path = tempfile.TemporaryDirectory(delete=False, dir=tmp_dir).name
+
+        # Receives the index of every written frame, then None once Blender is done
+        written: asyncio.Queue[int | None] = asyncio.Queue()
+        render = asyncio.create_task(
+            self._blender.render_frame(input_path, output_path, written.put_nowait)
+        )
+        render.add_done_callback(lambda _: written.put_nowait(None))
+
+        try:
+            yielded = 0
+            while yielded < len(cameras):
+                index = await written.get()
+                if index is None:
+                    # Raises if the render failed, otherwise all frames are written
+                    await render
+                    index = len(cameras) - 1
+
+                for i in range(yielded, index + 1):
+                    yield await self._read_frame(
+                        cameras[i], os.path.join(output_path, str(i)), passes
+                    )
+                yielded = index + 1
+
+            await render
         finally:
+            render.cancel()
+            await asyncio.gather(render, return_exceptions=True)
             os.remove(input_path)
             shutil.rmtree(output_path)
+
+    def _get_tmp_dir(
+        self, cameras: list[CameraLike], passes: list[RenderPass] | None
+    ) -> str | None:
+        """
+        Directory to exchange the job's files in. Frames too large for the free
+        shared memory go through the system temp directory instead.
+        """
+        directory = self._transport.directory
+        if directory is None:
+            return None
+
+        required = _job_exr_bytes(cameras, passes)
+        if shutil.disk_usage(directory).free < required:
+            logger.warning(
+                f"[render] {required // 2**20} MB of frames do not fit in "
+                f"{directory}, exchanging them through files"
+            )
+            return None
+        return directory
+
+    async def _read_frame(
+        self, camera: CameraLike, path: str, passes: list[RenderPass] | None
+    ) -> Frame:
+        # Decoding EXRs is CPU-bound, keep it off the event loop when possible
+        if self._executor is None:
+            return _read_frame(camera, path, passes)
+        return await self._executor.run("decode_exr", _read_frame, camera, path, passes)
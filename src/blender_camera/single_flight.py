@@ -0,0 +1,56 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+
+
+@dataclass
+class _Flight[T]:
+    task: asyncio.Task[T]
+    waiters: int = 0
+
+
+class SingleFlight[T]:
+    """Runs one call per key at a time and shares its result with concurrent callers."""
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight[T]] = {}
+        self._coalesced = 0
+        self._abandoned = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self._coalesced += 1
+
+        flight.waiters += 1
+        try:
+            # Shield so one caller giving up does not cancel the call for the others
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller gave up, so nobody will read the result. Wait for
+                # the call to clean up, so the last caller leaves after it does.
+                self._abandoned += 1
+                self._forget(key, flight)
+                flight.task.cancel()
+                await asyncio.gather(flight.task, return_exceptions=True)
+
+    def keys(self) -> list[Hashable]:
+        """Keys of the calls in flight."""
+        return list(self._flights)
+
+    def get_metrics(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "coalesced": self._coalesced,
+            "abandoned": self._abandoned,
+        }
+
+    def _forget(self, key: Hashable, flight: _Flight[T]):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _timed[T](fn: Callable[..., T], *args) -> tuple[T, float]:
+    started_at = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started_at
+
+
+class StageExecutor:
+    """
+    Runs CPU-bound post-processing stages off the event loop and times them.
+
+    Stages run on threads: NumPy, OpenEXR, zlib and Pillow release the GIL for
+    their heavy work, and frames are shared with the stages instead of being
+    pickled into another process.
+    """
+
+    def __init__(self, max_workers: int | None):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="stage"
+        )
+
+        self._stages: dict[str, dict] = {}
+
+    async def run[T](self, stage: str, fn: Callable[..., T], *args) -> T:
+        loop = asyncio.get_running_loop()
+        result, seconds = await loop.run_in_executor(self._executor, _timed, fn, *args)
+        self._record(stage, seconds, result)
+        return result
+
+    def get_metrics(self) -> dict:
+        metrics = {}
+        for stage, timings in self._stages.items():
+            metrics[stage] = {
+                **timings,
+                "seconds_avg": timings["seconds_total"] / timings["count"],
+            }
+            if "bytes_total" in timings:
+                metrics[stage]["bytes_avg"] = timings["bytes_total"] / timings["count"]
+        return metrics
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _record(self, stage: str, seconds: float, result):
+        timings = self._stages.setdefault(
+            stage, {"count": 0, "seconds_total": 0.0, "seconds_max": 0.0}
+        )
+        timings["count"] += 1
+        timings["seconds_total"] += seconds
+        timings["seconds_max"] = max(timings["seconds_max"], seconds)
+
+        # Stages that encode something also record how large their output is
+        if isinstance(result, bytes):
+            timings["bytes_total"] = timings.get("bytes_total", 0) + len(result)
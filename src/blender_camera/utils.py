@@ -28,3 +28,52 @@ def get_base_path() -> str:
         base_path = base_path.rstrip("/")
 
     return base_path
+
+
+def get_max_blend_bytes() -> int:
+    return int(os.getenv("MAX_BLEND_MB", "2048")) * 1024 * 1024
+
+
+def get_blender_pool_size() -> int:
+    return int(os.getenv("BLENDER_POOL_SIZE", "2"))
+
+
+def get_blender_idle_timeout() -> float:
+    return float(os.getenv("BLENDER_IDLE_TIMEOUT", "300"))
+
+
+def get_render_max_concurrent() -> int:
+    return int(os.getenv("RENDER_MAX_CONCURRENT", "2"))
+
+
+def get_render_max_queued() -> int:
+    return int(os.getenv("RENDER_MAX_QUEUED", "16"))
+
+
+def get_render_tile_pixels() -> int:
+    return int(os.getenv("RENDER_TILE_PIXELS", "0"))
+
+
+def get_render_transport() -> str:
+    return os.getenv("RENDER_TRANSPORT", "file")
+
+
+def get_render_timeout() -> float:
+    return float(os.getenv("RENDER_TIMEOUT", "300"))
+
+
+def get_render_cache_max_bytes() -> int:
+    return int(os.getenv("RENDER_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+
+def get_render_disk_cache_dir() -> str:
+    return os.getenv("RENDER_DISK_CACHE_DIR", "")
+
+
+def get_render_disk_cache_max_bytes() -> int:
+    return int(os.getenv("RENDER_DISK_CACHE_MAX_MB", "4096")) * 1024 * 1024
+
+
+def get_postprocess_workers() -> int | None:
+    workers = os.getenv("POSTPROCESS_WORKERS", "")
+    return int(workers) if workers else None
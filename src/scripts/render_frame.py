@@ -2,39 +2,89 @@ import argparse
 import json
 import os
 import sys
-from typing import TypedDict
+from typing import NotRequired, TypedDict
 
 import bpy
 from mathutils import Quaternion, Vector
 
+# Marks lines on stdout that carry worker replies, as opposed to Blender's own logs
+WORKER_REPLY_PREFIX = "@@blender-camera@@ "
+
+
+class CameraIntrinsics(TypedDict):
+    fx: float
+    fy: float
+    cx: float
+    cy: float
+
+
+class ImageSize(TypedDict):
+    width: int
+    height: int
+
 
 class SceneState(TypedDict):
     id: str
     pose: list[float]  # [x, y, z, rx, ry, rz]
+    camera_intrinsics: NotRequired[CameraIntrinsics | None]
+    image_size: NotRequired[ImageSize | None]
+
+
+class RenderSettings(TypedDict):
+    samples: int
+    max_bounces: int
+    adaptive_sampling: bool
+    adaptive_threshold: float
+    time_limit: float  # seconds per frame, 0 for no limit
+
+
+# Used for jobs that do not name their settings
+DEFAULT_RENDER_SETTINGS: RenderSettings = {
+    "samples": 128,
+    "max_bounces": 12,
+    "adaptive_sampling": True,
+    "adaptive_threshold": 0.01,
+    "time_limit": 0.0,
+}
+
+
+# Resolution saved in the .blend, used for cameras that do not set an image size
+_blend_resolution: tuple[int, int] = (1920, 1080)
+
+# Layers of the multilayer EXR written for each frame
+ALL_PASSES = ["color", "normal", "depth"]
+
 
+class RenderJob(TypedDict):
+    cameras: list[SceneState]
+    settings: NotRequired[RenderSettings]
+    passes: NotRequired[list[str]]  # subset of ALL_PASSES, all if missing
 
-def _load_scene_state(input_path: str) -> SceneState:
+
+class WorkerJob(TypedDict):
+    input_path: str
+    output_path: str
+
+
+def _load_render_job(input_path: str) -> RenderJob:
     with open(input_path, "r") as f:
-        state = json.load(f)
-    return state
+        job = json.load(f)
+    return job
 
 
-def _create_camera(state: SceneState) -> bpy.types.Object:
+def _create_camera(state: SceneState) -> tuple[bpy.types.Object, bpy.types.Object]:
+    """Create the camera and its lights, returning the camera and flash objects."""
+    global _blend_resolution
+    render = bpy.context.scene.render
+    _blend_resolution = (
+        render.resolution_x * render.resolution_percentage // 100,
+        render.resolution_y * render.resolution_percentage // 100,
+    )
+
     cam = bpy.data.cameras.new(name=state["id"])
     cam_obj = bpy.data.objects.new(name=cam.name, object_data=cam)
     bpy.context.collection.objects.link(cam_obj)
-    pose = state["pose"]
-    x, y, z = pose[:3]
-    rx, ry, rz = pose[3:]
-    cam_obj.location = (x, y, z)
-
-    # Convert rotation vector (axis-angle) to quaternion
-    rot_vec = Vector((rx, ry, rz))
-    angle = rot_vec.length
-    axis = rot_vec.normalized() if angle != 0 else Vector((0, 0, 1))
-
     cam_obj.rotation_mode = "QUATERNION"
-    cam_obj.rotation_quaternion = Quaternion(axis, angle)
 
     bpy.context.scene.camera = cam_obj
 
@@ -44,13 +94,6 @@ def _create_camera(state: SceneState) -> bpy.types.Object:
     light_obj = bpy.data.objects.new(name="CameraFlash", object_data=light_data)
     bpy.context.collection.objects.link(light_obj)
 
-    # Position light slightly offset from camera for better illumination
-    light_obj.location = (
-        cam_obj.location.x + 1,
-        cam_obj.location.y + 1,
-        cam_obj.location.z + 1,
-    )
-
     # Also add a sun light for overall scene illumination
     sun_data = bpy.data.lights.new(name="Sun", type="SUN")
     sun_data.energy = 5.0
@@ -59,14 +102,80 @@ def _create_camera(state: SceneState) -> bpy.types.Object:
     sun_obj.location = (0, 0, 10)
     sun_obj.rotation_euler = (0.785, 0, 0.785)  # 45 degrees on X and Z axes
 
-    return cam_obj
+    _set_camera_pose(cam_obj, light_obj, state["pose"])
+    return cam_obj, light_obj
+
+
+def _set_camera_pose(
+    cam_obj: bpy.types.Object, light_obj: bpy.types.Object, pose: list[float]
+):
+    """Move the camera to the pose and keep the flash next to it."""
+    x, y, z = pose[:3]
+    rx, ry, rz = pose[3:]
+    cam_obj.location = (x, y, z)
+
+    # Convert rotation vector (axis-angle) to quaternion
+    rot_vec = Vector((rx, ry, rz))
+    angle = rot_vec.length
+    axis = rot_vec.normalized() if angle != 0 else Vector((0, 0, 1))
+    cam_obj.rotation_quaternion = Quaternion(axis, angle)
+
+    # Position light slightly offset from camera for better illumination
+    light_obj.location = (
+        cam_obj.location.x + 1,
+        cam_obj.location.y + 1,
+        cam_obj.location.z + 1,
+    )
+
 
+def _default_intrinsics(width: int, height: int) -> CameraIntrinsics:
+    """
+    Intrinsics of cameras that have none, the same as Frame._get_rays assumes
+    when it turns depth into points: a focal length of the larger image side,
+    centered on the image.
+    """
+    focal_length = float(max(width, height))
+    return CameraIntrinsics(
+        fx=focal_length, fy=focal_length, cx=(width - 1) / 2, cy=(height - 1) / 2
+    )
+
+
+def _set_camera_intrinsics(cam_obj: bpy.types.Object, state: SceneState):
+    """
+    Render at the camera's image size and match its pinhole intrinsics, where
+    pixel centers are at integer coordinates and rows go down from the top.
+    """
+    render = bpy.context.scene.render
+    image_size = state.get("image_size")
+    width, height = (
+        (image_size["width"], image_size["height"]) if image_size else _blend_resolution
+    )
+    render.resolution_x = width
+    render.resolution_y = height
+    render.resolution_percentage = 100
 
-def _setup_passes(view_layer: bpy.types.ViewLayer):
+    cam = cam_obj.data
+    intrinsics = state.get("camera_intrinsics") or _default_intrinsics(width, height)
+    fx, fy = intrinsics["fx"], intrinsics["fy"]
+    cx, cy = intrinsics["cx"], intrinsics["cy"]
+
+    # Non-square pixels: Blender's fy / fx is pixel_aspect_x / pixel_aspect_y
+    render.pixel_aspect_x = max(fy / fx, 1.0)
+    render.pixel_aspect_y = max(fx / fy, 1.0)
+    y_aspect = render.pixel_aspect_y / render.pixel_aspect_x
+
+    # With a horizontal fit the sensor width spans the image width
+    cam.sensor_fit = "HORIZONTAL"
+    cam.lens = fx * cam.sensor_width / width
+    cam.shift_x = ((width - 1) / 2 - cx) / width
+    cam.shift_y = (cy - (height - 1) / 2) * y_aspect / width
+
+
+def _setup_passes(view_layer: bpy.types.ViewLayer, passes: list[str]):
     """Enable the passes we need on the view layer."""
-    view_layer.use_pass_normal = True
-    view_layer.use_pass_z = True
-    # (Color is implicit / via the regular “Image” pass)
+    view_layer.use_pass_combined = "color" in passes  # the regular “Image” pass
+    view_layer.use_pass_normal = "normal" in passes
+    view_layer.use_pass_z = "depth" in passes
 
 
 def _clear_compositor_nodes(scene: bpy.types.Scene):
@@ -82,68 +191,35 @@ def _build_compositor(tree, nodes, links, output_dir, basename="frame"):
     """
     Build compositor nodes:
     - Input: Render Layers
-    - Remap depth
-    - File Output for color, normal, depth (EXR for precision)
-    - Additional PNG outputs for color and normal (for easy verification)
-    Returns the FileOutput nodes (color, normal, depth).
+    - One File Output writing all passes as layers of a multilayer EXR
+    Returns the Render Layers and File Output nodes. The passes are linked per
+    job by _select_passes.
     """
     # Render Layers node
     rl = nodes.new(type="CompositorNodeRLayers")
     rl.location = (0, 0)
 
-    # Map / remap node for depth (optional, to scale Z into displayable range)
-    map_depth = nodes.new(type="CompositorNodeMapRange")
-    map_depth.location = (200, -200)
-
-    # You may adjust these depending on your scene’s depth range:
-    map_depth.inputs["From Min"].default_value = 0.0
-    map_depth.inputs["From Max"].default_value = 50.0  # e.g. 50 units away
-    map_depth.inputs["To Min"].default_value = 0.0
-    map_depth.inputs["To Max"].default_value = 1.0
-    # map_depth.clamp = True
-
-    links.new(rl.outputs["Depth"], map_depth.inputs["Value"])
-
-    # File Output: color
-    out_color = nodes.new(type="CompositorNodeOutputFile")
-    out_color.label = "FileOut_Color"
-    out_color.location = (400, 200)
-
-    # File Output: normals
-    out_normal = nodes.new(type="CompositorNodeOutputFile")
-    out_normal.label = "FileOut_Normal"
-    out_normal.location = (400, 0)
-
-    # File Output: depth
-    out_depth = nodes.new(type="CompositorNodeOutputFile")
-    out_depth.label = "FileOut_Depth"
-    out_depth.location = (400, -200)
-
-    # Set base path to the output directory
-    out_color.base_path = output_dir
-    out_normal.base_path = output_dir
-    out_depth.base_path = output_dir
-
-    # Configure formats (you can choose PNG, EXR, etc.)
-    # For depth and normal we often want float formats (EXR)
-    for node in (out_color, out_normal, out_depth):
-        fmt = node.format
-        fmt.file_format = "OPEN_EXR"
-        fmt.color_depth = "32"
-        # For depth you could also force BW or keep RGBA
-        # fmt.color_mode = 'BW'  # optional
-
-    # Link outputs
-    links.new(rl.outputs["Image"], out_color.inputs[0])
-    links.new(rl.outputs["Normal"], out_normal.inputs[0])
-    links.new(map_depth.outputs["Value"], out_depth.inputs[0])
-
-    # Set the filename patterns for naming using default slots (index 0)
-    out_color.file_slots[0].path = basename + "_color_"
-    out_normal.file_slots[0].path = basename + "_normal_"
-    out_depth.file_slots[0].path = basename + "_depth_"
-
-    return out_color, out_normal, out_depth
+    # File Output: one file per frame with a layer per pass, so the server opens
+    # and parses a single header
+    out = nodes.new(type="CompositorNodeOutputFile")
+    out.label = "FileOut_Passes"
+    out.location = (400, 0)
+
+    # For multilayer files the base path is the file name, before the frame number
+    out.base_path = os.path.join(output_dir, basename + "_")
+
+    fmt = out.format
+    fmt.file_format = "OPEN_EXR_MULTILAYER"
+    fmt.color_depth = "32"
+    # The file is read once from local disk, decoding is cheaper uncompressed
+    fmt.exr_codec = "NONE"
+
+    # Channels are named <layer>.<channel>, e.g. color.R, normal.X and depth.V
+    out.layer_slots.clear()
+    for name in ALL_PASSES:
+        out.layer_slots.new(name)
+
+    return rl, out
 
 
 def _setup_materials():
@@ -172,17 +248,17 @@ def _setup_materials():
                         mat.use_nodes = True
 
 
-def _render_frames(output_dir: str, start: int, end: int, basename: str):
+def _setup_render(output_dir: str, basename: str):
     """
-    Render frames in the given range, writing color/normal/depth for each frame.
+    Configure the render engine, world, passes and compositor once per process.
+    Returns the compositor nodes from _build_compositor.
     """
     scene = bpy.context.scene
 
     # Set render engine to Cycles for better lighting
     scene.render.engine = "CYCLES"
 
-    # Configure Cycles settings for good quality
-    scene.cycles.samples = 128  # Reasonable sample count
+    # Samples and bounces are set per job by _apply_render_settings
     scene.cycles.use_denoising = (
         False  # Disable denoising since build doesn't support it
     )
@@ -218,16 +294,12 @@ def _render_frames(output_dir: str, start: int, end: int, basename: str):
         # Connect them
         world_links.new(bg_node.outputs["Background"], output_node.inputs["Surface"])
 
+    # Every pass has to exist while the compositor links are created
     rl = scene.view_layers.items()[0][1]
-    _setup_passes(rl)
+    _setup_passes(rl, ALL_PASSES)
 
     tree, nodes, links = _clear_compositor_nodes(scene)
-    out_color, out_normal, out_depth = _build_compositor(
-        tree, nodes, links, output_dir, basename
-    )
-
-    # Ensure output dir exists
-    os.makedirs(output_dir, exist_ok=True)
+    outputs = _build_compositor(tree, nodes, links, output_dir, basename)
 
     # Disable the default render output since we're using compositor File Output nodes
     scene.render.filepath = ""
@@ -239,21 +311,145 @@ def _render_frames(output_dir: str, start: int, end: int, basename: str):
     # Use compositing
     scene.use_nodes = True
 
+    return outputs
+
+
+def _get_depth_only_material() -> bpy.types.Material:
+    """A material that is as cheap as possible to shade, for depth-only renders."""
+    mat = bpy.data.materials.get("DepthOnly")
+    if mat is None:
+        mat = bpy.data.materials.new(name="DepthOnly")
+        mat.use_nodes = True
+        nodes = mat.node_tree.nodes
+        for node in list(nodes):
+            nodes.remove(node)
+        emission = nodes.new(type="ShaderNodeEmission")
+        output = nodes.new(type="ShaderNodeOutputMaterial")
+        mat.node_tree.links.new(emission.outputs["Emission"], output.inputs["Surface"])
+    return mat
+
+
+def _select_passes(outputs, passes: list[str]):
+    """Render only the passes of the next job and link them to the output file."""
+    view_layer = bpy.context.scene.view_layers.items()[0][1]
+    _setup_passes(view_layer, passes)
+
+    rl, out = outputs
+    # Depth is written as the raw Z pass, in scene units, and scaled by the server
+    sources = {
+        "color": rl.outputs["Image"],
+        "normal": rl.outputs["Normal"],
+        "depth": rl.outputs["Depth"],
+    }
+    # Unlinked layers are left out of the file
+    links = bpy.context.scene.node_tree.links
+    for name in ALL_PASSES:
+        for link in list(out.inputs[name].links):
+            links.remove(link)
+        if name in passes:
+            links.new(sources[name], out.inputs[name])
+
+    # Depth does not depend on materials, so skip shading them when nothing else
+    # is needed. Normals are left alone since materials can bump them.
+    if "color" in passes or "normal" in passes:
+        view_layer.material_override = None
+    else:
+        view_layer.material_override = _get_depth_only_material()
+
+
+def _apply_render_settings(settings: RenderSettings):
+    """Set the sampling budget of the next renders."""
+    cycles = bpy.context.scene.cycles
+    cycles.samples = settings["samples"]
+    cycles.max_bounces = settings["max_bounces"]
+    cycles.use_adaptive_sampling = settings["adaptive_sampling"]
+    if settings["adaptive_sampling"]:
+        cycles.adaptive_threshold = settings["adaptive_threshold"]
+    cycles.time_limit = settings["time_limit"]
+
+
+def _render_frames(outputs, output_dir: str, start: int, end: int):
+    """
+    Render frames in the given range, writing color/normal/depth for each frame.
+    """
+    scene = bpy.context.scene
+
+    # Point the File Output node at this render's directory and ensure it exists
+    _, out = outputs
+    out.base_path = os.path.join(output_dir, os.path.basename(out.base_path))
+    os.makedirs(output_dir, exist_ok=True)
+
     for frame in range(start, end + 1):
         scene.frame_set(frame)
         bpy.ops.render.render(write_still=True, use_viewport=False)
 
 
+def _render_cameras(rig, outputs, job: RenderJob, output_dir: str):
+    """
+    Render every camera of the job with the same loaded scene, moving the rig
+    between them. Camera i writes its files to output_dir/i and is announced with
+    a reply as soon as they are written, so results can be streamed.
+    """
+    _apply_render_settings(job.get("settings", DEFAULT_RENDER_SETTINGS))
+    _select_passes(outputs, job.get("passes", ALL_PASSES))
+
+    cam_obj, light_obj = rig
+    for index, state in enumerate(job["cameras"]):
+        _set_camera_pose(cam_obj, light_obj, state["pose"])
+        _set_camera_intrinsics(cam_obj, state)
+        _render_frames(outputs, os.path.join(output_dir, str(index)), 1, 1)
+        _reply({"frame": index})
+
+
+def _reply(message: dict):
+    print(WORKER_REPLY_PREFIX + json.dumps(message), flush=True)
+
+
+def _serve():
+    """
+    Keep the scene loaded and render one job per line read from stdin.
+    Each job is answered with a single prefixed JSON line on stdout.
+    """
+    rig = None
+    outputs = None
+    _setup_materials()  # Ensure proper materials for lighting
+    _reply({"ready": True})
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+
+        try:
+            worker_job: WorkerJob = json.loads(line)
+            render_job = _load_render_job(worker_job["input_path"])
+            if rig is None:
+                rig = _create_camera(render_job["cameras"][0])
+                outputs = _setup_render(worker_job["output_path"], "frame")
+
+            _render_cameras(rig, outputs, render_job, worker_job["output_path"])
+            _reply({"ok": True})
+        except Exception as e:
+            _reply({"ok": False, "error": repr(e)})
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--input_path", required=True)
-    parser.add_argument("--output_path", required=True)
+    parser.add_argument("--worker", action="store_true")
+    parser.add_argument("--input_path")
+    parser.add_argument("--output_path")
     args, unknown_args = parser.parse_known_args([x for x in sys.argv if x != "--"])
     print("Arguments:", args)
     print("Unknown Arguments:", unknown_args)
 
-    scene_state = _load_scene_state(args.input_path)
-    _create_camera(scene_state)
-    _setup_materials()  # Ensure proper materials for lighting
+    if args.worker:
+        _serve()
+    else:
+        if not args.input_path or not args.output_path:
+            parser.error("--input_path and --output_path are required")
+
+        render_job = _load_render_job(args.input_path)
+        rig = _create_camera(render_job["cameras"][0])
+        _setup_materials()  # Ensure proper materials for lighting
 
-    _render_frames(args.output_path, 1, 1, "frame")
+        outputs = _setup_render(args.output_path, "frame")
+        _render_cameras(rig, outputs, render_job, args.output_path)
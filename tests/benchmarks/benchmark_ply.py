@@ -0,0 +1,49 @@
+"""
+Benchmark streaming a frame as a binary PLY, with and without a cached ray grid.
+
+    python tests/benchmarks/benchmark_ply.py
+"""
+
+import timeit
+from unittest.mock import Mock
+
+import numpy as np
+
+from blender_camera.models.frame import Frame, _ray_grids
+
+RESOLUTIONS = {"640x480": (640, 480), "1080p": (1920, 1080), "4K": (3840, 2160)}
+REPEAT = 5
+
+
+def _stream_ply(frame: Frame) -> int:
+    """Consume the PLY the way a streaming response does, returning its size."""
+    return sum(len(chunk) for chunk in frame.iter_ply())
+
+
+def main():
+    print(f"{'resolution':>10} {'cold':>10} {'cached':>10} {'throughput':>12}")
+    for name, (width, height) in RESOLUTIONS.items():
+        camera = Mock()
+        camera.camera_intrinsics = Mock(
+            fx=float(width), fy=float(width), cx=width / 2, cy=height / 2
+        )
+        frame = Frame(
+            camera,
+            np.random.rand(height, width).astype(np.float32),
+            np.random.rand(height, width, 3).astype(np.float32),
+            np.random.rand(height, width, 3).astype(np.float32),
+        )
+
+        _ray_grids.clear()
+        cold = timeit.timeit(lambda: _stream_ply(frame), number=1)
+        cached = timeit.timeit(lambda: _stream_ply(frame), number=REPEAT) / REPEAT
+        size = _stream_ply(frame)
+
+        print(
+            f"{name:>10} {cold * 1000:>8.1f}ms {cached * 1000:>8.1f}ms "
+            f"{size / cached / 1e6:>8.1f}MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
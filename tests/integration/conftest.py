@@ -2,10 +2,16 @@ from pathlib import Path
 
 import pytest
 
-from blender_camera.blender import Blender
+from blender_camera.blender import Blender, BlenderWorkerPool
 
 
 @pytest.fixture
 def blender() -> Blender:
     test_scene_path = Path(__file__).parent / "resources" / "cube.blend"
     return Blender(str(test_scene_path))
+
+
+@pytest.fixture
+def blender_worker_pool() -> BlenderWorkerPool:
+    test_scene_path = Path(__file__).parent / "resources" / "cube.blend"
+    return BlenderWorkerPool(str(test_scene_path), size=1, idle_timeout=60.0)
@@ -1,19 +1,40 @@
+import json
+import os
 import tempfile
+import tracemalloc
 from pathlib import Path
 
+import Imath
 import numpy as np
+import OpenEXR
 import pytest
 
 from blender_camera.blender import Blender
 from blender_camera.models.camera_intrinsics import CameraIntrinsics
 from blender_camera.models.entities.camera import Camera
 from blender_camera.models.frame import Frame
+from blender_camera.models.image_size import ImageSize
+from blender_camera.models.render_pass import RenderPass
+from blender_camera.models.render_preset import RenderPreset
 from blender_camera.scripts.render_frame_script import (
     RenderFrameScript,
+    RenderTransport,
+    _read_frame,
     _write_tmp_state,
 )
 
 
+def _write_multilayer_exr(path: Path, channels: dict[str, np.ndarray]):
+    height, width = next(iter(channels.values())).shape
+    header = OpenEXR.Header(width, height)
+    header["channels"] = {
+        name: Imath.Channel(Imath.PixelType(Imath.PixelType.FLOAT)) for name in channels
+    }
+    exr_file = OpenEXR.OutputFile(str(path), header)
+    exr_file.writePixels({name: data.tobytes() for name, data in channels.items()})
+    exr_file.close()
+
+
 @pytest.fixture
 def sample_camera() -> Camera:
     """Create a sample camera for testing."""
@@ -260,7 +281,7 @@ class TestRenderFrameScript:
     def test_write_tmp_state_should_create_valid_json(self, sample_camera: Camera):
         """Test that _write_tmp_state creates a valid JSON file."""
         # Act
-        tmp_path = _write_tmp_state(sample_camera)
+        tmp_path = _write_tmp_state([sample_camera])
 
         try:
             # Assert
@@ -280,6 +301,86 @@ class TestRenderFrameScript:
             if Path(tmp_path).exists():
                 Path(tmp_path).unlink()
 
+    @pytest.mark.asyncio
+    async def test_execute_should_only_decode_requested_passes(
+        self, render_frame_script: RenderFrameScript, sample_camera: Camera
+    ):
+        """Test that a depth-only render returns a frame without normals or colors."""
+        # Act
+        frame = await render_frame_script.execute(
+            sample_camera, RenderPreset.GEOMETRY.settings, [RenderPass.DEPTH]
+        )
+
+        # Assert
+        assert frame.depth is not None
+        assert frame.normal is None
+        assert frame.color is None
+
+    @pytest.mark.asyncio
+    async def test_execute_tiled_should_stitch_bands_into_one_frame(
+        self, render_frame_script: RenderFrameScript, sample_camera: Camera
+    ):
+        """Test that a tiled render has the shape and content of a single render."""
+        # Arrange
+        camera = sample_camera.model_copy(
+            update={"image_size": ImageSize(width=64, height=48)}
+        )
+
+        # Act
+        whole = await render_frame_script.execute(camera)
+        tiled = await render_frame_script.execute_tiled(camera, 3)
+
+        # Assert
+        assert tiled.depth.shape == whole.depth.shape == (48, 64)
+        assert tiled.color.shape == whole.color.shape == (48, 64, 3)
+        assert np.allclose(tiled.depth, whole.depth, atol=1e-3)
+
+    def test_write_tmp_state_should_include_render_settings(
+        self, sample_camera: Camera
+    ):
+        """Test that _write_tmp_state passes the render settings to Blender."""
+        # Act
+        tmp_path = _write_tmp_state([sample_camera], RenderPreset.GEOMETRY.settings)
+
+        try:
+            # Assert
+            with open(tmp_path, "r") as f:
+                job = json.load(f)
+
+            assert job["settings"] == RenderPreset.GEOMETRY.settings.model_dump()
+
+        finally:
+            # Cleanup
+            Path(tmp_path).unlink()
+
+    @pytest.mark.asyncio
+    async def test_execute_should_exchange_frames_through_shared_memory(
+        self, blender: Blender, sample_camera: Camera, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that the shm transport renders through /dev/shm and cleans up."""
+        # Arrange
+        exchanged = []
+        render_frame = blender.render_frame
+
+        async def record_render_frame(input_path, output_path, on_frame=None):
+            await render_frame(input_path, output_path, on_frame)
+            exchanged.append((input_path, output_path, os.listdir(output_path)))
+
+        monkeypatch.setattr(blender, "render_frame", record_render_frame)
+        render_frame_script = RenderFrameScript(blender, None, RenderTransport.SHM)
+
+        # Act
+        frame = await render_frame_script.execute(sample_camera)
+
+        # Assert
+        assert frame.depth is not None
+        [(input_path, output_path, written)] = exchanged
+        assert Path(input_path).parent == Path("/dev/shm")
+        assert Path(output_path).parent == Path("/dev/shm")
+        assert written
+        assert not os.path.exists(input_path)
+        assert not os.path.exists(output_path)
+
     @pytest.mark.asyncio
     async def test_execute_should_produce_consistent_results(
         self, render_frame_script: RenderFrameScript, sample_camera: Camera
@@ -295,6 +396,50 @@ class TestRenderFrameScript:
         assert np.allclose(frame1._normal, frame2._normal, rtol=1e-5)
         assert np.allclose(frame1._color, frame2._color, rtol=1e-5)
 
+    @pytest.mark.asyncio
+    async def test_execute_batch_should_return_one_frame_per_camera(
+        self,
+        render_frame_script: RenderFrameScript,
+        sample_camera: Camera,
+        sample_camera_rotated: Camera,
+    ):
+        """Test that a batch render returns frames in camera order."""
+        # Act
+        frames = await render_frame_script.execute_batch(
+            [sample_camera, sample_camera_rotated]
+        )
+        single_frame = await render_frame_script.execute(sample_camera_rotated)
+
+        # Assert
+        assert [frame._camera for frame in frames] == [
+            sample_camera,
+            sample_camera_rotated,
+        ]
+        assert not np.allclose(frames[0]._depth, frames[1]._depth)
+        assert np.allclose(frames[1]._depth, single_frame._depth, rtol=1e-5)
+
+    @pytest.mark.asyncio
+    async def test_execute_stream_should_yield_frames_in_camera_order(
+        self,
+        render_frame_script: RenderFrameScript,
+        sample_camera: Camera,
+        sample_camera_rotated: Camera,
+    ):
+        """Test that a streamed render yields one frame per camera, in order."""
+        # Act
+        frames = [
+            frame
+            async for frame in render_frame_script.execute_stream(
+                [sample_camera, sample_camera_rotated]
+            )
+        ]
+
+        # Assert
+        assert [frame._camera for frame in frames] == [
+            sample_camera,
+            sample_camera_rotated,
+        ]
+
 
 class TestRenderFrameScriptConversionFunctions:
     """Test the individual conversion functions in isolation."""
@@ -330,3 +475,59 @@ class TestRenderFrameScriptConversionFunctions:
         assert "ply" in ply_str
         assert "element vertex" in ply_str
         assert "property float x" in ply_str
+
+    def test_read_frame_should_decode_passes_from_one_multilayer_exr(
+        self, sample_camera: Camera, tmp_path: Path
+    ):
+        """Test that the passes are read from their layers of a single EXR."""
+        # Arrange
+        height, width = 2, 3
+        depth = np.arange(height * width, dtype=np.float32).reshape(height, width)
+        color = np.full((height, width), 0.5, dtype=np.float32)
+        channels = {
+            "depth.V": depth,
+            "color.R": color,
+            "color.G": color,
+            "color.B": color,
+        }
+        _write_multilayer_exr(tmp_path / "frame_0001.exr", channels)
+
+        # Act
+        frame = _read_frame(
+            sample_camera, str(tmp_path), [RenderPass.DEPTH, RenderPass.COLOR]
+        )
+
+        # Assert
+        assert np.array_equal(frame.depth, depth)
+        assert frame.color.shape == (height, width, 3)
+        assert np.allclose(frame.color, 0.5)
+        assert frame.normal is None
+
+    def test_read_frame_should_decode_into_one_float32_buffer(
+        self, sample_camera_rotated: Camera, tmp_path: Path
+    ):
+        """Test that decoding a frame allocates little more than its buffer."""
+        # Arrange
+        height, width = 256, 256
+        plane = np.random.rand(height, width).astype(np.float32)
+        names = ["depth.V", "normal.X", "normal.Y", "normal.Z"]
+        names += ["color.R", "color.G", "color.B"]
+        _write_multilayer_exr(
+            tmp_path / "frame_0001.exr", {name: plane for name in names}
+        )
+        frame_bytes = height * width * len(names) * 4
+
+        # Act
+        tracemalloc.start()
+        try:
+            frame = _read_frame(sample_camera_rotated, str(tmp_path))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        # Assert
+        assert frame.nbytes == frame_bytes
+        assert frame.normal.dtype == np.float32
+        assert frame.depth.base is frame.normal.base is frame.color.base
+        # The frame buffer plus the decoded channels, with no per-pass copies
+        assert peak < 2.5 * frame_bytes
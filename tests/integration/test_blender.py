@@ -1,6 +1,8 @@
+from pathlib import Path
+
 import pytest
 
-from blender_camera.blender import Blender
+from blender_camera.blender import Blender, BlenderWorkerPool
 
 
 @pytest.mark.asyncio
@@ -12,3 +14,26 @@ async def test_run_blender_should_not_throw(
 
     # Act & Assert
     await blender.run()
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_should_reuse_worker_between_renders(
+    blender_worker_pool: BlenderWorkerPool, tmp_path: Path
+):
+    # Arrange
+    input_path = tmp_path / "camera.json"
+    input_path.write_text(
+        '{"cameras": [{"id": "camera", "pose": [0.0, 0.0, 5.0, 0.0, 0.0, 0.0]}]}'
+    )
+
+    try:
+        # Act
+        await blender_worker_pool.render_frame(str(input_path), str(tmp_path / "a"))
+        await blender_worker_pool.render_frame(str(input_path), str(tmp_path / "b"))
+
+        # Assert
+        assert len(blender_worker_pool._workers) == 1
+        assert (tmp_path / "a" / "0" / "frame_0001.exr").exists()
+        assert (tmp_path / "b" / "0" / "frame_0001.exr").exists()
+    finally:
+        await blender_worker_pool.close()
@@ -0,0 +1,96 @@
+import pytest
+from fastapi import Request
+
+from blender_camera.api.multipart_upload import MultipartUpload, MultipartUploadError
+
+BOUNDARY = "boundary"
+
+
+def _create_request(body: bytes, chunk_size: int = 7) -> Request:
+    chunks = [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]
+
+    async def receive() -> dict:
+        body = chunks.pop(0) if chunks else b""
+        return {"type": "http.request", "body": body, "more_body": bool(chunks)}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/scenes",
+        "query_string": b"",
+        "headers": [
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())
+        ],
+    }
+    return Request(scope, receive)
+
+
+def _multipart_body(*parts: tuple[str, str | None, bytes]) -> bytes:
+    body = b""
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += (
+            f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode()
+            + content
+            + b"\r\n"
+        )
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+class TestMultipartUpload:
+    @pytest.mark.asyncio
+    async def test_iter_chunks_should_read_the_file_as_it_arrives(self):
+        # Arrange
+        content = bytes(range(256)) * 3 + b"\r\n--bound"
+        request = _create_request(
+            _multipart_body(
+                ("comment", None, b"skipped"),
+                ("blend_file", "scene.blend", content),
+            )
+        )
+        upload = MultipartUpload(request, "blend_file")
+
+        # Act
+        filename = await upload.get_filename()
+        chunks = [chunk async for chunk in upload.iter_chunks()]
+
+        # Assert
+        assert filename == "scene.blend"
+        assert len(chunks) > 1
+        assert b"".join(chunks) == content
+
+    @pytest.mark.asyncio
+    async def test_get_filename_should_fail_without_the_field(self):
+        # Arrange
+        request = _create_request(_multipart_body(("other", "a.blend", b"data")))
+        upload = MultipartUpload(request, "blend_file")
+
+        # Act & Assert
+        with pytest.raises(MultipartUploadError):
+            await upload.get_filename()
+
+    @pytest.mark.asyncio
+    async def test_iter_chunks_should_fail_when_the_body_ends_inside_the_file(self):
+        # Arrange
+        body = _multipart_body(("blend_file", "scene.blend", b"x" * 100))
+        upload = MultipartUpload(_create_request(body[:80]), "blend_file")
+
+        # Act & Assert
+        with pytest.raises(MultipartUploadError):
+            async for _ in upload.iter_chunks():
+                pass
+
+    def test_init_should_fail_for_other_content_types(self):
+        # Arrange
+        request = Request(
+            {
+                "type": "http",
+                "headers": [(b"content-type", b"application/octet-stream")],
+            }
+        )
+
+        # Act & Assert
+        with pytest.raises(MultipartUploadError):
+            MultipartUpload(request, "blend_file")
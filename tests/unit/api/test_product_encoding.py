@@ -0,0 +1,41 @@
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from blender_camera.api.product_encoding import encode_products
+from blender_camera.models.frame import Frame
+from blender_camera.models.frame_product import FrameProduct
+from blender_camera.stage_executor import StageExecutor
+
+
+@pytest.fixture
+def stage_executor():
+    executor = StageExecutor(2)
+    yield executor
+    executor.shutdown()
+
+
+class TestEncodeProducts:
+    @pytest.mark.asyncio
+    async def test_encode_products_should_time_each_format_as_its_own_stage(
+        self, stage_executor: StageExecutor
+    ):
+        # Arrange
+        depth = np.full((4, 6), 0.5, dtype=np.float32)
+        color = np.zeros((4, 6, 3), dtype=np.float32)
+        frame = Frame(Mock(), depth, None, color)
+
+        # Act
+        files = await encode_products(
+            stage_executor, frame, [FrameProduct.DEPTH, FrameProduct.COLORS]
+        )
+
+        # Assert
+        assert files == frame.to_product_files(
+            [FrameProduct.DEPTH, FrameProduct.COLORS]
+        )
+        metrics = stage_executor.get_metrics()
+        assert metrics.keys() == {"encode_png"}
+        assert metrics["encode_png"]["count"] == 2
+        assert metrics["encode_png"]["bytes_total"] == sum(map(len, files.values()))
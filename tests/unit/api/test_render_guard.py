@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Request
+
+from blender_camera.api.render_guard import RENDER_TIMEOUT_HEADER, RenderGuard
+from blender_camera.render_scheduler import RenderQueueFullError
+
+
+def _create_request(
+    headers: dict[str, str] | None = None, disconnected: asyncio.Event | None = None
+) -> Request:
+    async def receive() -> dict:
+        if disconnected is None:
+            await asyncio.Event().wait()
+        else:
+            await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/render",
+        "query_string": b"",
+        "headers": [
+            (name.lower().encode(), value.encode())
+            for name, value in (headers or {}).items()
+        ],
+    }
+    return Request(scope, receive)
+
+
+class TestRenderGuard:
+    @pytest.mark.asyncio
+    async def test_run_should_return_the_render_result(self):
+        # Arrange
+        guard = RenderGuard(timeout=10.0)
+        request = _create_request()
+
+        async def render() -> int:
+            return 42
+
+        # Act
+        result = await guard.run(request, render(), guard.get_deadline(request))
+
+        # Assert
+        assert result == 42
+
+    @pytest.mark.asyncio
+    async def test_run_should_cancel_the_render_when_the_deadline_expires(self):
+        # Arrange
+        guard = RenderGuard(timeout=10.0)
+        request = _create_request({RENDER_TIMEOUT_HEADER: "0.01"})
+        cancelled = False
+
+        async def render():
+            nonlocal cancelled
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+
+        # Act
+        with pytest.raises(HTTPException) as exc_info:
+            await guard.run(request, render(), guard.get_deadline(request))
+
+        # Assert
+        assert exc_info.value.status_code == 504
+        assert cancelled
+
+    @pytest.mark.asyncio
+    async def test_run_should_cancel_the_render_when_the_client_disconnects(self):
+        # Arrange
+        guard = RenderGuard(timeout=0)
+        disconnected = asyncio.Event()
+        request = _create_request(disconnected=disconnected)
+        started = asyncio.Event()
+
+        async def render():
+            started.set()
+            await asyncio.Event().wait()
+
+        run = asyncio.create_task(guard.run(request, render(), None))
+        await started.wait()
+
+        # Act
+        disconnected.set()
+
+        # Assert
+        with pytest.raises(HTTPException) as exc_info:
+            await run
+        assert exc_info.value.status_code == 499
+
+    @pytest.mark.asyncio
+    async def test_run_should_map_a_full_queue_to_503(self):
+        # Arrange
+        guard = RenderGuard(timeout=10.0)
+        request = _create_request()
+
+        async def render():
+            raise RenderQueueFullError(retry_after=3)
+
+        # Act
+        with pytest.raises(HTTPException) as exc_info:
+            await guard.run(request, render(), None)
+
+        # Assert
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers == {"Retry-After": "3"}
+
+    @pytest.mark.asyncio
+    async def test_get_deadline_should_not_let_clients_extend_the_timeout(self):
+        # Arrange
+        guard = RenderGuard(timeout=5.0)
+        request = _create_request({RENDER_TIMEOUT_HEADER: "60"})
+
+        # Act
+        deadline = guard.get_deadline(request)
+
+        # Assert
+        assert deadline is not None
+        assert deadline <= asyncio.get_running_loop().time() + 5.0
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("header", ["soon", "0", "-1", "nan"])
+    async def test_get_deadline_should_reject_invalid_headers(self, header: str):
+        # Arrange
+        guard = RenderGuard(timeout=5.0)
+        request = _create_request({RENDER_TIMEOUT_HEADER: header})
+
+        # Act & Assert
+        with pytest.raises(HTTPException) as exc_info:
+            guard.get_deadline(request)
+        assert exc_info.value.status_code == 400
@@ -7,6 +7,7 @@ from blender_camera.models.camera_model import CameraModel
 from blender_camera.models.entities.camera import Camera
 from blender_camera.models.entities.entity import Entity
 from blender_camera.models.entity_model import EntityModel
+from blender_camera.models.image_size import ImageSize
 from blender_camera.models.pose import Pose
 
 
@@ -109,6 +110,20 @@ class TestCameraModel:
         assert camera.pose == sample_pose
         assert camera.camera_intrinsics is sample_camera_intrinsics
 
+    def test_create_camera_with_image_size_should_create_camera_with_image_size(
+        self, camera_model: CameraModel
+    ):
+        """Test that create_camera with an image size stores it on the camera."""
+        # Arrange
+        image_size = ImageSize(width=1920, height=1080)
+
+        # Act
+        camera = camera_model.create_camera(image_size=image_size)
+
+        # Assert
+        assert isinstance(camera, Camera)
+        assert camera.image_size == image_size
+
     def test_create_camera_should_add_camera_to_entity_model(
         self, camera_model: CameraModel
     ):
@@ -1,3 +1,4 @@
+import zipfile
 from io import BytesIO
 from unittest.mock import Mock
 
@@ -5,7 +6,32 @@ import numpy as np
 import pytest
 from PIL import Image
 
-from blender_camera.models.frame import Frame, _to_8bit_png
+from blender_camera.models.frame import (
+    BACKGROUND_DEPTH,
+    Frame,
+    _ray_grids,
+    _RayGridCache,
+    _to_8bit_png,
+    archive_files,
+)
+from blender_camera.models.frame_product import FrameProduct
+from blender_camera.models.image_encoding import ImageEncoding
+from blender_camera.models.image_format import ImageFormat
+from blender_camera.models.point_cloud_filter import PointCloudFilter
+from blender_camera.models.render_pass import RenderPass
+
+
+def _read_ply(
+    ply_bytes: bytes, precision: type[np.floating] = np.float32
+) -> tuple[list[str], np.ndarray]:
+    """Split a binary PLY into its header lines and vertex records."""
+    header, _, body = ply_bytes.partition(b"end_header\n")
+    float_type = np.dtype(precision).newbyteorder("<")
+    vertex_dtype = np.dtype(
+        [("position", float_type, 3), ("normal", float_type, 3), ("color", "u1", 3)]
+    )
+    lines = header.decode("ascii").splitlines() + ["end_header"]
+    return lines, np.frombuffer(body, dtype=vertex_dtype)
 
 
 @pytest.fixture
@@ -122,10 +148,22 @@ class TestFrame:
         assert image.format == "PNG"
         assert image.size == (2, 2)  # width, height from our sample data
 
+    def test_to_image_bytes_should_encode_with_the_given_encoding(self, frame: Frame):
+        # Arrange
+        encoding = ImageEncoding(image_format=ImageFormat.JPEG, quality=50)
+
+        # Act
+        image_bytes = frame.to_image_bytes(RenderPass.NORMAL, encoding)
+
+        # Assert
+        image = Image.open(BytesIO(image_bytes))
+        assert image.format == "JPEG"
+        assert image.size == (2, 2)
+
     def test_depth_values_are_clipped_correctly(self, mock_camera):
-        """Test that depth values outside [0,1] range are clipped properly."""
+        """Test that depth values outside the [0,50] preview range are clipped."""
         # Arrange
-        depth_with_outliers = np.array([[-0.5, 0.5], [1.5, 0.8]], dtype=np.float32)
+        depth_with_outliers = np.array([[-25, 25], [75, 40]], dtype=np.float32)
         normal_data = np.zeros((2, 2, 3), dtype=np.float32)
         color_data = np.zeros((2, 2, 3), dtype=np.float32)
         frame = Frame(mock_camera, depth_with_outliers, normal_data, color_data)
@@ -138,12 +176,43 @@ class TestFrame:
         image = Image.open(BytesIO(png_bytes))
         image_array = np.array(image)
 
-        # Check that negative values became 0 (black) and >1 values became 255 (white)
+        # Check that negative values became 0 (black) and >50 values became 255 (white)
         # Note: PIL/numpy array indexing is [row, col] where our array is [[row0], [row1]]
-        assert image_array[0, 0] == 0  # -0.5 clipped to 0
-        assert image_array[0, 1] == 127  # 0.5 -> 127 (0.5 * 255 = 127.5 -> 127)
-        assert image_array[1, 0] == 255  # 1.5 clipped to 1.0 -> 255
-        assert image_array[1, 1] == 204  # 0.8 -> 204 (0.8 * 255 = 204)
+        assert image_array[0, 0] == 0  # -25 clipped to 0
+        assert image_array[0, 1] == 127  # 25 -> 127 (0.5 * 255 = 127.5 -> 127)
+        assert image_array[1, 0] == 255  # 75 clipped to 50 -> 255
+        assert image_array[1, 1] == 204  # 40 -> 204 (0.8 * 255 = 204)
+
+    def test_to_depth_png16_bytes_should_keep_depth_in_scaled_steps(self, mock_camera):
+        # Arrange
+        depth = np.array(
+            [[0.0012, 1.5], [BACKGROUND_DEPTH * 100, np.nan], [70.0, 65.535]],
+            dtype=np.float32,
+        )
+        frame = Frame(mock_camera, depth, None, None)
+
+        # Act
+        png_bytes = frame.to_depth_png16_bytes()
+
+        # Assert
+        image = Image.open(BytesIO(png_bytes))
+        assert image.mode == "I;16"
+        np.testing.assert_array_equal(
+            np.asarray(image), [[1, 1500], [0, 0], [0, 65535]]
+        )
+
+    def test_to_depth_png16_bytes_should_apply_the_scale(self, mock_camera):
+        # Arrange
+        depth = np.array([[0.25, 2.0]], dtype=np.float32)
+        frame = Frame(mock_camera, depth, None, None)
+
+        # Act
+        png_bytes = frame.to_depth_png16_bytes(scale=100.0)
+
+        # Assert
+        np.testing.assert_array_equal(
+            np.asarray(Image.open(BytesIO(png_bytes))), [[25, 200]]
+        )
 
     def test_color_values_are_clipped_correctly(self, mock_camera):
         """Test that color values outside [0,1] range are clipped properly."""
@@ -182,24 +251,24 @@ class TestFrame:
         assert isinstance(ply_bytes, bytes)
         assert len(ply_bytes) > 0
 
-        # Decode and verify PLY format
-        ply_content = ply_bytes.decode("utf-8")
-        lines = ply_content.strip().split("\n")
+        header, _ = _read_ply(ply_bytes)
 
         # Check header
-        assert lines[0] == "ply"
-        assert lines[1] == "format ascii 1.0"
-        assert "element vertex" in lines[2]
-        assert "property float x" in ply_content
-        assert "property float y" in ply_content
-        assert "property float z" in ply_content
-        assert "property float nx" in ply_content
-        assert "property float ny" in ply_content
-        assert "property float nz" in ply_content
-        assert "property uchar red" in ply_content
-        assert "property uchar green" in ply_content
-        assert "property uchar blue" in ply_content
-        assert "end_header" in ply_content
+        assert header[0] == "ply"
+        assert header[1] == "format binary_little_endian 1.0"
+        assert "element vertex" in header[2]
+        assert header[3:-1] == [
+            "property float x",
+            "property float y",
+            "property float z",
+            "property float nx",
+            "property float ny",
+            "property float nz",
+            "property uchar red",
+            "property uchar green",
+            "property uchar blue",
+        ]
+        assert header[-1] == "end_header"
 
     def test_to_ply_bytes_with_camera_intrinsics(
         self, sample_depth_data, sample_normal_data, sample_color_data
@@ -225,38 +294,12 @@ class TestFrame:
         ply_bytes = frame.to_ply_bytes()
 
         # Assert
-        assert isinstance(ply_bytes, bytes)
-        ply_content = ply_bytes.decode("utf-8")
-
-        # Verify we have the expected number of valid points (all depth values > 0)
-        lines = ply_content.strip().split("\n")
-        header_end = -1
-        for i, line in enumerate(lines):
-            if line == "end_header":
-                header_end = i
-                break
-
-        assert header_end >= 0
-        data_lines = lines[header_end + 1 :]
-        # Filter out empty lines
-        data_lines = [line for line in data_lines if line.strip()]
+        _, vertices = _read_ply(ply_bytes)
 
         # All 4 pixels have positive depth values, so we should have 4 points
-        assert len(data_lines) == 4
-
-        # Check that each data line has the correct format (x, y, z, nx, ny, nz, r, g, b)
-        for line in data_lines:
-            parts = line.split()
-            assert len(parts) == 9  # x, y, z, nx, ny, nz, r, g, b
-
-            # Check that coordinates are floats
-            for i in range(6):  # x, y, z, nx, ny, nz
-                float(parts[i])  # Should not raise exception
-
-            # Check that colors are integers in [0, 255]
-            for i in range(6, 9):  # r, g, b
-                color_val = int(parts[i])
-                assert 0 <= color_val <= 255
+        assert len(vertices) == 4
+        assert np.all(np.isfinite(vertices["position"]))
+        assert np.all(np.isfinite(vertices["normal"]))
 
     def test_to_ply_bytes_without_camera_intrinsics(
         self, sample_depth_data, sample_normal_data, sample_color_data
@@ -278,12 +321,10 @@ class TestFrame:
         ply_bytes = frame.to_ply_bytes()
 
         # Assert
-        assert isinstance(ply_bytes, bytes)
-        ply_content = ply_bytes.decode("utf-8")
-
         # Should still produce valid PLY data
-        assert "ply" in ply_content
-        assert "end_header" in ply_content
+        header, vertices = _read_ply(ply_bytes)
+        assert header[0] == "ply"
+        assert len(vertices) == 4
 
     def test_to_ply_bytes_skips_invalid_depth(
         self, mock_camera, sample_normal_data, sample_color_data
@@ -291,6 +332,7 @@ class TestFrame:
         """Test that invalid depth values (<=0, inf, nan) are skipped."""
         # Arrange
         depth_with_invalid = np.array([[0.1, -0.5], [np.inf, np.nan]], dtype=np.float32)
+        mock_camera.camera_intrinsics = None
         frame = Frame(
             camera=mock_camera,
             depth=depth_with_invalid,
@@ -302,27 +344,10 @@ class TestFrame:
         ply_bytes = frame.to_ply_bytes()
 
         # Assert
-        ply_content = ply_bytes.decode("utf-8")
-        lines = ply_content.strip().split("\n")
-
-        # Find the number of vertices in header
-        vertex_count = None
-        for line in lines:
-            if line.startswith("element vertex"):
-                vertex_count = int(line.split()[-1])
-                break
-
-        assert vertex_count == 1  # Only one valid depth value (0.1)
-
-        # Count actual data lines
-        header_end = -1
-        for i, line in enumerate(lines):
-            if line == "end_header":
-                header_end = i
-                break
-
-        data_lines = [line for line in lines[header_end + 1 :] if line.strip()]
-        assert len(data_lines) == 1
+        header, vertices = _read_ply(ply_bytes)
+        assert "element vertex 1" in header  # Only one valid depth value (0.1)
+        assert len(vertices) == 1
+        assert vertices["position"][0][2] == pytest.approx(0.1)
 
     def test_to_ply_bytes_coordinate_calculation(self):
         """Test that PLY coordinates are calculated correctly."""
@@ -353,35 +378,314 @@ class TestFrame:
         ply_bytes = frame.to_ply_bytes()
 
         # Assert
-        ply_content = ply_bytes.decode("utf-8")
-        lines = ply_content.strip().split("\n")
-
-        # Find the data line
-        header_end = -1
-        for i, line in enumerate(lines):
-            if line == "end_header":
-                header_end = i
-                break
-
-        data_line = lines[header_end + 1]
-        parts = data_line.split()
+        _, vertices = _read_ply(ply_bytes)
+        vertex = vertices[0]
 
         # Expected coordinates: x = (0 - 0.5) * 1.0 / 100.0 = -0.005
         #                      y = (0 - 0.5) * 1.0 / 100.0 = -0.005
         #                      z = 1.0
-        assert float(parts[0]) == pytest.approx(-0.005, abs=1e-6)  # x
-        assert float(parts[1]) == pytest.approx(-0.005, abs=1e-6)  # y
-        assert float(parts[2]) == pytest.approx(1.0, abs=1e-6)  # z
+        assert vertex["position"] == pytest.approx([-0.005, -0.005, 1.0], abs=1e-6)
 
         # Normal should be [0.0, 0.0, 1.0]
-        assert float(parts[3]) == pytest.approx(0.0, abs=1e-6)  # nx
-        assert float(parts[4]) == pytest.approx(0.0, abs=1e-6)  # ny
-        assert float(parts[5]) == pytest.approx(1.0, abs=1e-6)  # nz
+        assert vertex["normal"] == pytest.approx([0.0, 0.0, 1.0], abs=1e-6)
 
         # Colors should be [255, 127, 0]
-        assert int(parts[6]) == 255  # red
-        assert int(parts[7]) == 127  # green
-        assert int(parts[8]) == 0  # blue
+        assert list(vertex["color"]) == [255, 127, 0]
+
+    def test_to_ply_bytes_with_double_precision(self, frame: Frame):
+        """Test that points can be written as doubles."""
+        # Act
+        ply_bytes = frame.to_ply_bytes(np.float64)
+
+        # Assert
+        header, vertices = _read_ply(ply_bytes, np.float64)
+        assert "property double x" in header
+        assert np.allclose(
+            vertices["position"], frame.to_ply_vertices()["position"], atol=1e-6
+        )
+
+    def test_iter_ply_should_stream_the_same_ply_in_chunks(self, mock_camera):
+        """Test that a chunked PLY matches the PLY encoded in one piece."""
+        # Arrange
+        mock_camera.camera_intrinsics = None
+        depth = np.random.rand(6, 4).astype(np.float32)
+        depth[2, 1] = np.nan
+        normal = np.random.rand(6, 4, 3).astype(np.float32)
+        color = np.random.rand(6, 4, 3).astype(np.float32)
+        frame = Frame(camera=mock_camera, depth=depth, normal=normal, color=color)
+
+        # Act
+        chunks = list(frame.iter_ply(chunk_pixels=8))
+
+        # Assert
+        assert len(chunks) == 1 + 3  # The header, then two rows at a time
+        assert b"".join(chunks) == frame.to_ply_bytes()
+        _, vertices = _read_ply(b"".join(chunks))
+        assert len(vertices) == 23
+
+    def test_iter_ply_should_build_the_ray_grid_once_per_stream(self, mock_camera):
+        """Test that chunks share one ray grid instead of each looking it up."""
+        # Arrange
+        mock_camera.camera_intrinsics = None
+        depth = np.random.rand(6, 4).astype(np.float32)
+        normal = color = np.zeros((6, 4, 3), dtype=np.float32)
+        frame = Frame(camera=mock_camera, depth=depth, normal=normal, color=color)
+        _ray_grids.clear()
+
+        # Act
+        chunks = list(frame.iter_ply(chunk_pixels=4))
+
+        # Assert
+        assert len(chunks) == 1 + 6
+        assert (_ray_grids.misses, _ray_grids.hits) == (1, 0)
+
+    def test_iter_ply_should_compute_points_only_once_read(
+        self, frame: Frame, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that the mask and voxels are computed by whoever reads the stream."""
+        # Arrange
+        get_point_mask = Mock(wraps=frame.get_point_mask)
+        monkeypatch.setattr(frame, "get_point_mask", get_point_mask)
+
+        # Act
+        stream = frame.iter_ply(point_filter=PointCloudFilter(voxel_size=0.5))
+        computed_before_reading = get_point_mask.called
+        ply_bytes = b"".join(stream)
+
+        # Assert
+        assert not computed_before_reading
+        get_point_mask.assert_called_once()
+        _, vertices = _read_ply(ply_bytes)
+        assert len(vertices) > 0
+
+    def test_iter_ply_should_fail_before_streaming_without_colors(
+        self, mock_camera, sample_depth_data, sample_normal_data
+    ):
+        """Test that a missing pass raises before the first chunk is produced."""
+        # Arrange
+        frame = Frame(
+            camera=mock_camera,
+            depth=sample_depth_data,
+            normal=sample_normal_data,
+            color=None,
+        )
+
+        # Act & Assert
+        with pytest.raises(ValueError, match="color"):
+            frame.iter_ply()
+
+    def test_get_point_mask_should_apply_the_filter(self, mock_camera):
+        """Test that background, depth range and stride each remove pixels."""
+        # Arrange
+        depth = np.array(
+            [[1.0, 2.0, 3.0, 1e10], [4.0, 5.0, 6.0, 1e10]], dtype=np.float32
+        )
+        frame = Frame(camera=mock_camera, depth=depth, normal=None, color=None)
+
+        # Act
+        background = frame.get_point_mask(PointCloudFilter(drop_background=True))
+        depth_range = frame.get_point_mask(
+            PointCloudFilter(min_depth=2.0, max_depth=5.0)
+        )
+        strided = frame.get_point_mask(PointCloudFilter(stride=2))
+
+        # Assert
+        assert background.tolist() == [[True, True, True, False]] * 2
+        assert depth_range.tolist() == [
+            [False, True, True, False],
+            [True, True, False, False],
+        ]
+        assert strided.tolist() == [[True, False, True, False], [False] * 4]
+
+    def test_to_ply_bytes_should_merge_points_per_voxel(self, mock_camera):
+        """Test that voxel downsampling averages the points of each voxel."""
+        # Arrange
+        mock_camera.camera_intrinsics = Mock(fx=10.0, fy=10.0, cx=-1.0, cy=-1.0)
+        depth = np.array([[1.0, 1.0], [1.0, 1.0]], dtype=np.float32)
+        normal = np.zeros((2, 2, 3), dtype=np.float32)
+        normal[..., 2] = 1.0
+        color = np.array(
+            [[[1.0, 0.0, 0.0], [0.0, 0.0, 1.0]], [[1.0, 0.0, 0.0], [0.0, 0.0, 1.0]]],
+            dtype=np.float32,
+        )
+        frame = Frame(camera=mock_camera, depth=depth, normal=normal, color=color)
+
+        # Act
+        ply_bytes = frame.to_ply_bytes(point_filter=PointCloudFilter(voxel_size=10.0))
+
+        # Assert
+        _, vertices = _read_ply(ply_bytes)
+        assert len(vertices) == 1
+        assert vertices["position"][0] == pytest.approx([0.15, 0.15, 1.0])
+        assert vertices["normal"][0] == pytest.approx([0.0, 0.0, 1.0])
+        assert list(vertices["color"][0]) == [128, 0, 128]
+
+    def test_iter_npy_should_encode_a_pass_of_the_interleaved_buffer(self, mock_camera):
+        """Test that a strided pass view streams as a loadable .npy file."""
+        # Arrange
+        frame = Frame.allocate(mock_camera, 5, 3, list(RenderPass))
+        frame.normal[:] = np.arange(5 * 3 * 3, dtype=np.float32).reshape(5, 3, 3)
+
+        # Act
+        chunks = list(frame.iter_npy(RenderPass.NORMAL, chunk_pixels=6))
+
+        # Assert
+        assert len(chunks) == 1 + 3  # The header, then two rows at a time
+        normal = np.load(BytesIO(b"".join(chunks)))
+        assert normal.dtype == np.float32
+        assert np.array_equal(normal, frame.normal)
+
+    def test_iter_raw_should_yield_the_pass_bytes_in_c_order(
+        self, mock_camera, sample_depth_data
+    ):
+        """Test that the raw bytes of a pass decode back into the pass."""
+        # Arrange
+        frame = Frame(
+            camera=mock_camera, depth=sample_depth_data, normal=None, color=None
+        )
+
+        # Act
+        raw = b"".join(frame.iter_raw(RenderPass.DEPTH))
+
+        # Assert
+        assert np.array_equal(
+            np.frombuffer(raw, dtype=np.float32).reshape(2, 2), sample_depth_data
+        )
+
+    def test_archive_files_contains_requested_products(self, frame: Frame):
+        """Test that the archive holds one entry per requested product."""
+        # Arrange
+        files = frame.to_product_files([FrameProduct.COLORS, FrameProduct.DEPTH])
+
+        # Act
+        archive_bytes = archive_files(files)
+
+        # Assert
+        with zipfile.ZipFile(BytesIO(archive_bytes)) as zf:
+            assert zf.namelist() == ["colors.png", "depth.png"]
+            assert zf.read("colors.png") == frame.to_color_png_bytes()
+            assert zf.read("depth.png") == frame.to_depth_png_bytes()
+
+    def test_to_product_files_ignores_duplicate_products(self, frame: Frame):
+        """Test that a product requested twice is only encoded once."""
+        # Act
+        files = frame.to_product_files([FrameProduct.NORMALS, FrameProduct.NORMALS])
+
+        # Assert
+        assert list(files) == ["normals.png"]
+
+    def test_frame_without_a_pass_encodes_the_other_products(
+        self, mock_camera, sample_depth_data
+    ):
+        """Test that a depth-only frame encodes depth but refuses colors."""
+        # Arrange
+        frame = Frame(
+            camera=mock_camera, depth=sample_depth_data, normal=None, color=None
+        )
+
+        # Act
+        depth_png = frame.to_depth_png_bytes()
+
+        # Assert
+        assert depth_png.startswith(b"\x89PNG")
+        assert frame.nbytes == sample_depth_data.nbytes
+        with pytest.raises(ValueError, match="color"):
+            frame.to_color_png_bytes()
+
+    def test_allocate_should_interleave_passes_in_one_buffer(self, mock_camera):
+        """Test that an allocated frame exposes its passes as views of one buffer."""
+        # Act
+        frame = Frame.allocate(mock_camera, 4, 5, [RenderPass.DEPTH, RenderPass.COLOR])
+
+        # Assert
+        assert frame.depth.shape == (4, 5)
+        assert frame.color.shape == (4, 5, 3)
+        assert frame.normal is None
+        assert frame.depth.base is frame.color.base
+        assert frame.depth.base.shape == (4, 5, 4)
+        assert frame.depth.dtype == np.float32
+        assert frame.nbytes == 4 * 5 * 4 * 4
+
+    def test_to_ply_vertices_should_scale_pixel_rays_by_depth(
+        self, sample_depth_data, sample_normal_data, sample_color_data
+    ):
+        """Test that positions follow the pinhole model for every pixel."""
+        # Arrange
+        camera = Mock()
+        camera.camera_intrinsics = Mock(fx=100.0, fy=50.0, cx=1.0, cy=0.5)
+        frame = Frame(
+            camera=camera,
+            depth=sample_depth_data,
+            normal=sample_normal_data,
+            color=sample_color_data,
+        )
+
+        # Act
+        positions = frame.to_ply_vertices()["position"]
+
+        # Assert
+        assert positions.shape == (4, 3)
+        assert positions.dtype == np.float32
+        assert positions[2] == pytest.approx(
+            [(0 - 1.0) * 0.8 / 100.0, (1 - 0.5) * 0.8 / 50.0, 0.8]
+        )
+
+    def test_to_ply_vertices_should_center_cameras_without_intrinsics(self):
+        """Test the default intrinsics that the render script also uses."""
+        # Arrange
+        camera = Mock()
+        camera.camera_intrinsics = None
+        depth = np.ones((3, 5), dtype=np.float32)
+        normal = color = np.zeros((3, 5, 3), dtype=np.float32)
+        frame = Frame(camera=camera, depth=depth, normal=normal, color=color)
+
+        # Act
+        positions = frame.to_ply_vertices()["position"].reshape(3, 5, 3)
+
+        # Assert
+        assert positions[1, 2] == pytest.approx([0.0, 0.0, 1.0])
+        assert positions[0, 4] == pytest.approx([2 / 5, -1 / 5, 1.0])
+
+    def test_to_ply_vertices_should_reuse_the_ray_grid_of_a_camera(
+        self, sample_depth_data, sample_normal_data, sample_color_data
+    ):
+        """Test that frames of the same camera share one cached ray grid."""
+        # Arrange
+        camera = Mock()
+        camera.camera_intrinsics = Mock(fx=10.0, fy=10.0, cx=1.0, cy=1.0)
+        frames = [
+            Frame(
+                camera=camera,
+                depth=depth,
+                normal=sample_normal_data,
+                color=sample_color_data,
+            )
+            for depth in (sample_depth_data, sample_depth_data * 2)
+        ]
+        _ray_grids.clear()
+
+        # Act
+        first, second = (frame.to_ply_vertices()["position"] for frame in frames)
+
+        # Assert
+        assert _ray_grids.hits == 1
+        assert np.allclose(second, first * 2)
+
+    def test_ray_grid_cache_should_evict_grids_beyond_its_byte_budget(self):
+        """Test that ray grids are bounded by bytes, with only x and y stored."""
+        # Arrange
+        ray_grids = _RayGridCache(max_bytes=2 * 4 * 4 * 2 * 4)  # Two 4x4 grids
+        first = ray_grids.get(4, 4, 10.0, 10.0, 1.0, 1.0)
+
+        # Act
+        ray_grids.get(4, 4, 20.0, 20.0, 1.0, 1.0)
+        ray_grids.get(4, 4, 30.0, 30.0, 1.0, 1.0)
+        again = ray_grids.get(4, 4, 10.0, 10.0, 1.0, 1.0)
+
+        # Assert
+        assert first.shape == (4, 4, 2)
+        assert again is not first
+        assert ray_grids.misses == 4
 
 
 class TestTo8bitPng:
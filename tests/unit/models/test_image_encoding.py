@@ -0,0 +1,73 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+from pydantic import ValidationError
+
+from blender_camera.models.image_encoding import ImageEncoding
+from blender_camera.models.image_format import ImageFormat
+
+
+@pytest.fixture
+def noisy_image():
+    return np.random.default_rng(0).integers(0, 256, (32, 48, 3), dtype=np.uint8)
+
+
+class TestImageEncoding:
+    @pytest.mark.parametrize(
+        ("image_format", "pil_format"),
+        [
+            (ImageFormat.PNG, "PNG"),
+            (ImageFormat.JPEG, "JPEG"),
+            (ImageFormat.WEBP, "WEBP"),
+        ],
+    )
+    def test_encode_should_write_the_chosen_format(
+        self, noisy_image: np.ndarray, image_format: ImageFormat, pil_format: str
+    ):
+        # Arrange
+        encoding = ImageEncoding(image_format=image_format)
+
+        # Act
+        image = Image.open(BytesIO(encoding.encode(noisy_image)))
+
+        # Assert
+        assert image.format == pil_format
+        assert image.size == (48, 32)
+
+    def test_encode_should_store_png_losslessly_at_every_level(
+        self, noisy_image: np.ndarray
+    ):
+        # Act
+        stored = ImageEncoding(compress_level=0).encode(noisy_image)
+        compressed = ImageEncoding(compress_level=9).encode(noisy_image)
+
+        # Assert
+        assert len(stored) > noisy_image.nbytes
+        for png_bytes in (stored, compressed):
+            decoded = np.asarray(Image.open(BytesIO(png_bytes)))
+            np.testing.assert_array_equal(decoded, noisy_image)
+
+    def test_encode_should_shrink_jpeg_with_lower_quality(
+        self, noisy_image: np.ndarray
+    ):
+        # Act
+        high = ImageEncoding(image_format=ImageFormat.JPEG, quality=95)
+        low = ImageEncoding(image_format=ImageFormat.JPEG, quality=10)
+
+        # Assert
+        assert len(low.encode(noisy_image)) < len(high.encode(noisy_image))
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {"image_format": ImageFormat.NPY},
+            {"compress_level": 10},
+            {"quality": 0},
+        ],
+    )
+    def test_init_should_reject_invalid_options(self, options: dict):
+        # Act & Assert
+        with pytest.raises(ValidationError):
+            ImageEncoding(**options)
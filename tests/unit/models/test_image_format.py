@@ -0,0 +1,73 @@
+import pytest
+
+from blender_camera.models.image_format import ImageFormat
+
+
+class TestImageFormat:
+    @pytest.mark.parametrize(
+        ("accept", "expected"),
+        [
+            (None, ImageFormat.PNG),
+            ("*/*", ImageFormat.PNG),
+            ("application/x-npy", ImageFormat.NPY),
+            ("text/html, application/octet-stream;q=0.9", ImageFormat.RAW),
+            ("Application/X-NPY, image/png", ImageFormat.NPY),
+            ("image/avif, image/webp, */*", ImageFormat.PNG),
+            ("image/png", ImageFormat.PNG),
+        ],
+    )
+    def test_from_accept_should_pick_the_first_known_media_type(
+        self, accept: str | None, expected: ImageFormat
+    ):
+        # Act
+        image_format = ImageFormat.from_accept(accept)
+
+        # Assert
+        assert image_format is expected
+
+    @pytest.mark.parametrize(
+        ("accept", "expected"),
+        [
+            ("application/octet-stream;q=0, */*", ImageFormat.PNG),
+            ("application/octet-stream;q=0.5, application/x-npy", ImageFormat.NPY),
+            ("image/png;q=0.2, application/octet-stream; Q=0.8", ImageFormat.RAW),
+            ("application/x-npy;q=0.5, image/png;q=0.5", ImageFormat.NPY),
+            ("application/x-npy;q=oops, image/png;q=0.1", ImageFormat.PNG),
+        ],
+    )
+    def test_from_accept_should_pick_the_highest_q_value(
+        self, accept: str, expected: ImageFormat
+    ):
+        # Act
+        image_format = ImageFormat.from_accept(accept)
+
+        # Assert
+        assert image_format is expected
+
+    @pytest.mark.parametrize(
+        "accept",
+        [
+            # Chrome and Firefox loading an <img>
+            "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
+            "image/avif,image/webp,image/png,image/svg+xml,image/*;q=0.8,*/*;q=0.5",
+            # Chrome navigating to the URL
+            "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,"
+            "image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+            "image/jpeg",
+        ],
+    )
+    def test_from_accept_should_never_negotiate_lossy_formats(self, accept: str):
+        # Act
+        image_format = ImageFormat.from_accept(accept)
+
+        # Assert
+        assert image_format is ImageFormat.PNG
+
+    def test_is_array_should_only_hold_for_float_formats(self):
+        # Act
+        array_formats = {
+            image_format for image_format in ImageFormat if image_format.is_array
+        }
+
+        # Assert
+        assert array_formats == {ImageFormat.NPY, ImageFormat.RAW}
@@ -0,0 +1,28 @@
+import pytest
+from pydantic import ValidationError
+
+from blender_camera.models.point_cloud_filter import PointCloudFilter
+
+
+class TestPointCloudFilter:
+    def test_defaults_should_keep_every_valid_pixel(self):
+        # Act
+        point_filter = PointCloudFilter()
+
+        # Assert
+        assert not point_filter.drop_background
+        assert point_filter.stride == 1
+        assert point_filter.voxel_size is None
+
+    def test_should_reject_an_empty_depth_range(self):
+        # Act & Assert
+        with pytest.raises(ValidationError):
+            PointCloudFilter(min_depth=2.0, max_depth=1.0)
+
+    @pytest.mark.parametrize(
+        "fields", [{"stride": 0}, {"voxel_size": 0.0}, {"min_depth": -1.0}]
+    )
+    def test_should_reject_out_of_range_values(self, fields: dict):
+        # Act & Assert
+        with pytest.raises(ValidationError):
+            PointCloudFilter(**fields)
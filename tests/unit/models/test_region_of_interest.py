@@ -0,0 +1,68 @@
+import pytest
+
+from blender_camera.models.camera_intrinsics import CameraIntrinsics
+from blender_camera.models.entities.camera import Camera
+from blender_camera.models.image_size import ImageSize
+from blender_camera.models.region_of_interest import RegionOfInterest
+
+
+class TestRegionOfInterest:
+    """Test cases for pixel regions of interest."""
+
+    def test_parse_should_read_x_y_width_height(self):
+        """Test that a comma separated region is parsed in order."""
+        # Act
+        region = RegionOfInterest.parse("10,20,30,40")
+
+        # Assert
+        assert region == RegionOfInterest(x=10, y=20, width=30, height=40)
+
+    @pytest.mark.parametrize("value", ["", "1,2,3", "1,2,3,4,5", "a,b,c,d", "0,0,0,10"])
+    def test_parse_should_reject_malformed_regions(self, value: str):
+        """Test that malformed or empty regions raise ValueError."""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            RegionOfInterest.parse(value)
+
+    def test_fits_should_check_the_region_is_inside_the_image(self):
+        """Test that regions reaching past the image edges do not fit."""
+        # Arrange
+        image_size = ImageSize(width=100, height=50)
+
+        # Act & Assert
+        assert RegionOfInterest(x=60, y=0, width=40, height=50).fits(image_size)
+        assert not RegionOfInterest(x=61, y=0, width=40, height=50).fits(image_size)
+        assert not RegionOfInterest(x=0, y=1, width=40, height=50).fits(image_size)
+
+    def test_crop_should_move_the_principal_point_into_the_region(self):
+        """Test that cropping keeps the focal length and shifts the center."""
+        # Arrange
+        camera = Camera(
+            id="camera",
+            pose=[0.0, 0.0, 5.0, 0.0, 0.0, 0.0],
+            camera_intrinsics=CameraIntrinsics(fx=500.0, fy=400.0, cx=320.0, cy=240.0),
+            image_size=ImageSize(width=640, height=480),
+        )
+        region = RegionOfInterest(x=100, y=40, width=64, height=48)
+
+        # Act
+        cropped = region.crop(camera)
+
+        # Assert
+        assert cropped.camera_intrinsics == CameraIntrinsics(
+            fx=500.0, fy=400.0, cx=220.0, cy=200.0
+        )
+        assert cropped.image_size == ImageSize(width=64, height=48)
+        assert camera.image_size == ImageSize(width=640, height=480)
+
+    def test_split_rows_should_cover_the_image_with_bands(self):
+        """Test that splitting gives full-width bands without gaps or overlap."""
+        # Arrange
+        image_size = ImageSize(width=64, height=10)
+
+        # Act
+        bands = RegionOfInterest.split_rows(image_size, 3)
+
+        # Assert
+        assert [(band.y, band.height) for band in bands] == [(0, 3), (3, 3), (6, 4)]
+        assert all(band.x == 0 and band.width == 64 for band in bands)
@@ -0,0 +1,31 @@
+from blender_camera.models.frame_product import FrameProduct
+from blender_camera.models.render_pass import RenderPass
+
+
+class TestRenderPass:
+    """Test cases for mapping products to render passes."""
+
+    def test_required_by_single_image_product_should_need_one_pass(self):
+        """Test that a depth image only needs the depth pass."""
+        # Act
+        passes = RenderPass.required_by([FrameProduct.DEPTH])
+
+        # Assert
+        assert passes == [RenderPass.DEPTH]
+
+    def test_required_by_pointcloud_should_need_every_pass(self):
+        """Test that a pointcloud needs positions, normals and colors."""
+        # Act
+        passes = RenderPass.required_by([FrameProduct.POINTCLOUD])
+
+        # Assert
+        assert passes == [RenderPass.COLOR, RenderPass.NORMAL, RenderPass.DEPTH]
+
+    def test_required_by_should_not_depend_on_product_order(self):
+        """Test that the passes are in a stable order for cache keys."""
+        # Act
+        forward = RenderPass.required_by([FrameProduct.DEPTH, FrameProduct.COLORS])
+        backward = RenderPass.required_by([FrameProduct.COLORS, FrameProduct.DEPTH])
+
+        # Assert
+        assert forward == backward == [RenderPass.COLOR, RenderPass.DEPTH]
@@ -0,0 +1,34 @@
+from blender_camera.models.frame_product import FrameProduct
+from blender_camera.models.render_preset import RenderPreset
+
+
+class TestRenderPreset:
+    """Test cases for render presets."""
+
+    def test_default_for_geometric_products_should_be_geometry(self):
+        """Test that depth, normals and pointclouds default to the geometry preset."""
+        # Act
+        preset = RenderPreset.default_for(
+            [FrameProduct.DEPTH, FrameProduct.NORMALS, FrameProduct.POINTCLOUD]
+        )
+
+        # Assert
+        assert preset == RenderPreset.GEOMETRY
+
+    def test_default_for_colors_should_be_final(self):
+        """Test that any request for colors defaults to the final preset."""
+        # Act
+        preset = RenderPreset.default_for([FrameProduct.DEPTH, FrameProduct.COLORS])
+
+        # Assert
+        assert preset == RenderPreset.FINAL
+
+    def test_geometry_preset_should_use_fewer_samples_than_final(self):
+        """Test that the geometry preset is cheaper to render than the final one."""
+        # Act
+        geometry = RenderPreset.GEOMETRY.settings
+        final = RenderPreset.FINAL.settings
+
+        # Assert
+        assert geometry.samples < final.samples
+        assert geometry.max_bounces < final.max_bounces
@@ -1,8 +1,16 @@
+import hashlib
 import os
+from io import BytesIO
 from unittest.mock import Mock, patch
 
+import pytest
+
 from blender_camera.models.scene import Scene
-from blender_camera.models.scene_model import SceneModel
+from blender_camera.models.scene_model import (
+    BLEND_CHUNK_BYTES,
+    BlendFileTooLargeError,
+    SceneModel,
+)
 
 
 class TestSceneModel:
@@ -72,6 +80,23 @@ class TestSceneModel:
         if os.path.exists(scene.blend_path):
             os.remove(scene.blend_path)
 
+    def test_create_scene_should_hash_blend_data(
+        self, scene_model: SceneModel, sample_blend_data: bytes
+    ):
+        """Test that create_scene records the SHA-256 of the blend data."""
+        # Arrange
+        expected_hash = hashlib.sha256(sample_blend_data).hexdigest()
+
+        # Act
+        scene = scene_model.create_scene(sample_blend_data)
+
+        # Assert
+        assert scene.blend_hash == expected_hash
+
+        # Cleanup
+        if os.path.exists(scene.blend_path):
+            os.remove(scene.blend_path)
+
     def test_create_scene_should_add_scene_to_internal_dict(
         self, scene_model: SceneModel, sample_blend_data: bytes
     ):
@@ -228,3 +253,90 @@ class TestSceneModel:
         # Cleanup
         if os.path.exists(test_path):
             os.remove(test_path)
+
+    def test_create_scene_from_stream_should_copy_and_hash_in_chunks(
+        self, scene_model: SceneModel
+    ):
+        """Test that a stream larger than one chunk is copied and hashed whole."""
+        # Arrange
+        blend_data = os.urandom(BLEND_CHUNK_BYTES * 2 + 123)
+        stream = BytesIO(blend_data)
+        read_sizes = []
+        read = stream.read
+        stream.read = lambda size=-1: read_sizes.append(size) or read(size)
+
+        # Act
+        scene = scene_model.create_scene_from_stream(stream, max_bytes=len(blend_data))
+
+        # Assert
+        assert set(read_sizes) == {BLEND_CHUNK_BYTES}
+        with open(scene.blend_path, "rb") as f:
+            assert f.read() == blend_data
+        assert scene.blend_hash == hashlib.sha256(blend_data).hexdigest()
+
+        # Cleanup
+        os.remove(scene.blend_path)
+
+    @patch("blender_camera.models.scene_model.BLEND_CHUNK_BYTES", 4)
+    def test_create_scene_from_stream_should_reject_oversize_files(
+        self, scene_model: SceneModel, sample_blend_data: bytes, tmp_path, monkeypatch
+    ):
+        """Test that an oversize file is rejected early and nothing is left behind."""
+        # Arrange
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+        stream = BytesIO(sample_blend_data)
+
+        # Act & Assert
+        with pytest.raises(BlendFileTooLargeError):
+            scene_model.create_scene_from_stream(stream, max_bytes=8)
+
+        # Assert
+        assert stream.tell() < len(sample_blend_data)
+        assert list(tmp_path.iterdir()) == []
+        assert scene_model.get_scenes() == []
+
+    @pytest.mark.asyncio
+    async def test_create_scene_from_chunks_should_write_and_hash_the_chunks(
+        self, scene_model: SceneModel
+    ):
+        """Test that received chunks are written into the store as they arrive."""
+        # Arrange
+        blend_data = os.urandom(BLEND_CHUNK_BYTES + 123)
+
+        async def chunks():
+            for start in range(0, len(blend_data), 1000):
+                yield blend_data[start : start + 1000]
+
+        # Act
+        scene = await scene_model.create_scene_from_chunks(chunks())
+
+        # Assert
+        with open(scene.blend_path, "rb") as f:
+            assert f.read() == blend_data
+        assert scene.blend_hash == hashlib.sha256(blend_data).hexdigest()
+
+        # Cleanup
+        os.remove(scene.blend_path)
+
+    @pytest.mark.asyncio
+    async def test_create_scene_from_chunks_should_stop_receiving_oversize_files(
+        self, scene_model: SceneModel, tmp_path, monkeypatch
+    ):
+        """Test that a file is rejected once it passes the limit while received."""
+        # Arrange
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+        received = []
+
+        async def chunks():
+            for _ in range(100):
+                received.append(b"x" * 4)
+                yield received[-1]
+
+        # Act & Assert
+        with pytest.raises(BlendFileTooLargeError):
+            await scene_model.create_scene_from_chunks(chunks(), max_bytes=10)
+
+        # Assert
+        assert len(received) == 3
+        assert list(tmp_path.iterdir()) == []
+        assert scene_model.get_scenes() == []
@@ -0,0 +1,94 @@
+from collections import namedtuple
+from unittest.mock import Mock
+
+import pytest
+
+from blender_camera.models.camera_intrinsics import CameraIntrinsics
+from blender_camera.models.entities.camera import Camera
+from blender_camera.models.image_size import ImageSize
+from blender_camera.models.render_pass import RenderPass
+from blender_camera.scripts import render_frame_script
+from blender_camera.scripts.render_frame_script import (
+    RenderFrameScript,
+    RenderTransport,
+)
+
+DiskUsage = namedtuple("DiskUsage", "total used free")
+
+
+@pytest.fixture
+def shm_dir(monkeypatch: pytest.MonkeyPatch, tmp_path) -> str:
+    monkeypatch.setattr(render_frame_script, "SHM_DIRECTORY", str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def shm_free_bytes(monkeypatch: pytest.MonkeyPatch, shm_dir: str) -> int:
+    """Docker's default size of /dev/shm."""
+    free = 64 * 2**20
+    monkeypatch.setattr(
+        render_frame_script.shutil, "disk_usage", lambda _: DiskUsage(free, 0, free)
+    )
+    return free
+
+
+def _camera(width: int, height: int) -> Camera:
+    return Camera(
+        id="camera",
+        pose=[0.0, 0.0, 5.0, 0.0, 0.0, 0.0],
+        camera_intrinsics=CameraIntrinsics(
+            fx=width, fy=width, cx=width / 2, cy=height / 2
+        ),
+        image_size=ImageSize(width=width, height=height),
+    )
+
+
+class TestRenderTransport:
+    def test_check_should_keep_the_file_transport(self):
+        # Act & Assert
+        assert RenderTransport.FILE.check(4) is RenderTransport.FILE
+
+    def test_check_should_fall_back_to_files_without_shared_memory(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path
+    ):
+        # Arrange
+        monkeypatch.setattr(
+            render_frame_script, "SHM_DIRECTORY", str(tmp_path / "missing")
+        )
+
+        # Act & Assert
+        assert RenderTransport.SHM.check(1) is RenderTransport.FILE
+
+    def test_check_should_fall_back_to_files_when_shared_memory_is_too_small(
+        self, shm_free_bytes: int
+    ):
+        # Act & Assert
+        assert RenderTransport.SHM.check(2) is RenderTransport.FILE
+
+    def test_check_should_keep_shared_memory_with_room_for_every_render(
+        self, shm_dir: str
+    ):
+        # Act & Assert
+        assert RenderTransport.SHM.check(1) is RenderTransport.SHM
+
+
+class TestRenderFrameScriptTmpDir:
+    def test_get_tmp_dir_should_use_shared_memory_for_frames_that_fit(
+        self, shm_dir: str, shm_free_bytes: int
+    ):
+        # Arrange
+        script = RenderFrameScript(Mock(), None, RenderTransport.SHM)
+
+        # Act & Assert
+        assert script._get_tmp_dir([_camera(640, 480)], None) == shm_dir
+
+    def test_get_tmp_dir_should_use_files_for_frames_that_do_not_fit(
+        self, shm_free_bytes: int
+    ):
+        # Arrange
+        script = RenderFrameScript(Mock(), None, RenderTransport.SHM)
+        camera = _camera(3840, 2160)  # 232 MB with every pass
+
+        # Act & Assert
+        assert script._get_tmp_dir([camera], None) is None
+        assert script._get_tmp_dir([camera], [RenderPass.DEPTH]) is not None
@@ -0,0 +1,179 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from blender_camera import blender
+from blender_camera.blender import BlenderWorkerPool
+
+
+class FakeWorker:
+    """Stands in for a Blender process, stops finish when `release_stop` is set."""
+
+    instances: list["FakeWorker"] = []
+
+    def __init__(self, scene_path: str):
+        self.alive = False
+        self.last_used = 0.0
+        self.renders = 0
+        self.stopping = asyncio.Event()
+        self.release_stop = asyncio.Event()
+        self.release_stop.set()
+        FakeWorker.instances.append(self)
+
+    async def start(self):
+        self.alive = True
+
+    async def render_frame(self, input_path, output_path, on_frame=None):
+        self.renders += 1
+        await asyncio.sleep(0)
+        self.last_used = time.monotonic()
+
+    async def stop(self):
+        self.stopping.set()
+        await self.release_stop.wait()
+        self.alive = False
+
+
+@pytest.fixture
+def fake_workers(monkeypatch: pytest.MonkeyPatch) -> list[FakeWorker]:
+    FakeWorker.instances = []
+    monkeypatch.setattr(blender, "BlenderWorker", FakeWorker)
+    return FakeWorker.instances
+
+
+class TestBlenderWorkerPool:
+    @pytest.mark.asyncio
+    async def test_render_frame_should_reuse_the_released_worker(
+        self, fake_workers: list[FakeWorker]
+    ):
+        # Arrange
+        pool = BlenderWorkerPool("scene.blend", size=2, idle_timeout=60)
+
+        # Act
+        await pool.render_frame("in", "out")
+        await pool.render_frame("in", "out")
+
+        # Assert
+        assert len(fake_workers) == 1
+        assert fake_workers[0].renders == 2
+        assert pool.free_workers == 2
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_render_frame_should_replace_dead_idle_workers(
+        self, fake_workers: list[FakeWorker]
+    ):
+        # Arrange
+        pool = BlenderWorkerPool("scene.blend", size=1, idle_timeout=60)
+        await pool.render_frame("in", "out")
+        fake_workers[0].alive = False
+
+        # Act
+        await pool.render_frame("in", "out")
+
+        # Assert
+        assert len(fake_workers) == 2
+        assert fake_workers[1].renders == 1
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_reap_should_stop_idle_workers_and_keep_running(
+        self, fake_workers: list[FakeWorker]
+    ):
+        # Arrange
+        pool = BlenderWorkerPool("scene.blend", size=2, idle_timeout=0.2)
+        await asyncio.gather(pool.render_frame("a", "a"), pool.render_frame("b", "b"))
+        for worker in fake_workers:
+            worker.last_used = time.monotonic() - 1.0
+
+        # Act
+        await asyncio.wait_for(fake_workers[0].stopping.wait(), 1.0)
+        await asyncio.wait_for(fake_workers[1].stopping.wait(), 1.0)
+
+        # Assert
+        assert pool._idle == []
+        assert pool._reaper is not None and not pool._reaper.done()
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_reap_should_not_fail_when_acquire_runs_while_stopping(
+        self, fake_workers: list[FakeWorker]
+    ):
+        # Arrange
+        pool = BlenderWorkerPool("scene.blend", size=2, idle_timeout=0.2)
+        await asyncio.gather(pool.render_frame("a", "a"), pool.render_frame("b", "b"))
+        for worker in fake_workers:
+            worker.last_used = time.monotonic() - 1.0
+            worker.release_stop.clear()
+
+        # Act
+        await asyncio.wait_for(fake_workers[0].stopping.wait(), 1.0)
+        await pool.render_frame("c", "c")
+        for worker in fake_workers[:2]:
+            worker.release_stop.set()
+        await asyncio.sleep(0)
+
+        # Assert
+        assert len(fake_workers) == 3
+        assert fake_workers[2].renders == 1
+        assert pool._reaper is not None and not pool._reaper.done()
+        await pool.close()
+
+
+class TestBlenderWorker:
+    @pytest.mark.asyncio
+    async def test_render_frame_should_kill_the_worker_when_cancelled_while_sending(
+        self, monkeypatch: pytest.MonkeyPatch
+    ):
+        # Arrange
+        killed = []
+        monkeypatch.setattr(blender, "_kill_process_group", killed.append)
+        worker = blender.BlenderWorker("scene.blend")
+        # Sending the job never finishes, as with a full pipe
+        stdin = Mock(drain=AsyncMock(side_effect=asyncio.Event().wait))
+        proc = Mock(returncode=None, stdin=stdin, wait=AsyncMock())
+        worker._proc = proc
+
+        # Act
+        task = asyncio.create_task(worker.render_frame("in", "out"))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # Assert
+        assert killed == [proc]
+        assert not worker.alive
+
+    @pytest.mark.asyncio
+    async def test_acquire_should_kill_the_process_when_cancelled_during_startup(
+        self, monkeypatch: pytest.MonkeyPatch
+    ):
+        # Arrange
+        killed = []
+        monkeypatch.setattr(blender, "_kill_process_group", killed.append)
+        # The process never says it is ready
+        proc = Mock(
+            returncode=None,
+            stdout=asyncio.StreamReader(),
+            stderr=asyncio.StreamReader(),
+            wait=AsyncMock(),
+        )
+        monkeypatch.setattr(
+            blender.asyncio, "create_subprocess_exec", AsyncMock(return_value=proc)
+        )
+        pool = BlenderWorkerPool("scene.blend", size=1, idle_timeout=60)
+
+        # Act
+        task = asyncio.create_task(pool._acquire())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # Assert
+        assert killed == [proc]
+        proc.wait.assert_awaited()
+        assert pool._workers == set()
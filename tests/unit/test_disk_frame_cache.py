@@ -0,0 +1,164 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from blender_camera.disk_frame_cache import DiskFrameCache
+from blender_camera.models.camera_intrinsics import CameraIntrinsics
+from blender_camera.models.entities.camera import Camera
+from blender_camera.models.frame import Frame
+from blender_camera.models.render_pass import RenderPass
+
+
+def _create_frame(value: float = 0.5) -> Frame:
+    return Frame(
+        camera=Camera(
+            id="camera",
+            pose=[0.0, 0.0, 5.0, 0.0, 0.0, 0.0],
+            camera_intrinsics=CameraIntrinsics(fx=50.0, fy=50.0, cx=1.0, cy=1.0),
+        ),
+        depth=np.full((2, 2), value, dtype=np.float32),
+        normal=np.full((2, 2, 3), value, dtype=np.float32),
+        color=np.full((2, 2, 3), value, dtype=np.float32),
+    )
+
+
+@pytest.fixture
+def disk_frame_cache(tmp_path: Path) -> DiskFrameCache:
+    return DiskFrameCache(str(tmp_path), max_bytes=1024 * 1024)
+
+
+class TestDiskFrameCache:
+    def test_get_should_return_none_when_missing(
+        self, disk_frame_cache: DiskFrameCache
+    ):
+        # Act
+        frame = disk_frame_cache.get("key")
+
+        # Assert
+        assert frame is None
+        assert disk_frame_cache.get_metrics()["misses"] == 1
+
+    def test_get_should_return_memory_mapped_frame_after_put(
+        self, disk_frame_cache: DiskFrameCache
+    ):
+        # Arrange
+        original = _create_frame()
+        disk_frame_cache.put("key", original)
+
+        # Act
+        frame = disk_frame_cache.get("key")
+
+        # Assert
+        assert frame is not None
+        assert isinstance(frame.depth, np.memmap)
+        assert np.array_equal(frame.depth, original.depth)
+        assert np.array_equal(frame.normal, original.normal)
+        assert np.array_equal(frame.color, original.color)
+        assert frame.camera == original.camera
+
+    def test_get_should_return_frames_without_passes_that_were_not_rendered(
+        self, disk_frame_cache: DiskFrameCache
+    ):
+        # Arrange
+        original = _create_frame()
+        depth_only = Frame(original.camera, original.depth, None, None)
+        disk_frame_cache.put("key", depth_only)
+
+        # Act
+        frame = disk_frame_cache.get("key")
+
+        # Assert
+        assert frame is not None
+        assert np.array_equal(frame.depth, original.depth)
+        assert frame.normal is None
+        assert frame.color is None
+
+    def test_get_should_miss_when_the_stored_frame_lacks_a_pass(
+        self, disk_frame_cache: DiskFrameCache
+    ):
+        # Arrange
+        original = _create_frame()
+        disk_frame_cache.put("key", Frame(original.camera, original.depth, None, None))
+
+        # Act
+        frame = disk_frame_cache.get("key", [RenderPass.DEPTH, RenderPass.NORMAL])
+
+        # Assert
+        assert frame is None
+        assert disk_frame_cache.get_metrics()["misses"] == 1
+
+    def test_put_should_replace_a_stored_frame_with_one_that_adds_passes(
+        self, disk_frame_cache: DiskFrameCache
+    ):
+        # Arrange
+        original = _create_frame()
+        disk_frame_cache.put("key", Frame(original.camera, original.depth, None, None))
+
+        # Act
+        disk_frame_cache.put("key", original)
+        disk_frame_cache.put("key", Frame(original.camera, original.depth, None, None))
+
+        # Assert
+        frame = disk_frame_cache.get("key", list(RenderPass))
+        assert frame is not None
+        assert np.array_equal(frame.color, original.color)
+        assert disk_frame_cache.get_metrics()["entries"] == 1
+
+    def test_put_should_not_leave_temporary_files(
+        self, disk_frame_cache: DiskFrameCache, tmp_path: Path
+    ):
+        # Act
+        disk_frame_cache.put("key", _create_frame())
+
+        # Assert
+        assert os.listdir(tmp_path) == ["key"]
+
+    def test_entries_should_survive_a_restart(self, tmp_path: Path):
+        # Arrange
+        DiskFrameCache(str(tmp_path), max_bytes=1024 * 1024).put("key", _create_frame())
+
+        # Act
+        frame = DiskFrameCache(str(tmp_path), max_bytes=1024 * 1024).get("key")
+
+        # Assert
+        assert frame is not None
+        assert np.array_equal(frame.depth, _create_frame().depth)
+
+    def test_restart_should_remove_interrupted_writes(self, tmp_path: Path):
+        # Arrange
+        (tmp_path / "tmp-interrupted").mkdir()
+        (tmp_path / "tmp-interrupted" / "depth.npy").write_bytes(b"partial")
+
+        # Act
+        disk_frame_cache = DiskFrameCache(str(tmp_path), max_bytes=1024 * 1024)
+
+        # Assert
+        assert os.listdir(tmp_path) == []
+        assert disk_frame_cache.get_metrics()["entries"] == 0
+
+    def test_put_should_evict_least_recently_used_when_over_budget(
+        self, tmp_path: Path
+    ):
+        # Arrange
+        probe = DiskFrameCache(str(tmp_path / "probe"), max_bytes=1024 * 1024)
+        probe.put("probe", _create_frame())
+        entry_size = probe.get_metrics()["bytes"]
+
+        disk_frame_cache = DiskFrameCache(
+            str(tmp_path / "cache"), max_bytes=2 * entry_size
+        )
+        disk_frame_cache.put("a", _create_frame())
+        disk_frame_cache.put("b", _create_frame())
+        disk_frame_cache.get("a")
+
+        # Act
+        disk_frame_cache.put("c", _create_frame())
+
+        # Assert
+        assert disk_frame_cache.get("a") is not None
+        assert disk_frame_cache.get("b") is None
+        assert disk_frame_cache.get("c") is not None
+        assert disk_frame_cache.get_metrics()["evictions"] == 1
+        assert not (tmp_path / "cache" / "b").exists()
@@ -0,0 +1,151 @@
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from blender_camera.frame_cache import FrameCache
+from blender_camera.models.frame import Frame
+from blender_camera.models.render_pass import RenderPass
+
+
+def _create_frame() -> Frame:
+    # 2x2 pixels: 16 bytes depth + 48 bytes normal + 48 bytes color = 112 bytes
+    return Frame(
+        camera=Mock(),
+        depth=np.zeros((2, 2), dtype=np.float32),
+        normal=np.zeros((2, 2, 3), dtype=np.float32),
+        color=np.zeros((2, 2, 3), dtype=np.float32),
+    )
+
+
+@pytest.fixture
+def frame_cache() -> FrameCache:
+    return FrameCache(max_bytes=250)
+
+
+class TestFrameCache:
+    def test_get_should_return_none_and_count_miss_when_empty(
+        self, frame_cache: FrameCache
+    ):
+        # Act
+        frame = frame_cache.get("key", "camera")
+
+        # Assert
+        assert frame is None
+        assert frame_cache.get_metrics()["misses"] == 1
+
+    def test_get_should_return_cached_frame_after_put(self, frame_cache: FrameCache):
+        # Arrange
+        frame = _create_frame()
+        frame_cache.put("key", frame, "scene", "camera")
+
+        # Act
+        cached_frame = frame_cache.get("key", "camera")
+
+        # Assert
+        assert cached_frame is frame
+        metrics = frame_cache.get_metrics()
+        assert metrics["hits"] == 1
+        assert metrics["bytes"] == frame.nbytes
+
+    def test_get_should_only_return_frames_with_the_requested_passes(
+        self, frame_cache: FrameCache
+    ):
+        # Arrange
+        full = _create_frame()
+        frame_cache.put("key", Frame(full.camera, full.depth, None, None), "s", "c")
+
+        # Act
+        depth_frame = frame_cache.get("key", "c", [RenderPass.DEPTH])
+        color_frame = frame_cache.get("key", "c", [RenderPass.DEPTH, RenderPass.COLOR])
+
+        # Assert
+        assert depth_frame is not None
+        assert color_frame is None
+        assert frame_cache.get_metrics()["misses"] == 1
+
+    def test_put_should_keep_a_cached_frame_with_more_passes(
+        self, frame_cache: FrameCache
+    ):
+        # Arrange
+        full = _create_frame()
+        depth_only = Frame(full.camera, full.depth, None, None)
+        frame_cache.put("key", full, "scene", "camera1")
+
+        # Act
+        frame_cache.put("key", depth_only, "scene", "camera2")
+
+        # Assert
+        assert frame_cache.get("key", "camera1", list(RenderPass)) is full
+        frame_cache.invalidate_entity("scene", "camera2")
+        assert frame_cache.get("key", "camera1") is None
+
+    def test_put_should_evict_least_recently_used_when_over_budget(
+        self, frame_cache: FrameCache
+    ):
+        # Arrange
+        frame_cache.put("a", _create_frame(), "scene", "camera")
+        frame_cache.put("b", _create_frame(), "scene", "camera")
+        frame_cache.get("a", "camera")
+
+        # Act
+        frame_cache.put("c", _create_frame(), "scene", "camera")
+
+        # Assert
+        assert frame_cache.get("a", "camera") is not None
+        assert frame_cache.get("b", "camera") is None
+        assert frame_cache.get("c", "camera") is not None
+        assert frame_cache.get_metrics()["evictions"] == 1
+
+    def test_put_should_skip_frames_larger_than_budget(self):
+        # Arrange
+        frame_cache = FrameCache(max_bytes=100)
+
+        # Act
+        frame_cache.put("key", _create_frame(), "scene", "camera")
+
+        # Assert
+        assert frame_cache.get_metrics()["entries"] == 0
+
+    def test_invalidate_entity_should_remove_entries_used_by_entity(
+        self, frame_cache: FrameCache
+    ):
+        # Arrange
+        frame_cache.put("a", _create_frame(), "scene", "camera1")
+        frame_cache.put("b", _create_frame(), "scene", "camera2")
+
+        # Act
+        frame_cache.invalidate_entity("scene", "camera1")
+
+        # Assert
+        assert frame_cache.get("a", "camera1") is None
+        assert frame_cache.get("b", "camera2") is not None
+        assert frame_cache.get_metrics()["invalidations"] == 1
+
+    def test_invalidate_entity_should_remove_entries_shared_through_hits(
+        self, frame_cache: FrameCache
+    ):
+        # Arrange
+        frame_cache.put("a", _create_frame(), "scene", "camera1")
+        frame_cache.get("a", "camera2")
+
+        # Act
+        frame_cache.invalidate_entity("scene", "camera2")
+
+        # Assert
+        assert frame_cache.get_metrics()["entries"] == 0
+
+    def test_invalidate_scene_should_remove_all_scene_entries(
+        self, frame_cache: FrameCache
+    ):
+        # Arrange
+        frame_cache.put("a", _create_frame(), "scene1", "camera")
+        frame_cache.put("b", _create_frame(), "scene2", "camera")
+
+        # Act
+        frame_cache.invalidate_scene("scene1")
+
+        # Assert
+        assert frame_cache.get("a", "camera") is None
+        assert frame_cache.get("b", "camera") is not None
+        assert frame_cache.get_metrics()["bytes"] == 112
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from blender_camera.render_scheduler import RenderQueueFullError, RenderScheduler
+
+
+@pytest.fixture
+def render_scheduler() -> RenderScheduler:
+    return RenderScheduler(max_concurrent=1, max_queued=1)
+
+
+class TestRenderScheduler:
+    @pytest.mark.asyncio
+    async def test_slot_should_run_immediately_when_idle(
+        self, render_scheduler: RenderScheduler
+    ):
+        # Act
+        async with render_scheduler.slot():
+            metrics = render_scheduler.get_metrics()
+
+        # Assert
+        assert metrics["running"] == 1
+        assert metrics["queued"] == 0
+        assert render_scheduler.get_metrics()["admitted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_slot_should_queue_when_all_slots_are_busy(
+        self, render_scheduler: RenderScheduler
+    ):
+        # Arrange
+        release = asyncio.Event()
+
+        async def hold_slot():
+            async with render_scheduler.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+
+        # Act
+        waiter = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+
+        # Assert
+        metrics = render_scheduler.get_metrics()
+        assert metrics["running"] == 1
+        assert metrics["queued"] == 1
+
+        release.set()
+        await asyncio.gather(holder, waiter)
+        assert render_scheduler.get_metrics()["admitted"] == 2
+
+    @pytest.mark.asyncio
+    async def test_slot_should_reject_when_queue_is_full(
+        self, render_scheduler: RenderScheduler
+    ):
+        # Arrange
+        release = asyncio.Event()
+
+        async def hold_slot():
+            async with render_scheduler.slot():
+                await release.wait()
+
+        tasks = [asyncio.create_task(hold_slot()) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        # Act & Assert
+        with pytest.raises(RenderQueueFullError) as exc_info:
+            async with render_scheduler.slot():
+                pass
+
+        assert exc_info.value.retry_after >= 1
+        assert render_scheduler.get_metrics()["rejected"] == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    @pytest.mark.asyncio
+    async def test_slot_should_release_on_exception(
+        self, render_scheduler: RenderScheduler
+    ):
+        # Act
+        with pytest.raises(RuntimeError):
+            async with render_scheduler.slot():
+                raise RuntimeError("render failed")
+
+        # Assert
+        metrics = render_scheduler.get_metrics()
+        assert metrics["running"] == 0
+        async with render_scheduler.slot():
+            pass
+
+    @pytest.mark.asyncio
+    async def test_extra_slots_should_only_take_free_slots(self):
+        # Arrange
+        render_scheduler = RenderScheduler(max_concurrent=3, max_queued=1)
+
+        # Act
+        async with render_scheduler.slot():
+            async with render_scheduler.extra_slots(4) as taken:
+                metrics = render_scheduler.get_metrics()
+
+        # Assert
+        assert taken == 2
+        assert metrics["running"] == 3
+        assert render_scheduler.get_metrics()["running"] == 0
+        async with render_scheduler.extra_slots(3) as taken:
+            assert taken == 3
+
+    @pytest.mark.asyncio
+    async def test_extra_slots_should_leave_slots_to_queued_renders(
+        self, render_scheduler: RenderScheduler
+    ):
+        # Arrange
+        async def take_slot():
+            async with render_scheduler.slot():
+                pass
+
+        async with render_scheduler.slot():
+            waiter = asyncio.create_task(take_slot())
+            await asyncio.sleep(0)
+
+        # Act: the slot was handed to the waiter, which has not run yet
+        async with render_scheduler.extra_slots(1) as taken:
+            pass
+
+        # Assert
+        assert taken == 0
+        await waiter
+        assert render_scheduler.get_metrics()["admitted"] == 2
@@ -0,0 +1,185 @@
+import asyncio
+
+import pytest
+
+from blender_camera.blender import BlenderWorkerPool
+from blender_camera.frame_cache import FrameCache
+from blender_camera.models.camera_intrinsics import CameraIntrinsics
+from blender_camera.models.entities.camera import Camera
+from blender_camera.models.frame import Frame
+from blender_camera.models.image_size import ImageSize
+from blender_camera.models.render_pass import RenderPass
+from blender_camera.models.render_preset import RenderPreset
+from blender_camera.models.scene import Scene
+from blender_camera.render_scheduler import RenderScheduler
+from blender_camera.renderer import Renderer
+from blender_camera.scripts.render_frame_script import RenderTransport
+from blender_camera.stage_executor import StageExecutor
+
+
+@pytest.fixture
+def camera() -> Camera:
+    return Camera(
+        id="camera",
+        pose=[0.0, 0.0, 5.0, 0.0, 0.0, 0.0],
+        camera_intrinsics=CameraIntrinsics(fx=50.0, fy=50.0, cx=1.0, cy=1.0),
+    )
+
+
+@pytest.fixture
+def scene() -> Scene:
+    return Scene("scene", "scene.blend", "hash")
+
+
+@pytest.fixture
+def rendered_passes() -> list[list[RenderPass]]:
+    return []
+
+
+@pytest.fixture
+def release() -> asyncio.Event:
+    return asyncio.Event()
+
+
+@pytest.fixture
+def renderer(
+    monkeypatch: pytest.MonkeyPatch,
+    rendered_passes: list[list[RenderPass]],
+    release: asyncio.Event,
+):
+    """A renderer whose renders wait for `release` and record their passes."""
+    executor = StageExecutor(1)
+    renderer = Renderer(
+        RenderScheduler(2, 4),
+        FrameCache(1024 * 1024),
+        None,
+        executor,
+        pool_size=0,
+        idle_timeout=60,
+        tile_pixels=0,
+        transport=RenderTransport.FILE,
+    )
+
+    async def render(scene, cameras, preset, passes) -> list[Frame]:
+        rendered_passes.append(passes)
+        await release.wait()
+        return [Frame.allocate(cameras[0], 2, 2, passes)]
+
+    monkeypatch.setattr(renderer, "_render", render)
+    yield renderer
+    executor.shutdown()
+
+
+class TestRenderer:
+    @pytest.mark.asyncio
+    async def test_render_should_share_an_in_flight_render_with_more_passes(
+        self,
+        renderer: Renderer,
+        scene: Scene,
+        camera: Camera,
+        rendered_passes: list[list[RenderPass]],
+        release: asyncio.Event,
+    ):
+        # Arrange
+        preset = RenderPreset.GEOMETRY
+        all_passes = list(RenderPass)
+        full = asyncio.create_task(renderer.render(scene, camera, preset, all_passes))
+        await asyncio.sleep(0)
+
+        # Act
+        depth = asyncio.create_task(
+            renderer.render(scene, camera, preset, [RenderPass.DEPTH])
+        )
+        await asyncio.sleep(0)
+        release.set()
+
+        # Assert
+        assert await depth is await full
+        assert rendered_passes == [all_passes]
+
+    @pytest.mark.asyncio
+    async def test_render_should_serve_fewer_passes_from_a_cached_frame(
+        self,
+        renderer: Renderer,
+        scene: Scene,
+        camera: Camera,
+        rendered_passes: list[list[RenderPass]],
+        release: asyncio.Event,
+    ):
+        # Arrange
+        release.set()
+        preset = RenderPreset.GEOMETRY
+        full = await renderer.render(scene, camera, preset, list(RenderPass))
+
+        # Act
+        normal = await renderer.render(scene, camera, preset, [RenderPass.NORMAL])
+
+        # Assert
+        assert normal is full
+        assert len(rendered_passes) == 1
+
+    @pytest.mark.asyncio
+    async def test_render_should_render_again_for_a_missing_pass(
+        self,
+        renderer: Renderer,
+        scene: Scene,
+        camera: Camera,
+        rendered_passes: list[list[RenderPass]],
+        release: asyncio.Event,
+    ):
+        # Arrange
+        release.set()
+        preset = RenderPreset.GEOMETRY
+        await renderer.render(scene, camera, preset, [RenderPass.DEPTH])
+
+        # Act
+        frame = await renderer.render(scene, camera, preset, [RenderPass.COLOR])
+
+        # Assert
+        assert frame.color is not None
+        assert rendered_passes == [[RenderPass.DEPTH], [RenderPass.COLOR]]
+
+
+class TestGetTileCount:
+    @pytest.fixture
+    def camera(self, camera: Camera) -> Camera:
+        camera.image_size = ImageSize(width=4, height=3)
+        return camera
+
+    @pytest.fixture
+    def renderer(self) -> Renderer:
+        return Renderer(
+            RenderScheduler(1, 4),
+            FrameCache(1024 * 1024),
+            None,
+            StageExecutor(1),
+            pool_size=0,
+            idle_timeout=60,
+            tile_pixels=2,
+            transport=RenderTransport.FILE,
+        )
+
+    def test_get_tile_count_should_split_into_bands_of_tile_pixels(
+        self, renderer: Renderer, scene: Scene, camera: Camera
+    ):
+        # Act & Assert
+        assert renderer._get_tile_count(scene, [camera]) == 3  # One band per row
+
+    def test_get_tile_count_should_not_split_batches_or_default_cameras(
+        self, renderer: Renderer, scene: Scene, camera: Camera
+    ):
+        # Arrange
+        default_camera = camera.model_copy(update={"camera_intrinsics": None})
+
+        # Act & Assert
+        assert renderer._get_tile_count(scene, [camera, camera]) == 1
+        assert renderer._get_tile_count(scene, [default_camera]) == 1
+
+    def test_get_tile_count_should_not_exceed_free_workers(
+        self, renderer: Renderer, scene: Scene, camera: Camera
+    ):
+        # Arrange
+        renderer._pools[scene.id] = BlenderWorkerPool(scene.blend_path, 2, 60)
+
+        # Act & Assert
+        assert renderer._get_tile_count(scene, [camera]) == 2
@@ -0,0 +1,182 @@
+import asyncio
+
+import pytest
+
+from blender_camera.single_flight import SingleFlight
+
+
+@pytest.fixture
+def single_flight() -> SingleFlight[int]:
+    return SingleFlight[int]()
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_do_should_share_one_call_between_concurrent_callers(
+        self, single_flight: SingleFlight[int]
+    ):
+        # Arrange
+        calls = 0
+        release = asyncio.Event()
+
+        async def render() -> int:
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return 42
+
+        # Act
+        tasks = [asyncio.create_task(single_flight.do("key", render)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        # Assert
+        assert results == [42, 42, 42]
+        assert calls == 1
+        assert single_flight.get_metrics() == {
+            "in_flight": 0,
+            "coalesced": 2,
+            "abandoned": 0,
+        }
+
+    @pytest.mark.asyncio
+    async def test_do_should_not_share_calls_with_different_keys(
+        self, single_flight: SingleFlight[int]
+    ):
+        # Arrange
+        async def render(value: int) -> int:
+            await asyncio.sleep(0)
+            return value
+
+        # Act
+        results = await asyncio.gather(
+            single_flight.do("a", lambda: render(1)),
+            single_flight.do("b", lambda: render(2)),
+        )
+
+        # Assert
+        assert results == [1, 2]
+        assert single_flight.get_metrics()["coalesced"] == 0
+
+    @pytest.mark.asyncio
+    async def test_do_should_start_a_new_call_after_the_previous_finished(
+        self, single_flight: SingleFlight[int]
+    ):
+        # Arrange
+        calls = 0
+
+        async def render() -> int:
+            nonlocal calls
+            calls += 1
+            return calls
+
+        # Act
+        first = await single_flight.do("key", render)
+        second = await single_flight.do("key", render)
+
+        # Assert
+        assert (first, second) == (1, 2)
+
+    @pytest.mark.asyncio
+    async def test_do_should_propagate_errors_to_all_callers(
+        self, single_flight: SingleFlight[int]
+    ):
+        # Arrange
+        async def render() -> int:
+            await asyncio.sleep(0)
+            raise RuntimeError("render failed")
+
+        # Act
+        results = await asyncio.gather(
+            single_flight.do("key", render),
+            single_flight.do("key", render),
+            return_exceptions=True,
+        )
+
+        # Assert
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert single_flight.get_metrics()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_do_should_keep_running_when_one_caller_is_cancelled(
+        self, single_flight: SingleFlight[int]
+    ):
+        # Arrange
+        release = asyncio.Event()
+
+        async def render() -> int:
+            await release.wait()
+            return 7
+
+        first = asyncio.create_task(single_flight.do("key", render))
+        second = asyncio.create_task(single_flight.do("key", render))
+        await asyncio.sleep(0)
+
+        # Act
+        first.cancel()
+        release.set()
+
+        # Assert
+        assert await second == 7
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    @pytest.mark.asyncio
+    async def test_do_should_cancel_the_call_when_every_caller_is_cancelled(
+        self, single_flight: SingleFlight[int]
+    ):
+        # Arrange
+        cancelled = asyncio.Event()
+
+        async def render() -> int:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return 7
+
+        callers = [
+            asyncio.create_task(single_flight.do("key", render)) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+
+        # Act
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+
+        # Assert
+        await asyncio.wait_for(cancelled.wait(), timeout=1.0)
+        assert single_flight.get_metrics()["in_flight"] == 0
+        assert single_flight.get_metrics()["abandoned"] == 1
+
+    @pytest.mark.asyncio
+    async def test_do_should_wait_for_the_cancelled_call_when_the_last_caller_leaves(
+        self, single_flight: SingleFlight[int]
+    ):
+        # Arrange
+        cleaned_up = False
+
+        async def render() -> int:
+            nonlocal cleaned_up
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                # Like waiting for a killed Blender process to exit
+                await asyncio.sleep(0.01)
+                cleaned_up = True
+                raise
+            return 7
+
+        caller = asyncio.create_task(single_flight.do("key", render))
+        await asyncio.sleep(0)
+
+        # Act
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+
+        # Assert
+        assert cleaned_up
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from blender_camera.stage_executor import StageExecutor
+
+
+@pytest.fixture
+def stage_executor():
+    executor = StageExecutor(2)
+    yield executor
+    executor.shutdown()
+
+
+class TestStageExecutor:
+    @pytest.mark.asyncio
+    async def test_run_should_call_the_function_off_the_event_loop_thread(
+        self, stage_executor: StageExecutor
+    ):
+        # Arrange
+        def current_thread_name(suffix: str) -> str:
+            return threading.current_thread().name + suffix
+
+        # Act
+        result = await stage_executor.run("encode_png", current_thread_name, "!")
+
+        # Assert
+        assert result.startswith("stage")
+        assert result.endswith("!")
+
+    @pytest.mark.asyncio
+    async def test_run_should_record_timings_per_stage(
+        self, stage_executor: StageExecutor
+    ):
+        # Act
+        await stage_executor.run("decode_exr", sum, [1, 2])
+        await stage_executor.run("decode_exr", sum, [3, 4])
+        await stage_executor.run("encode_ply", sum, [5])
+
+        # Assert
+        metrics = stage_executor.get_metrics()
+        assert metrics.keys() == {"decode_exr", "encode_ply"}
+        assert metrics["decode_exr"]["count"] == 2
+        assert metrics["encode_ply"]["count"] == 1
+        assert metrics["decode_exr"]["seconds_max"] >= 0
+        assert (
+            metrics["decode_exr"]["seconds_avg"] <= metrics["decode_exr"]["seconds_max"]
+        )
+
+    @pytest.mark.asyncio
+    async def test_run_should_record_the_size_of_encoded_output(
+        self, stage_executor: StageExecutor
+    ):
+        # Act
+        await stage_executor.run("encode_png", bytes, 10)
+        await stage_executor.run("encode_png", bytes, 30)
+        await stage_executor.run("decode_exr", sum, [1])
+
+        # Assert
+        metrics = stage_executor.get_metrics()
+        assert metrics["encode_png"]["bytes_total"] == 40
+        assert metrics["encode_png"]["bytes_avg"] == 20
+        assert "bytes_total" not in metrics["decode_exr"]
+
+    @pytest.mark.asyncio
+    async def test_run_should_propagate_errors(self, stage_executor: StageExecutor):
+        # Arrange
+        def fail():
+            raise ValueError("bad frame")
+
+        # Act & Assert
+        with pytest.raises(ValueError, match="bad frame"):
+            await stage_executor.run("decode_exr", fail)